@@ -196,6 +196,25 @@ function curr_date_time_str
     date +%Y_%m_%d_%H_%M_%S_%N
 }
 
+function curr_epoch_time_ns
+{
+    date +%s%N
+}
+
+function elapsed_secs_since
+{
+    # 'elapsed_secs_since start_ns' where start_ns is the output of
+    # curr_epoch_time_ns. echoes the seconds elapsed since then.
+    # example
+    # _start_ns=`curr_epoch_time_ns`; sleep 1; elapsed_secs_since $_start_ns
+    # 1.002814562
+
+    local _start_ns="$1"
+    local _ns=$(( `curr_epoch_time_ns` - _start_ns ))
+
+    printf "%d.%09d\n" $((_ns / 1000000000)) $((_ns % 1000000000))
+}
+
 #----------------------------------------------------------------------------
 # RELATING TO FILES
 
@@ -8,6 +8,8 @@ set -u
 mod_name=$(basename $0)
 source $MY_SRTDIFF_CFG_FILEPATH
 
+write_stats=${write_stats-0}    # not set by older configuration files
+
 #----[sources]---------------------------------------------------------------
 
 source $dock_proj_folder/common_bash_functions.sh
@@ -73,13 +75,31 @@ function perform_srt_diff
 {
     local _output="$1" 
 
+    local _stats_opt=""
+    ((write_stats)) && { _stats_opt=" -s "; }
+
     srt_diff.sh \
         -d $dock_data_folder            \
         -O $dock_data_folder/1.iet.srt  \
         -T $dock_data_folder/2.iet.srt  \
+        $_stats_opt                     \
         > $_output
 }
 
+function add_stage_stats
+{
+    # adds the times of the stages of this script to the stats.json 
+    # written by srt_diff.sh
+
+    python3 $dock_proj_folder/srtdf_instrument.py   \
+        -t "shell.normalize=$normalize_secs"         \
+        -t "shell.infer_endtime=$infer_end_time_secs" \
+        -t "shell.srt_diff=$srt_diff_secs"           \
+        -t "shell.lev_hist=$lev_hist_secs"           \
+        -o $dock_data_folder/stats.json              \
+        $dock_data_folder/stats.json
+}
+
 function dump_lev_histogram
 {
     local _output="$1" 
@@ -100,6 +120,7 @@ d> cfg dock_data_folder=$dock_data_folder
 d> cfg dock_proj_folder=$dock_proj_folder
 d> cfg infer_end_time_tolerance=$infer_end_time_tolerance
 d> cfg infer_end_time_wpm=$infer_end_time_wpm
+d> cfg write_stats=${write_stats}
 d> in  srt_1_filepath=$srt_1_filepath
 d> in  srt_2_filepath=$srt_2_filepath
 EOD
@@ -113,6 +134,8 @@ PATH=$PATH:$dock_proj_folder
 
 ((debug)) && { echo "#--{normalizing srt files}--"; }
 
+start_ns=`curr_epoch_time_ns`
+
 if ! normalize 1 $srt_1_filepath
 then
     exit 2
@@ -123,12 +146,16 @@ then
     exit 2
 fi
 
+normalize_secs=`elapsed_secs_since $start_ns`
+
 #+--------------------+
 #| inferring end time |
 #+--------------------+
 
 ((debug)) && { echo "#--{inferring end times}--"; }
 
+start_ns=`curr_epoch_time_ns`
+
 if ! infer_end_time 1
 then
     exit 2
@@ -139,17 +166,23 @@ then
     exit 2
 fi
 
+infer_end_time_secs=`elapsed_secs_since $start_ns`
+
 #+------------------+
 #| perform srt diff |
 #+------------------+
 
 ((debug)) && { echo "#--{performing srt diff}--"; }
 
+start_ns=`curr_epoch_time_ns`
+
 if ! perform_srt_diff $tmp1
 then
     exit 2
 fi
 
+srt_diff_secs=`elapsed_secs_since $start_ns`
+
 read lev_dist srtlev_filepath srtcomp_filepath srtcomplev_filepath <<< $(cat $tmp1)
 echo "$lev_dist" > $dock_data_folder/levdist.txt
 
@@ -159,12 +192,32 @@ echo "$lev_dist" > $dock_data_folder/levdist.txt
 
 ((debug)) && { echo "#--{dumping levenshtein histogram}--"; }
 
+start_ns=`curr_epoch_time_ns`
+
 if ! dump_lev_histogram $dock_data_folder/levhist.csv
 then
     exit 2
 fi
 
+lev_hist_secs=`elapsed_secs_since $start_ns`
+
 chmod +r $dock_data_folder/levhist.csv
 
+#+----------------------------------+
+#| add the stage times to the stats |
+#+----------------------------------+
+
+if ((write_stats))
+then
+    ((debug)) && { echo "#--{writing stats}--"; }
+
+    if ! add_stage_stats
+    then
+        exit 2
+    fi
+
+    chmod +r $dock_data_folder/stats.json
+fi
+
 exit 0
 
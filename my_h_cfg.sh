@@ -39,4 +39,8 @@ infer_end_time_tolerance=1300
 infer_end_time_wpm=250
     # value of the -w option of srtdf_infer_endtime.sh
 
+write_stats=1
+    # whether the time spent in each stage and counts of what was 
+    # processed are written in stats.json (see srtdf_instrument.py)
+
 
@@ -21,16 +21,19 @@ OPT_TRAN_FILE_PATH=""
 OPT_INTERIM_FOLDER="$G_MAPPED_ROOT_PATH"
 OPT_INTERIM_PREFIX=""
 OPT_VERBOSE_MODE=0
+OPT_WRITE_STATS=0
 
 #----[temp files and termination]--------------------------------------------
 
 function fnxOnEnd
 {
-    rm $TMP1 $TMP2
+    rm $TMP1 $TMP2 $TMP3 $TMP4
 }
 
 TMP1=`mktemp`
 TMP2=`mktemp`
+TMP3=`mktemp`
+TMP4=`mktemp`
 
 trap 'fnxOnEnd;' 0 1 2 3 6 9 11
 
@@ -49,6 +52,7 @@ SYNOPSIS
                 -T transcribed_srt_file_path
                 [-d interim_folder_path]
                 [-p interim_files_prefix]
+                [-s]
                 [-h]
              
 DESCRIPTION
@@ -69,6 +73,12 @@ DESCRIPTION
         (c) levenshtein details in csv format
             {interim_files_prefix}srtlev.csv
 
+        (d) the time spent in each stage and counts of what was
+            processed (words, matrix cells, spacy docs, bytes written,
+            ...) in json format. only if -s is specified.
+            see srtdf_instrument.py.
+            {interim_files_prefix}stats.json
+
     The file/folder paths specified for the -O, -T, and -d options 
     must have a common ancestor mapped to $G_MAPPED_ROOT_PATH using the 
     -v option of the docker run command.
@@ -92,6 +102,10 @@ OPTIONS
        the prefix to be used for interim files.
        this is optional. default is '$OPT_INTERIM_PREFIX'
 
+    -s
+       write {interim_files_prefix}stats.json.
+       this is optional.
+
     -v 
        verbose mode. verbose messages are generated on stderr.
        this is optional.
@@ -117,7 +131,7 @@ export PATH=$PATH:$DIRNAME
 #| argument processing |
 #+---------------------+
 
-TEMP=`getopt -o "O:T:d:p:fvh" -n "$0" -- "$@"`
+TEMP=`getopt -o "O:T:d:p:fsvh" -n "$0" -- "$@"`
 eval set -- "$TEMP"
 
 while true 
@@ -127,6 +141,7 @@ do
         -T) OPT_TRAN_FILE_PATH="$2"; shift 2;;
         -d) OPT_INTERIM_FOLDER="$2"; shift 2;;
         -p) OPT_INTERIM_PREFIX="$2"; shift 2;;
+        -s) OPT_WRITE_STATS=1; shift 1;;
         -v) OPT_VERBOSE_MODE=1; shift 1;;
         -h) usage; exit 0;;
 		--) shift ; break ;;
@@ -178,6 +193,18 @@ then
     info_message "OPT_INTERIM_FOLDER=$OPT_INTERIM_FOLDER"
     info_message "OPT_INTERIM_PREFIX=$OPT_INTERIM_PREFIX"
     info_message "OPT_VERBOSE_MODE=$OPT_VERBOSE_MODE"
+    info_message "OPT_WRITE_STATS=$OPT_WRITE_STATS"
+fi
+
+# the python modules write a summary of their spans and counters in
+# these files (see srtdf_instrument.py) if they are not empty
+
+WRITER_STATS_FILE_PATH=""
+LEV_STATS_FILE_PATH=""
+if ((OPT_WRITE_STATS))
+then
+    WRITER_STATS_FILE_PATH=$TMP3
+    LEV_STATS_FILE_PATH=$TMP4
 fi
 
 #+---------------------+
@@ -190,9 +217,12 @@ then
     exit 2
 fi
 
+START_NS=`curr_epoch_time_ns`
+
 cat $OPT_TRAN_FILE_PATH | grep -v '^#' > $TMP1
 
-if ! python3 $DIRNAME/srtdf_srt_compare_writer.py \
+if ! SRTDF_STATS_FILEPATH=$WRITER_STATS_FILE_PATH \
+     python3 $DIRNAME/srtdf_srt_compare_writer.py \
                 $OPT_ORG_FILE_PATH $TMP1 \
                 > $SRTCOMP_FILE_PATH
 then
@@ -200,15 +230,17 @@ then
     exit 2
 fi
 
+COMPARE_WRITER_SECS=`elapsed_secs_since $START_NS`
+
 if ((OPT_VERBOSE_MODE))
 then
     info_message "$SRTCOMP_FILE_PATH:srt comparison details"
 fi
 
 
-#+----------------------------------+
-#| levenshtein details and distance |
-#+----------------------------------+
+#+-------------------------------------------------------------+
+#| levenshtein details and distance, and details in csv format |
+#+-------------------------------------------------------------+
 
 SRTCOMPLEV_FILE_PATH="${OPT_INTERIM_FOLDER}/${OPT_INTERIM_PREFIX}srtcomplev.txt"
 if ! create_file $SRTCOMPLEV_FILE_PATH
@@ -216,39 +248,61 @@ then
     exit 2
 fi
 
+SRTLEV_FILE_PATH="${OPT_INTERIM_FOLDER}/${OPT_INTERIM_PREFIX}srtlev.csv"
+if ! create_file $SRTLEV_FILE_PATH
+then
+    exit 2
+fi
+
 DEBUG_OPTION=""
 ((OPT_VERBOSE_MODE)) && { DEBUG_OPTION=" -d "; }
-cat $SRTCOMP_FILE_PATH |\
-if ! python3 $DIRNAME/srtdf_srt_lev.py \
+START_NS=`curr_epoch_time_ns`
+if ! SRTDF_STATS_FILEPATH=$LEV_STATS_FILE_PATH \
+     python3 $DIRNAME/srtdf_srt_lev.py \
         $DEBUG_OPTION   \
         -l              \
+        -i $SRTCOMP_FILE_PATH \
+        -o $SRTLEV_FILE_PATH  \
         -C "ORG_TS,ORG_WORD,ORG_POS,ORG_ISSTOP,LEV_OP,TRAN_TS,TRAN_WORD,TRAN_POS,TRAN_ISSTOP,TS_DIFF" \
         > $SRTCOMPLEV_FILE_PATH 
 then
     error_message "srt levenshtein generation failed"
     exit 2
 fi
+LEV_SECS=`elapsed_secs_since $START_NS`
 
 if ((OPT_VERBOSE_MODE))
 then
     info_message "$SRTCOMPLEV_FILE_PATH:srt comparison and levenshtein details"
+    info_message "$SRTLEV_FILE_PATH:srt levenshtein details"
 fi
 
-#+-----------------------------------+
-#| levenshtein details in csv format |
-#+-----------------------------------+
+#+-------+
+#| stats |
+#+-------+
 
-SRTLEV_FILE_PATH="${OPT_INTERIM_FOLDER}/${OPT_INTERIM_PREFIX}srtlev.csv"
-if ! create_file $SRTLEV_FILE_PATH
+if ((OPT_WRITE_STATS))
 then
-    exit 2
-fi
+    STATS_FILE_PATH="${OPT_INTERIM_FOLDER}/${OPT_INTERIM_PREFIX}stats.json"
+    if ! create_file $STATS_FILE_PATH
+    then
+        exit 2
+    fi
 
-cat $SRTCOMPLEV_FILE_PATH | srtdf_csvfy_srt_lev.sh > $SRTLEV_FILE_PATH
+    if ! python3 $DIRNAME/srtdf_instrument.py \
+            -t "shell.compare_writer=$COMPARE_WRITER_SECS" \
+            -t "shell.lev=$LEV_SECS" \
+            -o $STATS_FILE_PATH \
+            $WRITER_STATS_FILE_PATH $LEV_STATS_FILE_PATH
+    then
+        error_message "stats generation failed"
+        exit 2
+    fi
 
-if ((OPT_VERBOSE_MODE))
-then
-    info_message "$SRTLEV_FILE_PATH:srt levenshtein details"
+    if ((OPT_VERBOSE_MODE))
+    then
+        info_message "$STATS_FILE_PATH:time spent in each stage and counters"
+    fi
 fi
 
 #+--------+
@@ -0,0 +1,431 @@
+#+---------+
+#| IMPORTS |
+#+---------+
+
+import os
+import sys
+import traceback
+import getopt
+import csv
+import multiprocessing
+
+import srtdf_srt_compare_writer as cw_m
+import srtdf_srt_lev as sl_m
+import srtdf_pipeline as pl_m
+import srtdf_lev_hist as lh_m
+import srtdf_srt_prepare as sp_m
+import srtdf_instrument as in_m
+
+#+------------------+
+#| GLOBAL VARIABLES |
+#+------------------+
+
+g_module_name = None
+
+#+-----------+
+#| FUNCTIONS |
+#+-----------+
+
+def _eprint(*args, **kwargs):
+    print(*args, file=sys.stderr, flush=True, **kwargs)
+    #sys.stderr.flush()
+
+def usage():
+    format_str = """
+NAME
+
+    %s - calculates the levenshtein distance of many pairs of srt files
+
+SYNOPSIS
+
+    %s -m manifest_filepath [-d output_root_folder] [-j num_workers]
+       [-I [-t tolerance_ms] [-w wpm]] [-k] [-l language_model] [-M] [-P]
+       [-c cache_dir] [-E engine] [-B band_ms] [-r rangespec_filepath]
+       [-v] [-h]
+
+DESCRIPTION
+
+    Runs srtdf_pipeline.py on each pair of srt files listed in the
+    manifest, using a pool of worker processes. Each worker loads the
+    language model once and reuses it for all the pairs it is given.
+
+    The manifest is a csv file with one pair per line:
+
+        original_srt_file_path,transcribed_srt_file_path,output_folder
+
+    Empty lines and lines beginning with '#' are ignored. A relative
+    output_folder is taken relative to the output_root_folder.
+
+    The following files are written in the output_folder of each pair
+    (the layout of my_d_srtdiff.sh)
+
+        srtlev.csv   - levenshtein details in csv format
+        levdist.txt  - the levenshtein distance
+        levhist.csv  - histogram of the levenshtein details
+                       (see srtdf_lev_hist.py)
+        srtcomp.txt, srtcomplev.txt
+                     - only if -k is specified
+
+    A line is echoed on stdout for each pair, in the order of the
+    manifest, as follows
+
+        output_folder levenshtein_distance
+
+    The levenshtein_distance is '-' if the pair failed. The reason is
+    printed on stderr and the exit status is 2 if any pair failed.
+
+    If the environment variable SRTDF_STATS_FILEPATH is set, the time
+    spent in each stage and the counters of all the pairs, in the
+    workers included, are written on that file at the end (see 
+    srtdf_instrument.py).
+
+OPTIONS
+
+    -m manifest_filepath
+       the manifest.
+       this is mandatory.
+
+    -d output_root_folder
+       see DESCRIPTION.
+       this is optional. default is the current folder.
+
+    -j num_workers
+       the number of worker processes.
+       this is optional. default is the number of cpus.
+
+    -I, -t tolerance_ms, -w wpm
+       see srtdf_pipeline.py.
+       these are optional.
+
+    -k
+       keep (write) the interim files srtcomp.txt and srtcomplev.txt.
+       this is optional.
+
+    -l language_model, -M, -P, -c cache_dir
+       see srtdf_srt_compare_writer.py.
+       these are optional.
+
+    -E engine, -B band_ms
+       see srtdf_srt_lev.py.
+       these are optional.
+
+    -r rangespec_filepath
+       the buckets of levhist.csv. see srtdf_lev_hist.py.
+       this is optional.
+
+    -v
+       verbose mode. debug messages are generated on stderr.
+       this is optional.
+
+    -h
+       this help.
+       this is optional.
+"""
+    usage_str = format_str % (g_module_name, g_module_name)
+    _eprint(usage_str)
+
+
+def read_manifest(filepath, output_root):
+
+    # returns the (org_filepath, tran_filepath, output_folder) tuples of
+    # the manifest
+
+    pairs = []
+
+    with open(filepath, newline = "") as f:
+        for line_num, row in enumerate(csv.reader(f), 1):
+            if (len(row) == 0 or row[0].startswith("#")):
+                continue
+            if (len(row) != 3):
+                err_str = "%s: %s:%d: expected 3 fields found %d" % \
+                            (g_module_name, filepath, line_num, len(row))
+                raise Exception (err_str)
+            row = [ v.strip() for v in row ]
+            pairs.append((row[0], row[1],
+                          os.path.join(output_root, row[2])))
+
+    return pairs
+
+
+def init_worker(module_name, options):
+
+    # runs once in each worker, and first in the parent. the language
+    # model is loaded here so that the pairs given to the worker do not
+    # pay for it. the parent loads it before the pool is created: a
+    # model that cannot be loaded fails the run at once instead of
+    # making the pool start workers again and again.
+
+    global g_module_name
+    global g_options
+
+    g_module_name      = module_name
+    pl_m.g_module_name = module_name
+    cw_m.g_module_name = module_name
+    sl_m.g_module_name = module_name
+    lh_m.g_module_name = module_name
+    sp_m.g_module_name = module_name
+    g_options          = options
+
+    cw_m.get_nlp(options.pipeline_options.writer_options)
+
+
+def init_pool_worker(module_name, options):
+
+    # the initializer of the workers of the pool. they are forked with
+    # the model the parent loaded, and with what the parent recorded.
+
+    in_m.clear()
+    init_worker(module_name, options)
+
+
+def diff_pair(pair):
+
+    # runs in a worker. returns (lev_dist, None, stats) or (None, err_str,
+    # stats), where stats is what the worker recorded since the previous
+    # pair (see srtdf_instrument.take_summary).
+
+    with in_m.span("batch.pair"):
+        (lev_dist, err_str) = _diff_pair(pair)
+
+    return (lev_dist, err_str, in_m.take_summary(g_module_name))
+
+
+def _diff_pair(pair):
+
+    (org_filepath, tran_filepath, output_folder) = pair
+
+    try:
+        options = g_options.pipeline_options
+
+        os.makedirs(output_folder, exist_ok = True)
+
+        options.org_filepath  = org_filepath
+        options.tran_filepath = tran_filepath
+        options.output_folder = output_folder
+        options.output_prefix = ""
+
+        (lev_dist, paths) = pl_m.diff_srt_files(options)
+
+        with open(os.path.join(output_folder, "levdist.txt"), "w") as f:
+            print("%d" % lev_dist, file=f)
+
+        with in_m.span("lev.hist"):
+            lh_m.lev_hist_file(paths[0],
+                               os.path.join(output_folder, "levhist.csv"),
+                               g_options.range_spec)
+
+        return (lev_dist, None)
+
+    except Exception as e:
+        if (g_options.debug):
+            traceback.print_exc()
+        return (None, str(e))
+
+
+def diff_pairs(pairs, options):
+
+    # returns the (lev_dist, err_str, stats) tuples of the pairs in the
+    # order of the pairs
+
+    init_worker(g_module_name, options)
+
+    if (options.num_workers == 1 or len(pairs) <= 1):
+        return [ diff_pair(pair) for pair in pairs ]
+
+    num_workers = min(options.num_workers, len(pairs))
+    with multiprocessing.Pool(num_workers, init_pool_worker,
+                              (g_module_name, options)) as pool:
+        return pool.map(diff_pair, pairs, chunksize = 1)
+
+#+---------+
+#| CLASSES |
+#+---------+
+
+class Options(object):
+
+    def __init__(self, module_name):
+        self.m_mn                = module_name
+        self.m_manifest_filepath = None
+        self.m_output_root       = "."
+        self.m_num_workers       = os.cpu_count() or 1
+        self.m_range_spec        = lh_m.RangeSpec(module_name)
+        self.m_debug             = False
+
+        # options passed on to srtdf_pipeline.py for each pair
+
+        self.m_pipeline_options  = pl_m.Options(module_name)
+
+    @property
+    def manifest_filepath(self):
+        return self.m_manifest_filepath
+
+    @manifest_filepath.setter
+    def manifest_filepath(self, v):
+        if (not os.path.isfile(v)):
+            err_str = "%s: file %s not present" % (self.m_mn, v)
+            raise Exception (err_str)
+        self.m_manifest_filepath = v
+
+    @property
+    def output_root(self):
+        return self.m_output_root
+
+    @output_root.setter
+    def output_root(self, v):
+        self.m_output_root = v
+
+    @property
+    def num_workers(self):
+        return self.m_num_workers
+
+    @num_workers.setter
+    def num_workers(self, v):
+        if (v < 1):
+            err_str = "%s: invalid number of workers %d" % (self.m_mn, v)
+            raise Exception (err_str)
+        self.m_num_workers = v
+
+    @property
+    def range_spec(self):
+        return self.m_range_spec
+
+    @range_spec.setter
+    def range_spec(self, v):
+        self.m_range_spec = v
+
+    @property
+    def debug(self):
+        return self.m_debug
+
+    @debug.setter
+    def debug(self, v):
+        self.m_debug = v
+        self.m_pipeline_options.debug = v
+
+    @property
+    def pipeline_options(self):
+        return self.m_pipeline_options
+
+    def parse_cmdline(self):
+        opts, args = \
+            getopt.getopt(sys.argv[1:],
+                    "m:d:j:It:w:kl:MPc:E:B:r:vh",
+                    [
+                      "manifest=",
+                      "output-root=",
+                      "num-workers=",
+                      "prepare",
+                      "tolerance=",
+                      "wpm=",
+                      "keep-interim",
+                      "lang-model=",
+                      "minimal-pipeline",
+                      "suppress-pos",
+                      "cache-dir=",
+                      "engine=",
+                      "band-ms=",
+                      "range-spec=",
+                      "verbose",
+                      "help"
+                    ])
+
+        popt = self.m_pipeline_options
+
+        for o, v in opts:
+            if o in ("-h", "--help"):
+                usage()
+                sys.exit(0)
+            elif o in ("-m", "--manifest"):
+                self.manifest_filepath = v
+            elif o in ("-d", "--output-root"):
+                self.output_root = v
+            elif o in ("-j", "--num-workers"):
+                self.num_workers = int(v)
+            elif o in ("-I", "--prepare"):
+                popt.prepare = True
+            elif o in ("-t", "--tolerance"):
+                popt.tolerance = int(v)
+            elif o in ("-w", "--wpm"):
+                popt.wpm = int(v)
+            elif o in ("-k", "--keep-interim"):
+                popt.keep_interim = True
+            elif o in ("-l", "--lang-model"):
+                popt.writer_options.lang_model = v
+            elif o in ("-M", "--minimal-pipeline"):
+                popt.writer_options.minimal_pipeline = True
+            elif o in ("-P", "--suppress-pos"):
+                popt.writer_options.suppress_pos = True
+            elif o in ("-c", "--cache-dir"):
+                popt.writer_options.cache_dir = v
+            elif o in ("-E", "--engine"):
+                popt.lev_options.engine = v
+            elif o in ("-B", "--band-ms"):
+                popt.lev_options.band_ms = int(v)
+            elif o in ("-r", "--range-spec"):
+                if (not os.path.isfile(v)):
+                    err_str = "%s: file %s not present" % (self.m_mn, v)
+                    raise Exception (err_str)
+                self.range_spec = lh_m.read_range_spec_file(v)
+            elif o in ("-v", "--verbose"):
+                self.debug = True
+
+        if (self.m_manifest_filepath == None):
+            err_str = "%s: -m option not specified" % (self.m_mn)
+            raise Exception (err_str)
+
+    #https://dbader.org/blog/python-repr-vs-str
+
+    def __str__(self):
+        ret = {
+                "--manifest"    : self.m_manifest_filepath,
+                "--output-root" : self.m_output_root,
+                "--num-workers" : self.m_num_workers,
+                "--verbose"     : self.m_debug,
+                "pipeline"      : str(self.m_pipeline_options)
+              }
+        return str(ret)
+
+#+------+
+#| MAIN |
+#+------+
+
+if __name__ == '__main__':
+
+    try:
+        g_module_name  = os.path.basename(__file__)
+
+        options = Options(g_module_name)
+        options.parse_cmdline()
+        in_m.enable_from_env()
+        if (options.debug):
+            _eprint("%s:debug:options:%s" %
+                    (g_module_name, str(options)))
+
+        pairs = read_manifest(options.manifest_filepath,
+                              options.output_root)
+
+        num_failed = 0
+
+        for pair, (lev_dist, err_str, stats) in \
+                zip(pairs, diff_pairs(pairs, options)):
+            in_m.add_summary(stats)
+            in_m.count("batch.pairs")
+            if (err_str == None):
+                print("%s %d" % (pair[2], lev_dist))
+            else:
+                num_failed = num_failed + 1
+                in_m.count("batch.failed")
+                print("%s -" % (pair[2]))
+                _eprint("%s:error:%s,%s:%s" %
+                        (g_module_name, pair[0], pair[1], err_str))
+
+        in_m.write_summary(g_module_name)
+
+    except:
+        traceback.print_exc()
+        sys.exit(1)
+
+    if (num_failed > 0):
+        sys.exit(2)
+
+    sys.exit(0)
@@ -0,0 +1,1017 @@
+#+---------+
+#| IMPORTS |
+#+---------+
+
+import os
+import sys
+import traceback
+import getopt
+import json
+import math
+import random
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+
+#+------------------+
+#| GLOBAL VARIABLES |
+#+------------------+
+
+g_module_name = None
+
+g_dirname = os.path.dirname(os.path.abspath(__file__))
+
+g_def_sizes           = [ 1000, 2000, 4000, 8000 ]
+g_def_wer             = 0.15
+g_def_jitter_ms       = 200
+g_def_missing_end_pct = 10
+g_def_seed            = 1
+g_def_repeats         = 1
+g_def_timeout_secs    = 600
+
+g_wpm           = 150       # speech rate of the synthetic reference
+g_min_cue_words = 3
+g_max_cue_words = 10
+g_min_gap_ms    = 200
+g_max_gap_ms    = 1500
+
+g_missing_end_str = "--:--:--:--"   # see srtdf_infer_endtime.sh
+
+# the stages of srt_diff.sh (as run by my_d_srtdiff.sh), then their
+# total and srtdf_pipeline.py that does all of them in one process
+
+g_shell_stages = [ "normalize", "infer_endtime", "compare_writer", "lev",
+                   "hist" ]
+g_total_stage    = "total"
+g_pipeline_stage = "pipeline"
+
+g_status_ok      = "ok"
+g_status_failed  = "failed"
+g_status_timeout = "timeout"
+g_status_skipped = "skipped"
+
+g_lev_columns = "ORG_TS,ORG_WORD,ORG_POS,ORG_ISSTOP,LEV_OP,TRAN_TS,TRAN_WORD,TRAN_POS,TRAN_ISSTOP,TS_DIFF"
+
+g_header = "SIZE,WER,JITTER_MS,MISSING_END_PCT,SEED,RUN,STAGE,ORG_WORDS,TRAN_WORDS,LEV_DISTANCE,STATUS,WALL_SECS,USER_SECS,SYS_SECS,MAX_RSS_KB"
+
+# the words of the synthetic srt files. a few common (stop) words and
+# pseudo words made of two syllables. the words are drawn with zipf
+# weights so that some of them repeat a lot, as in speech.
+
+g_stop_words = [ "the", "a", "of", "and", "to", "in", "is", "it", "that",
+                 "you", "we", "he", "was", "for", "on", "are", "with",
+                 "they", "be", "at" ]
+g_syllables  = [ "ka", "lo", "mi", "ten", "ra", "su", "do", "ve", "ni",
+                 "por", "ta", "gel", "bu", "sha", "fin", "mo", "ri", "zan",
+                 "pe", "tor", "lu", "ham", "ce", "dri" ]
+
+#+-----------+
+#| FUNCTIONS |
+#+-----------+
+
+def _eprint(*args, **kwargs):
+    print(*args, file=sys.stderr, flush=True, **kwargs)
+    #sys.stderr.flush()
+
+def usage():
+    format_str = """
+NAME
+
+    %s - measures the time and memory taken by each stage of srt-diff
+
+SYNOPSIS
+
+    %s [-n sizes] [-e wer] [-J jitter_ms] [-m missing_end_pct] [-s seed]
+       [-r repeats] [-T timeout_secs] [-d work_folder] [-G]
+       [-o output_filepath] [-F format] [-l language_model] [-M] [-P]
+       [-E engine] [-B band_ms] [-v] [-h]
+
+DESCRIPTION
+
+    Generates a synthetic pair of srt files (an original one and a
+    transcribed one) for each size and runs the stages of srt-diff
+    on it, as my_d_srtdiff.sh and srt_diff.sh do:
+
+        normalize       srtdf_utf8_base.sh on both files
+        infer_endtime   srtdf_infer_endtime.sh on both files
+        compare_writer  srtdf_srt_compare_writer.py
+        lev             srtdf_srt_lev.py -l -o srtlev.csv
+        hist            srtdf_lev_hist.sh on srtlev.csv
+
+    followed by srtdf_pipeline.py -I that does all of them in a single
+    process (the 'pipeline' stage). Each stage is run as a separate
+    process. Its wall clock time, its user and system cpu time and its
+    peak resident set size (of the process and its children, as
+    reported by wait4) are recorded. The 'total' stage adds up the
+    times of the srt_diff.sh stages and takes the largest peak rss.
+
+    The original file is made of cues of %d to %d words drawn from a
+    fixed vocabulary at %d words per minute. It begins with an utf-8
+    BOM and has '\\r\\n' line ends. The transcribed file is the same
+    speech where words are replaced, deleted or inserted in the
+    proportion wer, the times are moved by a normally distributed
+    jitter and the end times of missing_end_pct %% of the cues are
+    missing (%s, see srtdf_infer_endtime.sh). The files only depend
+    on the size and the options -e, -J, -m and -s.
+
+    A line is written for each size, run and stage in the format:
+
+    %s
+
+    SIZE is the number of words of the original file. LEV_DISTANCE
+    is the distance found by the lev stage (or by the pipeline stage
+    if the lev stage did not complete). STATUS is one of ok, failed,
+    timeout or skipped (an earlier stage did not complete). The times
+    are in seconds and MAX_RSS_KB in kilobytes.
+
+    A stage is killed if it takes longer than timeout_secs. The larger
+    sizes are then not run, as they would take longer.
+
+    With -F json a json object is written instead, with the options
+    ("config"), the lines as objects ("runs") and for each stage its
+    fastest wall time and peak rss for each size and the exponents
+    of the power laws fitted to them ("scaling"), over all the sizes
+    and over the two largest ones ("last_..."). An exponent close to 2
+    tells a stage whose time (or memory) is quadratic in the number of
+    words. As the start of the processes takes most of the time of the
+    small sizes, the exponents of the largest sizes tell it first.
+
+    The peak rss of a process includes the resident size of this
+    script when it starts the process (about 10 MB).
+
+OPTIONS
+
+    -n sizes
+       comma separated numbers of words of the original file.
+       this is optional. default is %s.
+
+    -e wer
+       the word error rate of the transcribed file (0 to 1).
+       this is optional. default is %s.
+
+    -J jitter_ms
+       the standard deviation of the jitter of the times of the cues
+       of the transcribed file.
+       this is optional. default is %d.
+
+    -m missing_end_pct
+       the percentage of the cues of the transcribed file without
+       an end time.
+       this is optional. default is %d.
+
+    -s seed
+       the seed of the random numbers.
+       this is optional. default is %d.
+
+    -r repeats
+       the number of times the stages are run for each size.
+       this is optional. default is %d.
+
+    -T timeout_secs
+       the time after which a stage is killed.
+       this is optional. default is %d.
+
+    -d work_folder
+       the folder where the srt files and the output of the stages are
+       kept (in a sub folder for each size).
+       this is optional. default is a temporary folder that is deleted
+       on exit.
+
+    -G
+       only generate the srt files, in the folder -d (that must be
+       specified). the stages are not run.
+       this is optional.
+
+    -o output_filepath
+       this is optional. default is stdout.
+
+    -F format
+       csv or json.
+       this is optional. default is csv.
+
+    -l language_model, -M, -P
+       passed to srtdf_srt_compare_writer.py and srtdf_pipeline.py.
+       this is optional.
+
+    -E engine, -B band_ms
+       passed to srtdf_srt_lev.py and srtdf_pipeline.py.
+       this is optional.
+
+    -v
+       print the progress and a scaling summary on stderr.
+       this is optional.
+
+    -h
+       Displays this help and quits.
+       This is optional.
+
+EXAMPLE
+
+    python3 %s -n 1000,2000,4000,8000,16000 -r 3 -v -F json -o bench.json
+
+"""
+    _eprint(format_str % (g_module_name, g_module_name,
+                          g_min_cue_words, g_max_cue_words, g_wpm,
+                          g_missing_end_str, g_header,
+                          ",".join(str(n) for n in g_def_sizes),
+                          g_def_wer, g_def_jitter_ms, g_def_missing_end_pct,
+                          g_def_seed, g_def_repeats, g_def_timeout_secs,
+                          g_module_name))
+
+
+def srt_time_str(ms):
+    ms = max(int(round(ms)), 0)
+    return "%02d:%02d:%02d,%03d" % (ms // 3600000, (ms // 60000) % 60,
+                                    (ms // 1000) % 60, ms % 1000)
+
+
+def new_vocabulary(rng):
+
+    # returns (words, weights)
+
+    pseudo_words = [ s1 + s2 for s1 in g_syllables for s2 in g_syllables
+                     if s1 != s2 ]
+    rng.shuffle(pseudo_words)
+
+    words   = g_stop_words + pseudo_words
+    weights = [ 1.0 / (rank + 1) for rank in range(len(words)) ]
+
+    return (words, weights)
+
+
+def gen_org_cues(rng, num_words, vocab):
+
+    # returns [ (start_ms, end_ms, words) ]
+
+    (words, weights) = vocab
+    word_ms = 60000.0 / g_wpm
+
+    cues     = []
+    start_ms = 1000.0
+    n        = 0
+    while (n < num_words):
+        cue_len   = min(rng.randint(g_min_cue_words, g_max_cue_words),
+                        num_words - n)
+        cue_words = rng.choices(words, weights, k = cue_len)
+        end_ms    = start_ms + cue_len * word_ms
+        cues.append((start_ms, end_ms, cue_words))
+        start_ms  = end_ms + rng.uniform(g_min_gap_ms, g_max_gap_ms)
+        n         = n + cue_len
+
+    return cues
+
+
+def gen_tran_cues(rng, org_cues, vocab, wer, jitter_ms):
+
+    # the speech of org_cues with a proportion wer of the words replaced
+    # (half of the errors), deleted or inserted (a quarter each) and the
+    # times jittered. cues left without a word are dropped.
+
+    (words, weights) = vocab
+
+    cues     = []
+    prev_end = 0.0
+    for (start_ms, end_ms, org_words) in org_cues:
+        cue_words = []
+        for word in org_words:
+            if (rng.random() >= wer):
+                cue_words.append(word)
+                continue
+            error = rng.random()
+            if (error < 0.5):
+                cue_words.append(rng.choices(words, weights)[0])
+            elif (error < 0.75):
+                cue_words.append(word)
+                cue_words.append(rng.choices(words, weights)[0])
+            # else the word is deleted
+
+        start_ms = max(start_ms + rng.gauss(0, jitter_ms), prev_end)
+        end_ms   = max(end_ms + rng.gauss(0, jitter_ms), start_ms + 1)
+
+        if (len(cue_words) > 0):
+            cues.append((start_ms, end_ms, cue_words))
+            prev_end = end_ms
+
+    return cues
+
+
+def cues_to_srt_str(cues, rng = None, missing_end_pct = 0,
+                    line_end = "\n", bom = ""):
+    lines = []
+    for (i, (start_ms, end_ms, words)) in enumerate(cues):
+        end_str = srt_time_str(end_ms)
+        if (rng != None and rng.random() * 100 < missing_end_pct):
+            end_str = g_missing_end_str
+        lines.append(str(i + 1))
+        lines.append("%s --> %s" % (srt_time_str(start_ms), end_str))
+        lines.append(" ".join(words))
+        lines.append("")
+
+    return bom + line_end.join(lines) + line_end
+
+
+def gen_srt_pair(num_words, wer, jitter_ms, missing_end_pct, seed):
+
+    # returns (org_srt_str, tran_srt_str, org_num_words, tran_num_words)
+
+    rng   = random.Random(seed * 1000003 + num_words)
+    vocab = new_vocabulary(rng)
+
+    org_cues  = gen_org_cues(rng, num_words, vocab)
+    tran_cues = gen_tran_cues(rng, org_cues, vocab, wer, jitter_ms)
+
+    org_str  = cues_to_srt_str(org_cues, line_end = "\r\n", bom = "\ufeff")
+    tran_str = cues_to_srt_str(tran_cues, rng, missing_end_pct)
+
+    return (org_str, tran_str,
+            sum(len(c[2]) for c in org_cues),
+            sum(len(c[2]) for c in tran_cues))
+
+
+def write_srt_pair(folder, srt_pair):
+
+    # returns the file paths of the original and the transcribed files
+
+    os.makedirs(folder, exist_ok = True)
+
+    filepaths = []
+    for (name, srt_str) in (("org.srt", srt_pair[0]),
+                            ("tran.srt", srt_pair[1])):
+        filepath = os.path.join(folder, name)
+        with open(filepath, "w", encoding = "utf-8", newline = "") as f:
+            f.write(srt_str)
+        filepaths.append(filepath)
+
+    return filepaths
+
+
+def run_process(cmd, stdin_filepath, stdout_filepath, stderr_filepath,
+                timeout_secs):
+
+    # runs cmd and returns a StageRun. the process is started in a
+    # session of its own so that the pipelines of the shell scripts
+    # are killed with it on a timeout.
+
+    stage_run = StageRun()
+
+    with open(stdin_filepath or os.devnull, "rb") as f_in, \
+         open(stdout_filepath or os.devnull, "wb") as f_out, \
+         open(stderr_filepath, "ab") as f_err:
+
+        start_time = time.perf_counter()
+        p = subprocess.Popen(cmd, stdin = f_in, stdout = f_out,
+                             stderr = f_err, start_new_session = True)
+
+        timed_out = []
+        def on_timeout():
+            timed_out.append(True)
+            os.killpg(p.pid, signal.SIGKILL)
+
+        timer = threading.Timer(timeout_secs, on_timeout)
+        timer.start()
+        try:
+            (pid, status, rusage) = os.wait4(p.pid, 0)
+        finally:
+            timer.cancel()
+
+        stage_run.wall_secs = time.perf_counter() - start_time
+        p.returncode        = os.WEXITSTATUS(status) \
+                              if os.WIFEXITED(status) else -1
+
+    stage_run.user_secs  = rusage.ru_utime
+    stage_run.sys_secs   = rusage.ru_stime
+    stage_run.max_rss_kb = rusage.ru_maxrss
+
+    if (len(timed_out) > 0):
+        stage_run.status = g_status_timeout
+    elif (p.returncode != 0):
+        stage_run.status = g_status_failed
+    else:
+        stage_run.status = g_status_ok
+
+    return stage_run
+
+
+def read_lev_distance(filepath):
+
+    # the distance at the beginning of the output of srt_lev
+    # (srtcomplev.txt) or of srtdf_pipeline.py. None if it is not there.
+
+    try:
+        with open(filepath, "r") as f:
+            return int(f.readline().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def power_law_exponent(sizes, values):
+
+    # the slope of the least squares line through (log size, log value)
+
+    points = [ (math.log(s), math.log(v)) for (s, v) in zip(sizes, values)
+               if (s > 0 and v > 0) ]
+    if (len(points) < 2):
+        return None
+
+    mean_x = sum(x for (x, y) in points) / len(points)
+    mean_y = sum(y for (x, y) in points) / len(points)
+    sxx    = sum((x - mean_x) ** 2 for (x, y) in points)
+    if (sxx == 0):
+        return None
+    sxy    = sum((x - mean_x) * (y - mean_y) for (x, y) in points)
+
+    return sxy / sxx
+
+#+---------+
+#| CLASSES |
+#+---------+
+
+class StageRun(object):
+
+    # the measures of one run of a stage
+
+    def __init__(self, status = g_status_skipped):
+        self.status     = status
+        self.wall_secs  = 0.0
+        self.user_secs  = 0.0
+        self.sys_secs   = 0.0
+        self.max_rss_kb = 0
+
+    def add(self, stage_run):
+
+        # adds up the times of stage_run and keeps the largest peak rss.
+        # the status is that of the first run that did not complete.
+
+        if (self.status == g_status_ok):
+            self.status = stage_run.status
+        self.wall_secs  = self.wall_secs + stage_run.wall_secs
+        self.user_secs  = self.user_secs + stage_run.user_secs
+        self.sys_secs   = self.sys_secs + stage_run.sys_secs
+        self.max_rss_kb = max(self.max_rss_kb, stage_run.max_rss_kb)
+
+
+class Bench(object):
+
+    # Runs the stages on the synthetic srt files of each size and
+    # collects a record (a dict keyed by the names of g_header) for each
+    # size, run and stage.
+
+    def __init__(self, module_name, options, work_folder):
+        self.m_mn          = module_name
+        self.m_options     = options
+        self.m_work_folder = work_folder
+        self.m_records     = []
+
+    @property
+    def records(self):
+        return self.m_records
+
+    def script_cmd(self, script_name, *args):
+        filepath = os.path.join(g_dirname, script_name)
+        if (script_name.endswith(".py")):
+            return [ "python3", filepath ] + list(args)
+        return [ "bash", filepath ] + list(args)
+
+    def writer_args(self):
+        args = []
+        if (self.m_options.lang_model != None):
+            args.extend([ "-l", self.m_options.lang_model ])
+        if (self.m_options.minimal_pipeline):
+            args.append("-M")
+        if (self.m_options.suppress_pos):
+            args.append("-P")
+        return args
+
+    def lev_args(self):
+        args = []
+        if (self.m_options.engine != None):
+            args.extend([ "-E", self.m_options.engine ])
+        if (self.m_options.band_ms != None):
+            args.extend([ "-B", str(self.m_options.band_ms) ])
+        return args
+
+    def shell_stage_cmds(self, folder, org_filepath, tran_filepath):
+
+        # returns [ (stage, [ (cmd, stdin_filepath, stdout_filepath) ]) ]
+
+        def path(name):
+            return os.path.join(folder, name)
+
+        return [
+            ("normalize", [
+                (self.script_cmd("srtdf_utf8_base.sh", org_filepath),
+                 None, path("1.norm.srt")),
+                (self.script_cmd("srtdf_utf8_base.sh", tran_filepath),
+                 None, path("2.norm.srt")) ]),
+            ("infer_endtime", [
+                (self.script_cmd("srtdf_infer_endtime.sh"),
+                 path("1.norm.srt"), path("1.iet.srt")),
+                (self.script_cmd("srtdf_infer_endtime.sh"),
+                 path("2.norm.srt"), path("2.iet.srt")) ]),
+            ("compare_writer", [
+                (self.script_cmd("srtdf_srt_compare_writer.py",
+                                 *(self.writer_args() +
+                                   [ path("1.iet.srt"), path("2.iet.srt") ])),
+                 None, path("srtcomp.txt")) ]),
+            ("lev", [
+                (self.script_cmd("srtdf_srt_lev.py",
+                                 *(self.lev_args() +
+                                   [ "-l", "-i", path("srtcomp.txt"),
+                                     "-o", path("srtlev.csv"),
+                                     "-C", g_lev_columns ])),
+                 None, path("srtcomplev.txt")) ]),
+            ("hist", [
+                (self.script_cmd("srtdf_lev_hist.sh", path("srtlev.csv")),
+                 None, path("levhist.csv")) ])
+        ]
+
+    def pipeline_cmd(self, folder, org_filepath, tran_filepath):
+        return self.script_cmd("srtdf_pipeline.py",
+                               *(self.writer_args() + self.lev_args() +
+                                 [ "-O", org_filepath, "-T", tran_filepath,
+                                   "-I", "-d", os.path.join(folder,
+                                                            "pipeline") ]))
+
+    def run_size(self, size):
+
+        # returns False if a stage timed out
+
+        options = self.m_options
+        folder  = os.path.join(self.m_work_folder, str(size))
+
+        srt_pair = gen_srt_pair(size, options.wer, options.jitter_ms,
+                                options.missing_end_pct, options.seed)
+        (org_filepath, tran_filepath) = write_srt_pair(folder, srt_pair)
+
+        if (options.generate_only):
+            return True
+
+        os.makedirs(os.path.join(folder, "pipeline"), exist_ok = True)
+        stderr_filepath = os.path.join(folder, "stderr.txt")
+
+        timed_out = False
+        for run in range(1, options.repeats + 1):
+            for name in ("srtcomplev.txt", "pipeline.txt"):
+                if (os.path.isfile(os.path.join(folder, name))):
+                    os.remove(os.path.join(folder, name))
+
+            stage_runs = []
+            total      = StageRun(g_status_ok)
+            failed     = False
+
+            for (stage, cmds) in self.shell_stage_cmds(folder, org_filepath,
+                                                       tran_filepath):
+                stage_run = StageRun(g_status_skipped if failed else
+                                     g_status_ok)
+                if (not failed):
+                    for (cmd, stdin_filepath, stdout_filepath) in cmds:
+                        stage_run.add(run_process(
+                                cmd, stdin_filepath, stdout_filepath,
+                                stderr_filepath, options.timeout_secs))
+                        if (stage_run.status != g_status_ok):
+                            break
+                failed = (stage_run.status != g_status_ok)
+                total.add(stage_run)
+                stage_runs.append((stage, stage_run))
+
+            stage_runs.append((g_total_stage, total))
+
+            pipeline_run = run_process(
+                    self.pipeline_cmd(folder, org_filepath, tran_filepath),
+                    None, os.path.join(folder, "pipeline.txt"),
+                    stderr_filepath, options.timeout_secs)
+            stage_runs.append((g_pipeline_stage, pipeline_run))
+
+            lev_distance = read_lev_distance(
+                    os.path.join(folder, "srtcomplev.txt"))
+            if (lev_distance == None):
+                lev_distance = read_lev_distance(
+                        os.path.join(folder, "pipeline.txt"))
+
+            for (stage, stage_run) in stage_runs:
+                self.m_records.append({
+                    "SIZE"            : size,
+                    "WER"             : options.wer,
+                    "JITTER_MS"       : options.jitter_ms,
+                    "MISSING_END_PCT" : options.missing_end_pct,
+                    "SEED"            : options.seed,
+                    "RUN"             : run,
+                    "STAGE"           : stage,
+                    "ORG_WORDS"       : srt_pair[2],
+                    "TRAN_WORDS"      : srt_pair[3],
+                    "LEV_DISTANCE"    : lev_distance,
+                    "STATUS"          : stage_run.status,
+                    "WALL_SECS"       : round(stage_run.wall_secs, 6),
+                    "USER_SECS"       : round(stage_run.user_secs, 6),
+                    "SYS_SECS"        : round(stage_run.sys_secs, 6),
+                    "MAX_RSS_KB"      : stage_run.max_rss_kb
+                })
+                if (stage_run.status == g_status_timeout):
+                    timed_out = True
+
+                if (options.verbose):
+                    _eprint("%s: size=%d run=%d stage=%s status=%s "
+                            "wall=%.3fs rss=%dkB" %
+                            (self.m_mn, size, run, stage, stage_run.status,
+                             stage_run.wall_secs, stage_run.max_rss_kb))
+
+            if (timed_out):
+                break
+
+        return (not timed_out)
+
+    def run(self):
+        for size in self.m_options.sizes:
+            if (not self.run_size(size)):
+                _eprint("%s: a stage timed out at size %d. the larger "
+                        "sizes are not run" % (self.m_mn, size))
+                break
+
+    def scaling(self):
+
+        # returns for each stage the sizes, the fastest wall time and the
+        # peak rss of the ok runs of each size and the fitted exponents,
+        # over all the sizes and over the two largest ones
+
+        ret = []
+        for stage in g_shell_stages + [ g_total_stage, g_pipeline_stage ]:
+            by_size = {}
+            for record in self.m_records:
+                if (record["STAGE"] != stage or
+                    record["STATUS"] != g_status_ok):
+                    continue
+                (wall, rss) = by_size.get(record["SIZE"], (None, 0))
+                if (wall == None or record["WALL_SECS"] < wall):
+                    wall = record["WALL_SECS"]
+                by_size[record["SIZE"]] = (wall,
+                                           max(rss, record["MAX_RSS_KB"]))
+
+            sizes = sorted(by_size.keys())
+            walls = [ by_size[s][0] for s in sizes ]
+            rsss  = [ by_size[s][1] for s in sizes ]
+            ret.append({
+                "stage"              : stage,
+                "sizes"              : sizes,
+                "wall_secs"          : walls,
+                "max_rss_kb"         : rsss,
+                "time_exponent"      : power_law_exponent(sizes, walls),
+                "rss_exponent"       : power_law_exponent(sizes, rsss),
+                "last_time_exponent" : power_law_exponent(sizes[-2:],
+                                                          walls[-2:]),
+                "last_rss_exponent"  : power_law_exponent(sizes[-2:],
+                                                          rsss[-2:])
+            })
+
+        return ret
+
+    def to_csv_str(self):
+        names = g_header.split(",")
+        lines = [ g_header ]
+        for record in self.m_records:
+            lines.append(",".join("" if record[name] == None
+                                  else str(record[name]) for name in names))
+        return "\n".join(lines) + "\n"
+
+    def to_json_str(self):
+        ret = {
+                "config"  : self.m_options.config(),
+                "runs"    : self.m_records,
+                "scaling" : self.scaling()
+              }
+        return json.dumps(ret, indent = 2) + "\n"
+
+
+class Options(object):
+    def __init__(self, module_name):
+        self.m_mn               = module_name
+        self.m_sizes            = g_def_sizes
+        self.m_wer              = g_def_wer
+        self.m_jitter_ms        = g_def_jitter_ms
+        self.m_missing_end_pct  = g_def_missing_end_pct
+        self.m_seed             = g_def_seed
+        self.m_repeats          = g_def_repeats
+        self.m_timeout_secs     = g_def_timeout_secs
+        self.m_work_folder      = None
+        self.m_generate_only    = False
+        self.m_output_filepath  = None
+        self.m_format           = "csv"
+        self.m_lang_model       = None
+        self.m_minimal_pipeline = False
+        self.m_suppress_pos     = False
+        self.m_engine           = None
+        self.m_band_ms          = None
+        self.m_verbose          = False
+
+    def to_number(self, name, v, cls = int, min_v = 0, max_v = None):
+        try:
+            n = cls(v)
+        except ValueError:
+            n = None
+        if (n == None or n < min_v or (max_v != None and n > max_v)):
+            err_str = "%s: invalid %s %s" % (self.m_mn, name, v)
+            raise Exception (err_str)
+        return n
+
+    @property
+    def sizes(self):
+        return self.m_sizes
+
+    @sizes.setter
+    def sizes(self, v):
+        self.m_sizes = [ self.to_number("size", s, int, 1)
+                         for s in v.split(",") ]
+
+    @property
+    def wer(self):
+        return self.m_wer
+
+    @wer.setter
+    def wer(self, v):
+        self.m_wer = self.to_number("wer", v, float, 0, 1)
+
+    @property
+    def jitter_ms(self):
+        return self.m_jitter_ms
+
+    @jitter_ms.setter
+    def jitter_ms(self, v):
+        self.m_jitter_ms = self.to_number("jitter_ms", v)
+
+    @property
+    def missing_end_pct(self):
+        return self.m_missing_end_pct
+
+    @missing_end_pct.setter
+    def missing_end_pct(self, v):
+        self.m_missing_end_pct = self.to_number("missing_end_pct", v,
+                                                int, 0, 100)
+
+    @property
+    def seed(self):
+        return self.m_seed
+
+    @seed.setter
+    def seed(self, v):
+        self.m_seed = self.to_number("seed", v)
+
+    @property
+    def repeats(self):
+        return self.m_repeats
+
+    @repeats.setter
+    def repeats(self, v):
+        self.m_repeats = self.to_number("repeats", v, int, 1)
+
+    @property
+    def timeout_secs(self):
+        return self.m_timeout_secs
+
+    @timeout_secs.setter
+    def timeout_secs(self, v):
+        self.m_timeout_secs = self.to_number("timeout_secs", v, float, 1)
+
+    @property
+    def work_folder(self):
+        return self.m_work_folder
+
+    @work_folder.setter
+    def work_folder(self, v):
+        self.m_work_folder = v
+
+    @property
+    def generate_only(self):
+        return self.m_generate_only
+
+    @generate_only.setter
+    def generate_only(self, v):
+        self.m_generate_only = v
+
+    @property
+    def output_filepath(self):
+        return self.m_output_filepath
+
+    @output_filepath.setter
+    def output_filepath(self, v):
+        self.m_output_filepath = v
+
+    @property
+    def format(self):
+        return self.m_format
+
+    @format.setter
+    def format(self, v):
+        if (v not in ("csv", "json")):
+            err_str = "%s: invalid format %s" % (self.m_mn, v)
+            raise Exception (err_str)
+        self.m_format = v
+
+    @property
+    def lang_model(self):
+        return self.m_lang_model
+
+    @lang_model.setter
+    def lang_model(self, v):
+        self.m_lang_model = v
+
+    @property
+    def minimal_pipeline(self):
+        return self.m_minimal_pipeline
+
+    @minimal_pipeline.setter
+    def minimal_pipeline(self, v):
+        self.m_minimal_pipeline = v
+
+    @property
+    def suppress_pos(self):
+        return self.m_suppress_pos
+
+    @suppress_pos.setter
+    def suppress_pos(self, v):
+        self.m_suppress_pos = v
+
+    @property
+    def engine(self):
+        return self.m_engine
+
+    @engine.setter
+    def engine(self, v):
+        self.m_engine = v
+
+    @property
+    def band_ms(self):
+        return self.m_band_ms
+
+    @band_ms.setter
+    def band_ms(self, v):
+        self.m_band_ms = self.to_number("band_ms", v, int, 1)
+
+    @property
+    def verbose(self):
+        return self.m_verbose
+
+    @verbose.setter
+    def verbose(self, v):
+        self.m_verbose = v
+
+    def parse_cmdline(self):
+        opts, args = \
+            getopt.getopt(sys.argv[1:],
+                    "n:e:J:m:s:r:T:d:Go:F:l:MPE:B:vh",
+                    [
+                      "sizes=",
+                      "wer=",
+                      "jitter-ms=",
+                      "missing-end-pct=",
+                      "seed=",
+                      "repeats=",
+                      "timeout-secs=",
+                      "work-folder=",
+                      "generate-only",
+                      "output=",
+                      "format=",
+                      "lang-model=",
+                      "minimal-pipeline",
+                      "suppress-pos",
+                      "engine=",
+                      "band-ms=",
+                      "verbose",
+                      "help"
+                    ])
+
+        for o, v in opts:
+            if o in ("-h", "--help"):
+                usage()
+                sys.exit(0)
+            elif o in ("-n", "--sizes"):
+                self.sizes = v
+            elif o in ("-e", "--wer"):
+                self.wer = v
+            elif o in ("-J", "--jitter-ms"):
+                self.jitter_ms = v
+            elif o in ("-m", "--missing-end-pct"):
+                self.missing_end_pct = v
+            elif o in ("-s", "--seed"):
+                self.seed = v
+            elif o in ("-r", "--repeats"):
+                self.repeats = v
+            elif o in ("-T", "--timeout-secs"):
+                self.timeout_secs = v
+            elif o in ("-d", "--work-folder"):
+                self.work_folder = v
+            elif o in ("-G", "--generate-only"):
+                self.generate_only = True
+            elif o in ("-o", "--output"):
+                self.output_filepath = v
+            elif o in ("-F", "--format"):
+                self.format = v
+            elif o in ("-l", "--lang-model"):
+                self.lang_model = v
+            elif o in ("-M", "--minimal-pipeline"):
+                self.minimal_pipeline = True
+            elif o in ("-P", "--suppress-pos"):
+                self.suppress_pos = True
+            elif o in ("-E", "--engine"):
+                self.engine = v
+            elif o in ("-B", "--band-ms"):
+                self.band_ms = v
+            elif o in ("-v", "--verbose"):
+                self.verbose = True
+
+        if (self.generate_only and self.work_folder == None):
+            err_str = "%s: -G requires -d" % (self.m_mn)
+            raise Exception (err_str)
+
+    def config(self):
+        # the options that the results depend on
+        return {
+                 "sizes"            : self.m_sizes,
+                 "wer"              : self.m_wer,
+                 "jitter_ms"        : self.m_jitter_ms,
+                 "missing_end_pct"  : self.m_missing_end_pct,
+                 "seed"             : self.m_seed,
+                 "repeats"          : self.m_repeats,
+                 "timeout_secs"     : self.m_timeout_secs,
+                 "lang_model"       : self.m_lang_model,
+                 "minimal_pipeline" : self.m_minimal_pipeline,
+                 "suppress_pos"     : self.m_suppress_pos,
+                 "engine"           : self.m_engine,
+                 "band_ms"          : self.m_band_ms
+               }
+
+    #https://dbader.org/blog/python-repr-vs-str
+
+    def __str__(self):
+        ret = {
+                "--sizes"            : self.m_sizes,
+                "--wer"              : self.m_wer,
+                "--jitter-ms"        : self.m_jitter_ms,
+                "--missing-end-pct"  : self.m_missing_end_pct,
+                "--seed"             : self.m_seed,
+                "--repeats"          : self.m_repeats,
+                "--timeout-secs"     : self.m_timeout_secs,
+                "--work-folder"      : self.m_work_folder,
+                "--generate-only"    : self.m_generate_only,
+                "--output"           : self.m_output_filepath,
+                "--format"           : self.m_format,
+                "--lang-model"       : self.m_lang_model,
+                "--minimal-pipeline" : self.m_minimal_pipeline,
+                "--suppress-pos"     : self.m_suppress_pos,
+                "--engine"           : self.m_engine,
+                "--band-ms"          : self.m_band_ms,
+                "--verbose"          : self.m_verbose
+              }
+        return str(ret)
+
+#+------+
+#| MAIN |
+#+------+
+
+if __name__ == '__main__':
+
+    try:
+        g_module_name  = os.path.basename(__file__)
+
+        options = Options(g_module_name)
+        options.parse_cmdline()
+
+        work_folder = options.work_folder
+        if (work_folder == None):
+            work_folder = tempfile.mkdtemp(prefix = "srtdf_bench_")
+
+        try:
+            bench = Bench(g_module_name, options, work_folder)
+            bench.run()
+        finally:
+            if (options.work_folder == None):
+                shutil.rmtree(work_folder, ignore_errors = True)
+
+        if (not options.generate_only):
+            if (options.format == "json"):
+                out_str = bench.to_json_str()
+            else:
+                out_str = bench.to_csv_str()
+
+            if (options.output_filepath != None):
+                with open(options.output_filepath, "w") as f:
+                    f.write(out_str)
+            else:
+                sys.stdout.write(out_str)
+
+            if (options.verbose):
+                _eprint("#--scaling--")
+                names = [ "time_exponent", "rss_exponent",
+                          "last_time_exponent", "last_rss_exponent" ]
+                for s in bench.scaling():
+                    _eprint("%-15s" % (s["stage"]) + "".join(
+                            " %s=%s" % (name, "NA" if s[name] == None
+                                              else "%.2f" % s[name])
+                            for name in names))
+
+    except:
+        traceback.print_exc()
+        sys.exit(1)
+
+    sys.exit(0)
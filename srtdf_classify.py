@@ -6,17 +6,27 @@ import os
 import sys
 import getopt
 import traceback
+
 import spacy
 
+import srtdf_nlp as nlp_m
+
 #+------------------+
 #| GLOBAL VARIABLES |
 #+------------------+
 
 g_module_name = None
-g_col_num = 5       # TRAN_WORD column number in srtlev.csv
+g_def_col_num = 5   # TRAN_WORD column number in srtlev.csv without a TRAN_WORD header
+g_col_num = None
 g_input = None
 g_model_name = "en_core_web_sm"
+g_pipeline = nlp_m.PIPELINE_FULL
+g_recompute = False
 g_debug = False
+g_nlp = None
+g_text_words = 64       # words per text run through the model
+g_batch_words = 8192    # words looked up with the model at a time
+g_batch_size = 256      # nlp.pipe batch size (texts)
 
 #+----------------------+
 #| FUNCTION DEFINITIONS |
@@ -34,7 +44,8 @@ NAME
 
 SYNOPSIS
 
-    {g_module_name} [-h]
+    {g_module_name} -i strlev_csv_filepath [-m model_name] [-M] [-R]
+       [-c tran_word_column_num] [-d] [-h]
 
 DESCRIPTION
 
@@ -43,6 +54,12 @@ DESCRIPTION
     columns of information IS_STOP,PART_OF_SPEECH and dumps 
     the output on stdout.
 
+    The file is read once. If it has the TRAN_POS and TRAN_ISSTOP 
+    columns (as srt_diff.sh writes them) their values are used. The
+    other words (those whose TRAN_POS is '{nlp_m.POS_UNKNOWN}', as written when the
+    part of speech was not computed) are classified with the model, in
+    batches of texts of {g_text_words} consecutive words.
+
 OPTIONS
 
     -i strlev_csv_filepath
@@ -55,11 +72,25 @@ OPTIONS
        the spacy model to be used to perform the classification.
        this is optional. default is {g_model_name}.
 
+    -M
+    --minimal-pipeline
+       load only the components of the spacy model that are needed
+       to arrive at the part of speech (tokenizer, tagger and attribute
+       ruler). the output is the same as that of the full pipeline.
+       this is optional. default is to load the full pipeline.
+
+    -R
+    --recompute
+       classify all the words with the model, ignoring the TRAN_POS
+       and TRAN_ISSTOP columns.
+       this is optional.
+
     -c tran_word_column_num
     --col-num tran_word_column_num
        an 1-offset integer that specifies the location of the 
        'transcribed word' column (TRANS_WORD).
-       this is optional. default is {g_col_num}.
+       this is optional. default is the TRAN_WORD column of the header
+       line, {g_def_col_num} if it has none.
 
     -d
        debug output is dumped to stderr.
@@ -72,51 +103,99 @@ OPTIONS
     eprint(usage_str)
 
 
-def emit_trans_phrase():
+def pos_id(pos_str):
 
-    header_line_seen = False
-    words = []
+    # returns the part of speech id (as token.pos) of a part of speech
+    # name (as token.pos_) in the TRAN_POS column. None if it is not a
+    # usable one: an unknown name or nlp_m.POS_UNKNOWN, which the writer
+    # puts when it does not compute the part of speech. unlike the tag
+    # X (other) of spacy, it is not the name of any part of speech.
 
-    with open(g_input, "r") as fp:
+    if (pos_str == nlp_m.POS_UNKNOWN):
+        return None
+    return spacy.parts_of_speech.IDS.get(pos_str) if pos_str else None
 
-        for line in fp:
 
-            line = line.rstrip('\n')
+def get_nlp():
 
-            if (line.startswith("#")):
-                continue
+    global g_nlp
 
-            if (not header_line_seen):
-                header_line_seen = True
-                continue
+    if (g_nlp == None):
+        g_nlp = nlp_m.load_nlp(g_model_name, g_pipeline, g_debug)
+    return g_nlp
 
-            fields = line.split(",")
-            trans_word = fields[g_col_num-1]
-            if (len(trans_word) > 0):
-                words.append(trans_word)
 
-    return " ".join(words)
+def classify_words(words):
 
+    # returns the (is_stop, pos) of each of the words. the words are
+    # joined into texts of at most g_text_words words that are run 
+    # through nlp.pipe. every word begins a token of its text (spacy 
+    # does not merge across spaces), so the token of a word is the one
+    # at its character offset.
 
-def classify(phrase):
+    texts   = []
+    offsets = []
+    for i in range(0, len(words), g_text_words):
+        chunk = words[i:i + g_text_words]
+        texts.append(" ".join(chunk))
+        pos = 0
+        for w in chunk:
+            offsets.append(pos)
+            pos = pos + len(w) + 1
 
-    nlp = spacy.load("en_core_web_sm")
-    nlp_doc = nlp(phrase)
+    classes = []
+    k = 0
+    for doc in get_nlp().pipe(texts, batch_size = g_batch_size):
+        by_offset = { token.idx : token for token in doc }
+        for _ in range(min(g_text_words, len(words) - k)):
+            token = by_offset[offsets[k]]
+            if (g_debug):
+                eprint (f"trans_word={words[k]}, token_text={token.text}")
+            classes.append((token.is_stop, token.pos))
+            k = k + 1
 
-    return nlp_doc
+    return classes
 
 
-def emit_classifiers(nlp_doc):
+def flush_rows(rows, fp):
 
-    line_num = 0
-    header_line_seen = False
-    token_index = 0
+    # rows are [line, word, classes] lists. the classes (is_stop, pos) 
+    # of the rows that have none are looked up with the model first.
+
+    missing = [ row for row in rows if row[1] and row[2] == None ]
+
+    if (len(missing) > 0):
+        for row, classes in zip(missing,
+                                classify_words([ r[1] for r in missing ])):
+            row[2] = classes
+
+    for (line, word, classes) in rows:
+        if (not word):
+            print(f"{line},,", file=fp)
+        else:
+            print(f"{line},{classes[0]},{classes[1]}", file=fp)
+
+    rows.clear()
+
+
+def emit_classifiers(fp = sys.stdout):
 
-    with open(g_input, "r") as fp:
+    # streams the srtlev.csv file once. the IS_STOP and PART_OF_SPEECH
+    # of a word are taken from its TRAN_ISSTOP and TRAN_POS columns if
+    # the file has them (unless -R), and from the model otherwise. rows
+    # are written out in batches of g_batch_words words to be looked up.
 
-        for line in fp:
+    global g_col_num
 
-            line_num = line_num + 1
+    header_line_seen = False
+    pos_col  = None
+    stop_col = None
+    rows     = []
+    num_missing = 0
+
+    with open(g_input, "r") as in_fp:
+
+        for line in in_fp:
 
             line = line.rstrip('\n')
 
@@ -124,29 +203,41 @@ def emit_classifiers(nlp_doc):
                 continue
 
             if (not header_line_seen):
-                print(f"{line},IS_STOP,PART_OF_SPEECH")
+                print(f"{line},IS_STOP,PART_OF_SPEECH", file=fp)
                 header_line_seen = True
+                col_names = line.split(",")
+                if (g_col_num == None):
+                    g_col_num = (col_names.index("TRAN_WORD") + 1
+                                 if "TRAN_WORD" in col_names 
+                                 else g_def_col_num)
+                if (not g_recompute and "TRAN_POS" in col_names and
+                    "TRAN_ISSTOP" in col_names):
+                    pos_col  = col_names.index("TRAN_POS")
+                    stop_col = col_names.index("TRAN_ISSTOP")
+                if (g_debug):
+                    eprint(f"reusing columns:{pos_col != None}")
                 continue
 
             fields = line.split(",")
             trans_word = fields[g_col_num-1]
+            classes = None
 
-            if (len(trans_word) == 0):
-                print(f"{line},,")
-                continue
+            if (trans_word and pos_col != None):
+                pos = pos_id(fields[pos_col])
+                if (pos != None and fields[stop_col] in ("True", "False")):
+                    classes = (fields[stop_col], pos)
 
-            nlp_token = nlp_doc[token_index]
-            nlp_text  = nlp_token.text.translate({ord(','): None})
-                #https://www.journaldev.com/23674/python-remove-character-from-string
+            if (trans_word and classes == None):
+                num_missing = num_missing + 1
 
-            if (g_debug):
-                eprint (f"line_num={line_num}, trans_word={trans_word}, token_text={nlp_token.text}, final_text={nlp_text}")
+            rows.append([ line, trans_word, classes ])
 
-            if (trans_word != nlp_text):
-                raise Exception(f"token mismatch. expected {trans_word} found {nlp_text} at line {line_num}")
+            if (num_missing >= g_batch_words or
+                len(rows) >= g_batch_words * 8):
+                flush_rows(rows, fp)
+                num_missing = 0
 
-            print(f"{line},{nlp_token.is_stop},{nlp_token.pos}")
-            token_index = token_index + 1
+    flush_rows(rows, fp)
 
 
 #+------+
@@ -161,11 +252,13 @@ if __name__ == '__main__':
         opts, args = \
             getopt.getopt(
                     sys.argv[1:], 
-                    "i:c:m:dh", 
+                    "i:c:m:MRdh", 
                     [
                         "input=",
                         "col-num=",
                         "model-name=",
+                        "minimal-pipeline",
+                        "recompute",
                         "debug",
                         "help" 
                     ])
@@ -180,6 +273,10 @@ if __name__ == '__main__':
                 g_col_num = int(v)
             elif o in ("-m", "--model-name"):
                 g_model_name = v
+            elif o in ("-M", "--minimal-pipeline"):
+                g_pipeline = nlp_m.PIPELINE_MINIMAL
+            elif o in ("-R", "--recompute"):
+                g_recompute = True
             elif o in ("-d", "--debug"):
                 g_debug = True
 
@@ -187,16 +284,7 @@ if __name__ == '__main__':
             eprint("-i option not specified")
             sys.exit(1)
 
-        phrase = emit_trans_phrase ()
-        if (g_debug):
-            eprint(f"phrase={phrase}")
-
-        nlp_doc = classify (phrase)
-        if (g_debug):
-            for token in nlp_doc:
-                eprint(token.text, token.pos_, token.tag_, token.dep_, token.is_stop)
-
-        emit_classifiers (nlp_doc)
+        emit_classifiers ()
 
     except:
         traceback.print_exc()
@@ -0,0 +1,65 @@
+#!/bin/bash
+
+set -u
+#set -x
+
+#----[globals]---------------------------------------------------------------
+
+DIRNAME=$(dirname $(readlink -e $0))
+BASENAME=$(basename $0)
+BARENAME=${BASENAME%%.*}
+UTESTNUM=${BARENAME##*_}
+UTESTDESC="runs srtdf_srt_lev.py with a time band"
+
+SAMPLE_SRT_DIFF_FILEPATH=$DIRNAME/sample_srt_diff.txt
+
+#----[temp files and termination]--------------------------------------------
+
+function fnxOnEnd
+{
+    tap_utest_ends
+
+    rm $TMP1 $TMP2 $TMP3
+}
+
+TMP1=`mktemp`
+TMP2=`mktemp`
+TMP3=`mktemp`
+
+trap 'fnxOnEnd;' 0 1 2 3 6 9 11
+
+#----[main]-----------------------------------------------------------------
+
+cd $DIRNAME
+export PATH=$PATH:$PWD
+
+source common_bash_functions.sh
+source common_tap_functions.sh
+source srtdf_d_utest_common_functions.sh
+
+tap_utest_begins
+
+#+-------------------------------------------------------+
+#| a 5 s band gives a larger distance, and the warning   |
+#| says by how much at most. a 20 s band gives the       |
+#| smallest one, and no warning.                         |
+#+-------------------------------------------------------+
+
+: > $TMP1
+for band_ms in 5000 20000
+do
+    cat $SAMPLE_SRT_DIFF_FILEPATH |\
+    python3 srtdf_srt_lev.py -B $band_ms -l 2>$TMP2 > $TMP3
+    echo "-B $band_ms: $(head -n 1 $TMP3)" >> $TMP1
+    cat $TMP2 >> $TMP1
+done
+
+if ! is_utest_output_ok $TMP1
+then
+    tap_utest_failed
+    exit 1
+fi
+
+tap_utest_passed
+exit 0
+
@@ -0,0 +1,70 @@
+#!/bin/bash
+
+set -u
+#set -x
+
+#----[globals]---------------------------------------------------------------
+
+DIRNAME=$(dirname $(readlink -e $0))
+BASENAME=$(basename $0)
+BARENAME=${BASENAME%%.*}
+UTESTNUM=${BARENAME##*_}
+UTESTDESC="runs srtdf_batch.py"
+
+ORG_SRT_FILEPATH=$DIRNAME/Ironman_1_1080i60.srt
+TRAN_SRT_FILEPATH=$DIRNAME/Ironman_sstt_withf.srt
+
+GOLD_FILEPATH=$DIRNAME/srtdf_d_utest_15.gold.txt
+
+#----[temp files and termination]--------------------------------------------
+
+function fnxOnEnd
+{
+    tap_utest_ends
+
+    rm $TMP1 $TMP2
+}
+
+TMP1=`mktemp`
+TMP2=`mktemp`
+
+trap 'fnxOnEnd;' 0 1 2 3 6 9 11
+
+#----[main]-----------------------------------------------------------------
+
+cd $DIRNAME
+export PATH=$PATH:$PWD
+
+source common_bash_functions.sh
+source common_tap_functions.sh
+source srtdf_d_utest_common_functions.sh
+
+cp $ORG_SRT_FILEPATH  /data
+cp $TRAN_SRT_FILEPATH /data
+
+tap_utest_begins
+
+cat <<EOD > $TMP1
+/data/$(basename $ORG_SRT_FILEPATH),/data/$(basename $TRAN_SRT_FILEPATH),utest15.1
+/data/$(basename $ORG_SRT_FILEPATH),/data/$(basename $TRAN_SRT_FILEPATH),utest15.2
+EOD
+
+python3 srtdf_batch.py \
+    -m $TMP1 \
+    -d "/data/foo" \
+    -j 2 > $TMP2
+
+for i in 1 2
+do
+    cat /data/foo/utest15.$i/levdist.txt >> $TMP2
+done
+
+if ! is_utest_output_ok $TMP2
+then
+    tap_utest_failed
+    exit 1
+fi
+
+tap_utest_passed
+exit 0
+
@@ -0,0 +1,82 @@
+#!/bin/bash
+
+set -u
+#set -x
+
+#----[globals]---------------------------------------------------------------
+
+DIRNAME=$(dirname $(readlink -e $0))
+BASENAME=$(basename $0)
+BARENAME=${BASENAME%%.*}
+UTESTNUM=${BARENAME##*_}
+UTESTDESC="runs srtdf_srt_compare_writer.py -F binary"
+
+ORG_SRT_FILEPATH=$DIRNAME/Ironman_1_1080i60.srt
+TRAN_SRT_FILEPATH=$DIRNAME/Ironman_sstt_withf.srt
+
+# the rendered binary output must be the text output of utest 03
+
+GOLD_FILEPATH=$DIRNAME/srtdf_d_utest_03.gold.txt
+
+#----[temp files and termination]--------------------------------------------
+
+function fnxOnEnd
+{
+    tap_utest_ends
+
+    rm $TMP1 $TMP2 $TMP3 $TMP4 $TMP5
+}
+
+TMP1=`mktemp`
+TMP2=`mktemp`
+TMP3=`mktemp`
+TMP4=`mktemp`
+TMP5=`mktemp`
+
+trap 'fnxOnEnd;' 0 1 2 3 6 9 11
+
+#----[main]-----------------------------------------------------------------
+
+cd $DIRNAME
+export PATH=$PATH:$PWD
+
+source common_bash_functions.sh
+source common_tap_functions.sh
+source srtdf_d_utest_common_functions.sh
+
+tap_utest_begins
+
+cat $TRAN_SRT_FILEPATH | grep -v '^#' > $TMP1
+
+if ! python3 srtdf_srt_compare_writer.py -F binary \
+                $ORG_SRT_FILEPATH $TMP1 >$TMP2
+then
+    tap_utest_diag_msg "srtdf_srt_compare_writer.py failed"
+    tap_utest_failed
+    exit 1
+fi
+
+# the rendered view of the binary format is the text format
+
+python3 srtdf_srt_compare_binary.py $TMP2 > $TMP3
+
+# srtdf_srt_lev.py reads both formats alike
+
+python3 srtdf_srt_lev.py -l -i $TMP2 > $TMP4
+python3 srtdf_srt_lev.py -l < $TMP3 > $TMP5
+
+if ! cmp -s $TMP4 $TMP5
+then
+    tap_utest_diag_msg "srtdf_srt_lev.py output differs between formats"
+    tap_utest_failed
+    exit 1
+fi
+
+if ! is_utest_output_ok $TMP3 $GOLD_FILEPATH
+then
+    tap_utest_failed
+    exit 1
+fi
+
+tap_utest_passed
+exit 0
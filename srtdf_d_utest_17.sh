@@ -0,0 +1,68 @@
+#!/bin/bash
+
+set -u
+#set -x
+
+#----[globals]---------------------------------------------------------------
+
+DIRNAME=$(dirname $(readlink -e $0))
+BASENAME=$(basename $0)
+BARENAME=${BASENAME%%.*}
+UTESTNUM=${BARENAME##*_}
+UTESTDESC="runs srtdf_lev_hist.py"
+
+SAMPLE_SRT_DIFF_FILEPATH=$DIRNAME/sample_srt_diff.txt
+
+#----[temp files and termination]--------------------------------------------
+
+function fnxOnEnd
+{
+    tap_utest_ends
+
+    rm $TMP1 $TMP2 $TMP3
+}
+
+TMP1=`mktemp`
+TMP2=`mktemp`
+TMP3=`mktemp`
+
+trap 'fnxOnEnd;' 0 1 2 3 6 9 11
+
+#----[main]-----------------------------------------------------------------
+
+cd $DIRNAME
+export PATH=$PATH:$PWD
+
+source common_bash_functions.sh
+source common_tap_functions.sh
+source srtdf_d_utest_common_functions.sh
+
+tap_utest_begins
+
+python3 srtdf_srt_lev.py -l -i $SAMPLE_SRT_DIFF_FILEPATH -o $TMP1 > /dev/null
+
+# a single file gives what srtdf_lev_hist.sh gives
+
+srtdf_lev_hist.sh $TMP1 > $TMP2
+python3 srtdf_lev_hist.py $TMP1 > $TMP3
+
+if ! cmp -s $TMP2 $TMP3
+then
+    tap_utest_diag_msg "srtdf_lev_hist.py and srtdf_lev_hist.sh differ"
+    tap_utest_failed
+    exit 1
+fi
+
+# per file and aggregate histograms
+
+python3 srtdf_lev_hist.py $TMP1 $TMP1 | sed "s|^$TMP1,|srtlev.csv,|" > $TMP2
+
+if ! is_utest_output_ok $TMP2
+then
+    tap_utest_failed
+    exit 1
+fi
+
+tap_utest_passed
+exit 0
+
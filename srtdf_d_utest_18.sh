@@ -0,0 +1,87 @@
+#!/bin/bash
+
+set -u
+#set -x
+
+#----[globals]---------------------------------------------------------------
+
+DIRNAME=$(dirname $(readlink -e $0))
+BASENAME=$(basename $0)
+BARENAME=${BASENAME%%.*}
+UTESTNUM=${BARENAME##*_}
+UTESTDESC="runs srtdf_srt_prepare.py"
+
+IN_SRT_FILEPATH=$DIRNAME/srtdf_d_utest_08c_in.srt
+
+# the python port must give the output of the shell scripts (utest 08c)
+
+GOLD_FILEPATH=$DIRNAME/srtdf_d_utest_08c.gold.txt
+
+OUT_SRT_FILEPATH=$DIRNAME/$BARENAME.out.srt
+DBG_SRT_FILEPATH=$DIRNAME/$BARENAME.dbg.csv
+
+#----[temp files and termination]--------------------------------------------
+
+function fnxOnEnd
+{
+    tap_utest_ends
+
+    rm $TMP1 $TMP2
+}
+
+TMP1=`mktemp`
+TMP2=`mktemp`
+
+trap 'fnxOnEnd;' 0 1 2 3 6 9 11
+
+#----[main]-----------------------------------------------------------------
+
+cd $DIRNAME
+export PATH=$PATH:$PWD
+
+source common_bash_functions.sh
+source common_tap_functions.sh
+source srtdf_d_utest_common_functions.sh
+
+tap_utest_begins
+
+rm -f $OUT_SRT_FILEPATH $DBG_SRT_FILEPATH
+
+#+--------------------------+
+#| run srtdf_srt_prepare.py |
+#+--------------------------+
+
+python3 srtdf_srt_prepare.py \
+    -t 1300 \
+    -w 250  \
+    -d      \
+    $IN_SRT_FILEPATH >$OUT_SRT_FILEPATH 2>$DBG_SRT_FILEPATH
+
+chmod +r $OUT_SRT_FILEPATH $DBG_SRT_FILEPATH
+
+#+---------------------------------------------------------+
+#| check that the output is that of the shell scripts      |
+#| (srtdf_utf8_base.sh piped into srtdf_infer_endtime.sh)  |
+#+---------------------------------------------------------+
+
+srtdf_utf8_base.sh $IN_SRT_FILEPATH |\
+srtdf_infer_endtime.sh \
+    -t 1300 \
+    -w 250  \
+    >$TMP1 2>/dev/null
+
+if ! cmp -s $TMP1 $OUT_SRT_FILEPATH
+then
+    diff $TMP1 $OUT_SRT_FILEPATH | sed 's/^/#/'
+    tap_utest_failed
+    exit 1
+fi
+
+if ! is_utest_output_ok $DBG_SRT_FILEPATH $GOLD_FILEPATH
+then
+    tap_utest_failed
+    exit 1
+fi
+
+tap_utest_passed
+exit 0
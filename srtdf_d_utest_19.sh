@@ -0,0 +1,77 @@
+#!/bin/bash
+
+set -u
+#set -x
+
+#----[globals]---------------------------------------------------------------
+
+DIRNAME=$(dirname $(readlink -e $0))
+BASENAME=$(basename $0)
+BARENAME=${BASENAME%%.*}
+UTESTNUM=${BARENAME##*_}
+UTESTDESC="runs srtdf_srt_reader.py"
+
+IN_SRT_FILEPATH=$DIRNAME/srtdf_d_utest_19_in.srt
+GOLD_FILEPATH=$DIRNAME/srtdf_d_utest_19.gold.txt
+
+OUT_FILEPATH=$DIRNAME/$BARENAME.out.txt
+
+#----[temp files and termination]--------------------------------------------
+
+function fnxOnEnd
+{
+    tap_utest_ends
+
+    rm $TMP1 $TMP2
+}
+
+TMP1=`mktemp`
+TMP2=`mktemp`
+
+trap 'fnxOnEnd;' 0 1 2 3 6 9 11
+
+#----[main]-----------------------------------------------------------------
+
+cd $DIRNAME
+export PATH=$PATH:$PWD
+
+source common_bash_functions.sh
+source common_tap_functions.sh
+source srtdf_d_utest_common_functions.sh
+
+tap_utest_begins
+
+rm -f $OUT_FILEPATH
+
+#+--------------------------------------------------------+
+#| run srtdf_srt_reader.py on the input as it is (BOM,    |
+#| '\r' characters, long hour fields, comments)           |
+#+--------------------------------------------------------+
+
+python3 srtdf_srt_reader.py -C $IN_SRT_FILEPATH >$OUT_FILEPATH
+
+chmod +r $OUT_FILEPATH
+
+#+-----------------------------------------------------+
+#| check that the output is that of the input reduced  |
+#| by srtdf_utf8_base.sh                               |
+#+-----------------------------------------------------+
+
+srtdf_utf8_base.sh $IN_SRT_FILEPATH >$TMP2
+python3 srtdf_srt_reader.py $TMP2 >$TMP1
+
+if ! cmp -s $TMP1 $OUT_FILEPATH
+then
+    diff $TMP1 $OUT_FILEPATH | sed 's/^/#/'
+    tap_utest_failed
+    exit 1
+fi
+
+if ! is_utest_output_ok $OUT_FILEPATH
+then
+    tap_utest_failed
+    exit 1
+fi
+
+tap_utest_passed
+exit 0
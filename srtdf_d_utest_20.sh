@@ -0,0 +1,87 @@
+#!/bin/bash
+
+set -u
+#set -x
+
+#----[globals]---------------------------------------------------------------
+
+DIRNAME=$(dirname $(readlink -e $0))
+BASENAME=$(basename $0)
+BARENAME=${BASENAME%%.*}
+UTESTNUM=${BARENAME##*_}
+UTESTDESC="runs srtdf_pipeline.py -S"
+
+ORG_SRT_FILEPATH=$DIRNAME/Ironman_1_1080i60.srt
+TRAN_SRT_FILEPATH=$DIRNAME/Ironman_sstt_withf.srt
+TRAN_2_SRT_FILEPATH=$DIRNAME/srtdf_d_utest_20_in.srt
+
+GOLD_FILEPATH=$DIRNAME/srtdf_d_utest_20.gold.txt
+
+OUT_FILEPATH=$DIRNAME/$BARENAME.out.txt
+STATE_FILEPATH=/data/foo/utest20.state.npz
+
+#----[temp files and termination]--------------------------------------------
+
+function fnxOnEnd
+{
+    tap_utest_ends
+
+    rm $TMP1
+}
+
+TMP1=`mktemp`
+
+trap 'fnxOnEnd;' 0 1 2 3 6 9 11
+
+#----[main]-----------------------------------------------------------------
+
+cd $DIRNAME
+export PATH=$PATH:$PWD
+
+source common_bash_functions.sh
+source common_tap_functions.sh
+source srtdf_d_utest_common_functions.sh
+
+tap_utest_begins
+
+rm -f $OUT_FILEPATH $STATE_FILEPATH
+
+#+----------------------------------------------------------+
+#| re-score the transcript, a changed version of it and the |
+#| transcript again with the same state file. each srtlev   |
+#| csv must be the one written without -S.                  |
+#+----------------------------------------------------------+
+
+RUN=0
+for TRAN in $TRAN_SRT_FILEPATH $TRAN_2_SRT_FILEPATH $TRAN_SRT_FILEPATH
+do
+    RUN=$((RUN + 1))
+
+    python3 srtdf_pipeline.py -O $ORG_SRT_FILEPATH -T $TRAN \
+        -d "/data/foo" -p "utest20.full." > $TMP1
+    python3 srtdf_pipeline.py -O $ORG_SRT_FILEPATH -T $TRAN \
+        -d "/data/foo" -p "utest20.inc." -S $STATE_FILEPATH > $TMP1
+
+    if cmp -s /data/foo/utest20.full.srtlev.csv /data/foo/utest20.inc.srtlev.csv
+    then
+        echo "run $RUN: same srtlev.csv" >> $OUT_FILEPATH
+    else
+        echo "run $RUN: different srtlev.csv" >> $OUT_FILEPATH
+    fi
+
+    if [[ -f $STATE_FILEPATH ]]
+    then
+        echo "run $RUN: state saved" >> $OUT_FILEPATH
+    fi
+done
+
+chmod +r $OUT_FILEPATH
+
+if ! is_utest_output_ok $OUT_FILEPATH
+then
+    tap_utest_failed
+    exit 1
+fi
+
+tap_utest_passed
+exit 0
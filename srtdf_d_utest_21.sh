@@ -0,0 +1,76 @@
+#!/bin/bash
+
+set -u
+#set -x
+
+#----[globals]---------------------------------------------------------------
+
+DIRNAME=$(dirname $(readlink -e $0))
+BASENAME=$(basename $0)
+BARENAME=${BASENAME%%.*}
+UTESTNUM=${BARENAME##*_}
+UTESTDESC="runs srtdf_classify.py on a srtlev.csv with TRAN_POS/TRAN_ISSTOP"
+
+IN_CSV_FILEPATH=$DIRNAME/srtdf_d_utest_21_in.csv
+NOPOS_CSV_FILEPATH=$DIRNAME/srtdf_d_utest_21_in.nopos.csv
+GOLD_FILEPATH=$DIRNAME/srtdf_d_utest_21.gold.txt
+
+OUT_FILEPATH=$DIRNAME/$BARENAME.out.txt
+
+#----[temp files and termination]--------------------------------------------
+
+function fnxOnEnd
+{
+    tap_utest_ends
+}
+
+trap 'fnxOnEnd;' 0 1 2 3 6 9 11
+
+#----[main]-----------------------------------------------------------------
+
+cd $DIRNAME
+export PATH=$PATH:$PWD
+
+source common_bash_functions.sh
+source common_tap_functions.sh
+source srtdf_d_utest_common_functions.sh
+
+tap_utest_begins
+
+rm -f $OUT_FILEPATH
+
+#+-----------------------------------------------------+
+#| the classes are those of the TRAN_POS/TRAN_ISSTOP   |
+#| columns, the model is not consulted                 |
+#+-----------------------------------------------------+
+
+python3 srtdf_classify.py -i $IN_CSV_FILEPATH >$OUT_FILEPATH
+
+#+-----------------------------------------------------+
+#| the words whose TRAN_POS is unknown (-P) are looked |
+#| up with the model. 'cannot' and 'gonna' are split   |
+#| by the tokenizer: the words after them must keep    |
+#| their own classes. X is a part of speech of its own.|
+#| the ids depend on the model, only their presence is |
+#| shown for the words looked up.                      |
+#+-----------------------------------------------------+
+
+python3 srtdf_classify.py -i $NOPOS_CSV_FILEPATH |
+    awk -F, '{
+        if ($8 == "?")
+            pos = ($12 ~ /^[0-9]+$/) ? "<id>" : $12
+        else
+            pos = $12
+        print $7 "," $8 "," $11 "," pos
+    }' >>$OUT_FILEPATH
+
+chmod +r $OUT_FILEPATH
+
+if ! is_utest_output_ok $OUT_FILEPATH
+then
+    tap_utest_failed
+    exit 1
+fi
+
+tap_utest_passed
+exit 0
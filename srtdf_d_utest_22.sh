@@ -0,0 +1,87 @@
+#!/bin/bash
+
+set -u
+#set -x
+
+#----[globals]---------------------------------------------------------------
+
+DIRNAME=$(dirname $(readlink -e $0))
+BASENAME=$(basename $0)
+BARENAME=${BASENAME%%.*}
+UTESTNUM=${BARENAME##*_}
+UTESTDESC="runs srtdf_srt_metrics.py on the details of srtdf_srt_lev.py"
+
+SAMPLE_SRT_DIFF_FILEPATH=$DIRNAME/sample_srt_diff.txt
+WEIGHTS_FILEPATH=$DIRNAME/srtdf_d_utest_22_weights.csv
+GOLD_FILEPATH=$DIRNAME/srtdf_d_utest_22.gold.txt
+
+OUT_FILEPATH=$DIRNAME/$BARENAME.out.txt
+
+#----[temp files and termination]--------------------------------------------
+
+function fnxOnEnd
+{
+    tap_utest_ends
+
+    rm $TMP1 $TMP2 $TMP3
+}
+
+TMP1=`mktemp`
+TMP2=`mktemp`
+TMP3=`mktemp`
+
+trap 'fnxOnEnd;' 0 1 2 3 6 9 11
+
+#----[main]-----------------------------------------------------------------
+
+cd $DIRNAME
+export PATH=$PATH:$PWD
+
+source common_bash_functions.sh
+source common_tap_functions.sh
+source srtdf_d_utest_common_functions.sh
+
+tap_utest_begins
+
+rm -f $OUT_FILEPATH
+
+cat $SAMPLE_SRT_DIFF_FILEPATH |\
+python3 srtdf_srt_lev.py \
+        -l \
+        -C "ORG_TS,ORG_WORD,ORG_POS,ORG_ISSTOP,LEV_OP,TRAN_TS,TRAN_WORD,TRAN_POS,TRAN_ISSTOP,TS_DIFF" \
+        -o $TMP1 > $TMP2
+
+#+------------------------------------------------------+
+#| the metrics recomputed from the csv must be those of |
+#| the '#--metrics--' section                           |
+#+------------------------------------------------------+
+
+python3 srtdf_srt_metrics.py $TMP1 |\
+    sed '1d' | cut -d',' -f2 > $TMP3
+
+sed '1,/#--metrics--/d' $TMP2 | awk '{print $NF}' > $OUT_FILEPATH
+
+if ! cmp -s $TMP3 $OUT_FILEPATH
+then
+    diff $TMP3 $OUT_FILEPATH | sed 's/^/#/'
+    tap_utest_failed
+    exit 1
+fi
+
+#+----------------------------------------------+
+#| two files, with a weight table of a file     |
+#+----------------------------------------------+
+
+python3 srtdf_srt_metrics.py -w pos -w $WEIGHTS_FILEPATH $TMP1 $TMP1 |\
+    sed "s#$TMP1#srtlev.csv#" > $OUT_FILEPATH
+
+chmod +r $OUT_FILEPATH
+
+if ! is_utest_output_ok $OUT_FILEPATH
+then
+    tap_utest_failed
+    exit 1
+fi
+
+tap_utest_passed
+exit 0
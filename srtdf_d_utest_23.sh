@@ -0,0 +1,106 @@
+#!/bin/bash
+
+set -u
+#set -x
+
+#----[globals]---------------------------------------------------------------
+
+DIRNAME=$(dirname $(readlink -e $0))
+BASENAME=$(basename $0)
+BARENAME=${BASENAME%%.*}
+UTESTNUM=${BARENAME##*_}
+UTESTDESC="runs srtdf_live_diff.py"
+
+ORG_SRT_FILEPATH=$DIRNAME/Ironman_1_1080i60.srt
+TRAN_SRT_FILEPATH=$DIRNAME/Ironman_sstt_withf.srt
+
+GOLD_FILEPATH=$DIRNAME/srtdf_d_utest_23.gold.txt
+
+OUT_FILEPATH=$DIRNAME/$BARENAME.out.txt
+
+#----[temp files and termination]--------------------------------------------
+
+function fnxOnEnd
+{
+    tap_utest_ends
+
+    rm $TMP1 $TMP2 $TMP3
+}
+
+TMP1=`mktemp`
+TMP2=`mktemp`
+TMP3=`mktemp`
+
+trap 'fnxOnEnd;' 0 1 2 3 6 9 11
+
+#----[main]-----------------------------------------------------------------
+
+cd $DIRNAME
+export PATH=$PATH:$PWD
+
+source common_bash_functions.sh
+source common_tap_functions.sh
+source srtdf_d_utest_common_functions.sh
+
+tap_utest_begins
+
+rm -f $OUT_FILEPATH
+
+python3 srtdf_pipeline.py -O $ORG_SRT_FILEPATH -T $TRAN_SRT_FILEPATH \
+    -d "/data/foo" -p "utest23." > /dev/null
+
+#+-------------------------------------------------------+
+#| the transcribed file from a pipe, aligned 100 words   |
+#| at a time                                             |
+#+-------------------------------------------------------+
+
+cat $TRAN_SRT_FILEPATH |\
+python3 srtdf_live_diff.py -O $ORG_SRT_FILEPATH -T - -m 100 \
+    -o $TMP1 > $TMP2
+
+if cmp -s /data/foo/utest23.srtlev.csv $TMP1
+then
+    echo "pipe: same srtlev.csv" >> $OUT_FILEPATH
+else
+    echo "pipe: different srtlev.csv" >> $OUT_FILEPATH
+fi
+grep "^pending words\|^unreached words" $TMP2 | tail -2 >> $OUT_FILEPATH
+
+#+-------------------------------------------------------+
+#| the transcribed file as it is written, an entry every |
+#| 50 ms                                                 |
+#+-------------------------------------------------------+
+
+: > $TMP3
+python3 -c "
+import sys, time
+entries = open(sys.argv[1]).read().split('\n\n')
+with open(sys.argv[2], 'a') as f:
+    for e in entries:
+        f.write(e + '\n\n')
+        f.flush()
+        time.sleep(0.05)
+" $TRAN_SRT_FILEPATH $TMP3 &
+
+python3 srtdf_live_diff.py -O $ORG_SRT_FILEPATH -T $TMP3 -x 3 -L 3000 \
+    -n 1 -o $TMP1 > $TMP2
+wait
+
+if cmp -s /data/foo/utest23.srtlev.csv $TMP1
+then
+    echo "file: same srtlev.csv" >> $OUT_FILEPATH
+else
+    echo "file: different srtlev.csv" >> $OUT_FILEPATH
+fi
+grep "^pending words\|^unreached words" $TMP2 | tail -2 >> $OUT_FILEPATH
+
+chmod +r $OUT_FILEPATH
+
+if ! is_utest_output_ok $OUT_FILEPATH
+then
+    tap_utest_failed
+    exit 1
+fi
+
+tap_utest_passed
+exit 0
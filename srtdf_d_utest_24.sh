@@ -0,0 +1,76 @@
+#!/bin/bash
+
+set -u
+#set -x
+
+#----[globals]---------------------------------------------------------------
+
+DIRNAME=$(dirname $(readlink -e $0))
+BASENAME=$(basename $0)
+BARENAME=${BASENAME%%.*}
+UTESTNUM=${BARENAME##*_}
+UTESTDESC="runs srtdf_bench.py"
+
+GOLD_FILEPATH=$DIRNAME/srtdf_d_utest_24.gold.txt
+
+OUT_FILEPATH=$DIRNAME/$BARENAME.out.txt
+
+#----[temp files and termination]--------------------------------------------
+
+function fnxOnEnd
+{
+    tap_utest_ends
+
+    rm -rf $TMP1 $TMP2
+}
+
+TMP1=`mktemp -d`
+TMP2=`mktemp`
+
+trap 'fnxOnEnd;' 0 1 2 3 6 9 11
+
+#----[main]-----------------------------------------------------------------
+
+cd $DIRNAME
+export PATH=$PATH:$PWD
+
+source common_bash_functions.sh
+source common_tap_functions.sh
+source srtdf_d_utest_common_functions.sh
+
+tap_utest_begins
+
+rm -f $OUT_FILEPATH
+
+#+-------------------------------------------------------+
+#| the synthetic srt files only depend on the size and   |
+#| the options                                           |
+#+-------------------------------------------------------+
+
+python3 srtdf_bench.py -G -d $TMP1 -n 40 -e 0.2 -J 300 -m 25 -s 7
+
+echo "org.srt: bom=$(head -c 3 $TMP1/40/org.srt | od -An -tx1 | tr -d ' ')" \
+     "crlf_lines=$(grep -c $'\r$' $TMP1/40/org.srt)" >> $OUT_FILEPATH
+cat $TMP1/40/org.srt | tr -d '\r' | sed '1s/^\xEF\xBB\xBF//' >> $OUT_FILEPATH
+echo "tran.srt:" >> $OUT_FILEPATH
+cat $TMP1/40/tran.srt >> $OUT_FILEPATH
+
+#+-------------------------------------------------------+
+#| the stages on two sizes. the times and the peak rss   |
+#| are left out                                          |
+#+-------------------------------------------------------+
+
+python3 srtdf_bench.py -n 40,80 -e 0.2 -J 300 -m 25 -s 7 > $TMP2
+
+cut -d, -f1-11 $TMP2 >> $OUT_FILEPATH
+
+chmod +r $OUT_FILEPATH
+
+if ! is_utest_output_ok $OUT_FILEPATH
+then
+    tap_utest_failed
+    exit 1
+fi
+
+tap_utest_passed
+exit 0
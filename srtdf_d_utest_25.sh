@@ -0,0 +1,121 @@
+#!/bin/bash
+
+set -u
+#set -x
+
+#----[globals]---------------------------------------------------------------
+
+DIRNAME=$(dirname $(readlink -e $0))
+BASENAME=$(basename $0)
+BARENAME=${BASENAME%%.*}
+UTESTNUM=${BARENAME##*_}
+UTESTDESC="writes the stats of srt_diff.sh -s, srtdf_pipeline.py and srtdf_batch.py"
+
+ORG_SRT_FILEPATH=$DIRNAME/Ironman_1_1080i60.srt
+TRAN_SRT_FILEPATH=$DIRNAME/Ironman_sstt_withf.srt
+
+GOLD_FILEPATH=$DIRNAME/srtdf_d_utest_25.gold.txt
+
+OUT_FILEPATH=$DIRNAME/$BARENAME.out.txt
+
+#----[temp files and termination]--------------------------------------------
+
+function fnxOnEnd
+{
+    tap_utest_ends
+
+    rm -rf $TMP1 $TMP2 $TMP3
+}
+
+TMP1=`mktemp`
+TMP2=`mktemp`
+TMP3=`mktemp -d`
+
+trap 'fnxOnEnd;' 0 1 2 3 6 9 11
+
+#----[helper functions]------------------------------------------------------
+
+function dump_stats
+{
+    # the parts of a stats.json that do not depend on the time taken
+
+    local _stats_filepath="$1"
+
+    python3 -c "
+import sys, json
+stats = json.load(open(sys.argv[1]))
+print('modules: ' + ' '.join(m['module'] for m in stats['modules']))
+print('spans: ' + ' '.join(sorted(stats['spans'])))
+for name in ('srt.files', 'srt.cues', 'nlp.docs', 'lev.words_1',
+             'lev.words_2', 'lev.cells'):
+    print('%s: %d' % (name, stats['counters'][name]))
+" $_stats_filepath
+}
+
+#----[main]-----------------------------------------------------------------
+
+cd $DIRNAME
+export PATH=$PATH:$PWD
+
+source common_bash_functions.sh
+source common_tap_functions.sh
+source srtdf_d_utest_common_functions.sh
+
+tap_utest_begins
+
+rm -f $OUT_FILEPATH
+
+#+-------------------------------------------------------+
+#| srt_diff.sh writes stats.json only with -s            |
+#+-------------------------------------------------------+
+
+rm -f /data/foo/utest25.stats.json
+
+srt_diff.sh -O $ORG_SRT_FILEPATH -T $TRAN_SRT_FILEPATH \
+    -d "/data/foo" -p "utest25." > /dev/null
+
+if [[ -f /data/foo/utest25.stats.json ]]
+then
+    echo "stats.json written without -s" >> $OUT_FILEPATH
+fi
+
+srt_diff.sh -O $ORG_SRT_FILEPATH -T $TRAN_SRT_FILEPATH \
+    -d "/data/foo" -p "utest25." -s > $TMP1
+
+echo "srt_diff.sh -s: $(cut -d ' ' -f 1 $TMP1)" >> $OUT_FILEPATH
+dump_stats /data/foo/utest25.stats.json >> $OUT_FILEPATH
+
+#+-------------------------------------------------------+
+#| srtdf_pipeline.py with the environment variable set   |
+#+-------------------------------------------------------+
+
+SRTDF_STATS_FILEPATH=$TMP2 \
+python3 srtdf_pipeline.py -O $ORG_SRT_FILEPATH -T $TRAN_SRT_FILEPATH \
+    -d "/data/foo" -p "utest25.p." > $TMP1
+
+echo "srtdf_pipeline.py: $(cut -d ' ' -f 1 $TMP1)" >> $OUT_FILEPATH
+dump_stats $TMP2 >> $OUT_FILEPATH
+
+#+-------------------------------------------------------+
+#| srtdf_batch.py adds what its workers record           |
+#+-------------------------------------------------------+
+
+echo "$ORG_SRT_FILEPATH,$TRAN_SRT_FILEPATH,pair1" >  $TMP3/manifest.csv
+echo "$ORG_SRT_FILEPATH,$TRAN_SRT_FILEPATH,pair2" >> $TMP3/manifest.csv
+
+SRTDF_STATS_FILEPATH=$TMP2 \
+python3 srtdf_batch.py -m $TMP3/manifest.csv -d $TMP3 -j 2 > $TMP1
+
+echo "srtdf_batch.py: $(cut -d ' ' -f 2 $TMP1 | paste -s -d ' ')" >> $OUT_FILEPATH
+dump_stats $TMP2 >> $OUT_FILEPATH
+
+chmod +r $OUT_FILEPATH
+
+if ! is_utest_output_ok $OUT_FILEPATH
+then
+    tap_utest_failed
+    exit 1
+fi
+
+tap_utest_passed
+exit 0
@@ -0,0 +1,81 @@
+#!/bin/bash
+
+set -u
+#set -x
+
+#----[globals]---------------------------------------------------------------
+
+DIRNAME=$(dirname $(readlink -e $0))
+BASENAME=$(basename $0)
+BARENAME=${BASENAME%%.*}
+UTESTNUM=${BARENAME##*_}
+UTESTDESC="runs srtdf_live_diff.py on transcribed entries out of order"
+
+ORG_SRT_FILEPATH=$DIRNAME/srtdf_d_utest_26_in.org.srt
+TRAN_SRT_FILEPATH=$DIRNAME/srtdf_d_utest_26_in.tran.srt
+
+GOLD_FILEPATH=$DIRNAME/srtdf_d_utest_26.gold.txt
+
+OUT_FILEPATH=$DIRNAME/$BARENAME.out.txt
+
+#----[temp files and termination]--------------------------------------------
+
+function fnxOnEnd
+{
+    tap_utest_ends
+
+    rm $TMP1
+}
+
+TMP1=`mktemp`
+
+trap 'fnxOnEnd;' 0 1 2 3 6 9 11
+
+#----[main]-----------------------------------------------------------------
+
+cd $DIRNAME
+export PATH=$PATH:$PWD
+
+source common_bash_functions.sh
+source common_tap_functions.sh
+source srtdf_d_utest_common_functions.sh
+
+tap_utest_begins
+
+rm -f $OUT_FILEPATH
+
+#+-------------------------------------------------------+
+#| the times of the transcribed entries go backwards     |
+#| every other entry, and a window of 6 words is smaller |
+#| than what is pending. it must not spin.               |
+#+-------------------------------------------------------+
+
+cat $TRAN_SRT_FILEPATH |\
+timeout -k 5 60 \
+python3 srtdf_live_diff.py -O $ORG_SRT_FILEPATH -T - -m 6 -L 0 > $TMP1
+echo "pipe: exit status $?" >> $OUT_FILEPATH
+grep "^levenshtein_distance\|^pending words\|^unreached words" $TMP1 |\
+    tail -3 >> $OUT_FILEPATH
+
+#+-------------------------------------------------------+
+#| the same, stopped with SIGTERM while the pipe is      |
+#| still open: the pending words are made final          |
+#+-------------------------------------------------------+
+
+( cat $TRAN_SRT_FILEPATH; sleep 20 ) |\
+timeout -k 5 15 \
+python3 srtdf_live_diff.py -O $ORG_SRT_FILEPATH -T - -m 6 -L 0 > $TMP1
+echo "sigterm: exit status $?" >> $OUT_FILEPATH
+grep "^levenshtein_distance\|^pending words\|^unreached words" $TMP1 |\
+    tail -3 >> $OUT_FILEPATH
+
+chmod +r $OUT_FILEPATH
+
+if ! is_utest_output_ok $OUT_FILEPATH
+then
+    tap_utest_failed
+    exit 1
+fi
+
+tap_utest_passed
+exit 0
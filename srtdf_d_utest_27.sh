@@ -0,0 +1,70 @@
+#!/bin/bash
+
+set -u
+#set -x
+
+#----[globals]---------------------------------------------------------------
+
+DIRNAME=$(dirname $(readlink -e $0))
+BASENAME=$(basename $0)
+BARENAME=${BASENAME%%.*}
+UTESTNUM=${BARENAME##*_}
+UTESTDESC="srtdf_batch.py -j 2 fails at once when the language model cannot be loaded"
+
+ORG_SRT_FILEPATH=$DIRNAME/Ironman_1_1080i60.srt
+TRAN_SRT_FILEPATH=$DIRNAME/Ironman_sstt_withf.srt
+
+GOLD_FILEPATH=$DIRNAME/srtdf_d_utest_27.gold.txt
+
+OUT_FILEPATH=$DIRNAME/$BARENAME.out.txt
+
+#----[temp files and termination]--------------------------------------------
+
+function fnxOnEnd
+{
+    tap_utest_ends
+
+    rm -rf $TMP1 $TMP2
+}
+
+TMP1=`mktemp`
+TMP2=`mktemp -d`
+
+trap 'fnxOnEnd;' 0 1 2 3 6 9 11
+
+#----[main]-----------------------------------------------------------------
+
+cd $DIRNAME
+export PATH=$PATH:$PWD
+
+source common_bash_functions.sh
+source common_tap_functions.sh
+source srtdf_d_utest_common_functions.sh
+
+tap_utest_begins
+
+rm -f $OUT_FILEPATH
+
+echo "$ORG_SRT_FILEPATH,$TRAN_SRT_FILEPATH,pair1" >  $TMP2/manifest.csv
+echo "$ORG_SRT_FILEPATH,$TRAN_SRT_FILEPATH,pair2" >> $TMP2/manifest.csv
+
+# the workers must not be started again and again: the timeout (rc 124
+# or 137) tells a hang from the failure expected (rc 1)
+
+timeout -k 10 120 \
+python3 srtdf_batch.py -m $TMP2/manifest.csv -d $TMP2 -j 2 \
+    -l /nonexistent_model > $TMP1 2> /dev/null
+
+echo "srtdf_batch.py -j 2 -l /nonexistent_model: rc=$?" >> $OUT_FILEPATH
+echo "pairs written: $(wc -l < $TMP1)" >> $OUT_FILEPATH
+
+chmod +r $OUT_FILEPATH
+
+if ! is_utest_output_ok $OUT_FILEPATH
+then
+    tap_utest_failed
+    exit 1
+fi
+
+tap_utest_passed
+exit 0
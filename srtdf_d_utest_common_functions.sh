@@ -1,8 +1,11 @@
 function is_utest_output_ok
 {
+    # the gold file is that of the utest unless it is given (a utest
+    # that must give the same output as another one)
+
     local _utest_output_filepath="$1"
 
-    local _gold_filepath=${BARENAME}.gold.txt
+    local _gold_filepath=${2:-${BARENAME}.gold.txt}
     local _failed_filepath=${BARENAME}.failed.txt
 
     if [[ ! -f $_utest_output_filepath ]]
@@ -0,0 +1,575 @@
+#+---------+
+#| IMPORTS |
+#+---------+
+
+import os
+import sys
+import traceback
+import getopt
+import io
+import json
+import time
+import signal
+import asyncio
+import multiprocessing
+
+import srtdf_srt_compare_writer as cw_m
+import srtdf_srt_lev as sl_m
+import srtdf_pipeline as pl_m
+import srtdf_lev_hist as lh_m
+import srtdf_instrument as in_m
+
+#+------------------+
+#| GLOBAL VARIABLES |
+#+------------------+
+
+g_module_name  = None
+g_def_host     = "127.0.0.1"
+g_def_port     = 8765
+g_max_body_len = 64 * 1024 * 1024
+
+g_http_reasons = {
+        200 : "OK",
+        400 : "Bad Request",
+        404 : "Not Found",
+        405 : "Method Not Allowed",
+        413 : "Payload Too Large",
+        500 : "Internal Server Error"
+    }
+
+#+-----------+
+#| FUNCTIONS |
+#+-----------+
+
+def _eprint(*args, **kwargs):
+    print(*args, file=sys.stderr, flush=True, **kwargs)
+    #sys.stderr.flush()
+
+def usage():
+    format_str = """
+NAME
+
+    %s - serves srt diff requests over a local socket
+
+SYNOPSIS
+
+    %s [-H host] [-p port] [-u unix_socket_path] [-j num_workers]
+       [-l language_model] [-M] [-P] [-c cache_dir] [-E engine]
+       [-B band_ms] [-v] [-h]
+
+DESCRIPTION
+
+    A resident service that compares srt files as srtdf_pipeline.py does.
+    The comparisons run in a pool of worker processes. Each worker loads
+    the language model when the service starts and keeps it for the
+    lifetime of the service, so a request pays only for the comparison.
+    Requests are accepted concurrently; as many are compared at a time
+    as there are workers.
+
+    The service speaks HTTP/1.1 (one request per connection) on the
+    host and port, or on the unix socket if -u is specified.
+
+    POST /diff
+       the body is a json object with the contents (not the paths) of
+       the srt files
+           { "org" : "1\\n00:00:01,600 --> ...", "tran" : "..." }
+       lines of "tran" that begin with '#' are ignored.
+       the response is a json object
+           { "distance"    : levenshtein_distance,
+             "srtlev_csv"  : "contents of srtlev.csv",
+             "levhist_csv" : "contents of levhist.csv" }
+
+    GET /health
+       the response is { "status" : "ok" }
+
+    GET /stats
+       the time spent in each stage and the counters of the requests so
+       far, the workers included (see srtdf_instrument.py). these are
+       recorded only if the environment variable SRTDF_STATS_FILEPATH
+       is set, and written on that file when the service stops.
+
+    Errors are reported with a 4xx or 5xx status and a json object
+    { "error" : "reason" }.
+
+EXAMPLES
+
+    %s -u /tmp/srtdf.sock &
+
+    jq -n --rawfile org ref.srt --rawfile tran tran.srt \\
+        '{org: $org, tran: $tran}' |\\
+    curl -s --unix-socket /tmp/srtdf.sock --data-binary @- \\
+        http://localhost/diff
+
+OPTIONS
+
+    -H host
+       the address to listen on.
+       this is optional. default is %s.
+
+    -p port
+       the port to listen on.
+       this is optional. default is %d.
+
+    -u unix_socket_path
+       listen on a unix socket instead of -H and -p.
+       this is optional.
+
+    -j num_workers
+       the number of worker processes.
+       this is optional. default is the number of cpus.
+
+    -l language_model, -M, -P, -c cache_dir
+       see srtdf_srt_compare_writer.py.
+       these are optional.
+
+    -E engine, -B band_ms
+       see srtdf_srt_lev.py.
+       these are optional.
+
+    -v
+       verbose mode. each request is logged on stderr.
+       this is optional.
+
+    -h
+       this help.
+       this is optional.
+"""
+    usage_str = format_str % (g_module_name, g_module_name, g_module_name,
+                              g_def_host, g_def_port)
+    _eprint(usage_str)
+
+
+def init_worker(module_name, options):
+
+    # runs once in each worker, and first in the server. loads the
+    # language model so that it is warm when the first request arrives.
+    # the server loads it before the pool is created: a model that
+    # cannot be loaded stops the daemon at once instead of making the
+    # pool start workers again and again.
+
+    global g_module_name
+    global g_options
+
+    g_module_name      = module_name
+    pl_m.g_module_name = module_name
+    cw_m.g_module_name = module_name
+    sl_m.g_module_name = module_name
+    lh_m.g_module_name = module_name
+    g_options          = options
+
+    cw_m.get_nlp(options.pipeline_options.writer_options)
+
+
+def init_pool_worker(module_name, options):
+
+    # the initializer of the workers of the pool. they are forked with
+    # the model the server loaded, and with what the server recorded.
+    # SIGINT is left to the server, which stops the pool.
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    in_m.clear()
+    init_worker(module_name, options)
+
+
+def diff_srt_texts(org_text, tran_text):
+
+    # runs in a worker. returns (response, stats), the response to a 
+    # /diff request and what the worker recorded since the previous one
+    # (see srtdf_instrument.take_summary).
+
+    response = _diff_srt_texts(org_text, tran_text)
+
+    return (response, in_m.take_summary(g_module_name))
+
+
+def _diff_srt_texts(org_text, tran_text):
+
+    options = g_options.pipeline_options
+
+    items_in_1 = pl_m.parse_srt_text(org_text)
+    items_in_2 = pl_m.parse_srt_text(tran_text, True)
+
+    csv_fp   = io.StringIO()
+    lev_dist = pl_m.diff_srt_items(items_in_1, items_in_2, options, csv_fp)
+    csv_str  = csv_fp.getvalue()
+
+    with in_m.span("lev.hist"):
+        levhist_str = lh_m.lev_hist(csv_str)
+
+    return {
+            "distance"    : lev_dist,
+            "srtlev_csv"  : csv_str,
+            "levhist_csv" : levhist_str
+           }
+
+#+---------+
+#| CLASSES |
+#+---------+
+
+class HttpError(Exception):
+
+    def __init__(self, status, reason):
+        Exception.__init__(self, reason)
+        self.m_status = status
+
+    @property
+    def status(self):
+        return self.m_status
+
+
+class SrtDiffServer(object):
+
+    def __init__(self, module_name, options, loop):
+        self.m_mn      = module_name
+        self.m_options = options
+        self.m_loop    = loop
+
+        init_worker(module_name, options)
+
+        self.m_pool    = multiprocessing.Pool(options.num_workers,
+                                              init_pool_worker,
+                                              (module_name, options))
+        self.m_server  = None
+
+    def run_in_pool(self, fnx, *args):
+
+        # returns an asyncio future for fnx(*args) run by a worker
+
+        future = self.m_loop.create_future()
+
+        def set_result(result):
+            if (not future.done()):
+                future.set_result(result)
+
+        def set_exception(e):
+            if (not future.done()):
+                future.set_exception(e)
+
+        self.m_pool.apply_async(
+            fnx, args,
+            callback = lambda result :
+                self.m_loop.call_soon_threadsafe(set_result, result),
+            error_callback = lambda e :
+                self.m_loop.call_soon_threadsafe(set_exception, e))
+
+        return future
+
+    async def read_request(self, reader):
+
+        # returns (method, path, body) of a http request
+
+        request_line = await reader.readline()
+        fields = request_line.decode("latin-1").split()
+        if (len(fields) != 3):
+            raise HttpError(400, "invalid request line")
+        (method, path, version) = fields
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if (line in (b"\r\n", b"\n", b"")):
+                break
+            (name, sep, value) = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            body_len = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise HttpError(400, "invalid content-length")
+        if (body_len < 0):
+            raise HttpError(400, "invalid content-length")
+        if (body_len > g_max_body_len):
+            raise HttpError(413, "body larger than %d bytes" %
+                                 (g_max_body_len))
+
+        body = await reader.readexactly(body_len)
+
+        return (method, path, body)
+
+    async def dispatch(self, method, path, body):
+
+        # returns the response (a json serializable object) to a request
+
+        if (path == "/health"):
+            if (method != "GET"):
+                raise HttpError(405, "use GET")
+            return { "status" : "ok" }
+
+        if (path == "/stats"):
+            if (method != "GET"):
+                raise HttpError(405, "use GET")
+            if (not in_m.is_enabled()):
+                raise HttpError(404, "%s is not set" % (in_m.g_env_var))
+            return in_m.merge_summaries([ in_m.summary(self.m_mn) ])
+
+        if (path != "/diff"):
+            raise HttpError(404, "unknown path %s" % (path))
+
+        if (method != "POST"):
+            raise HttpError(405, "use POST")
+
+        try:
+            request = json.loads(body.decode("utf-8"))
+        except ValueError as e:
+            raise HttpError(400, "invalid json: %s" % (str(e)))
+
+        if (not isinstance(request, dict) or
+            not isinstance(request.get("org"), str) or
+            not isinstance(request.get("tran"), str)):
+            raise HttpError(400, "expected the strings org and tran")
+
+        try:
+            (response, stats) = await self.run_in_pool(diff_srt_texts,
+                                                       request["org"],
+                                                       request["tran"])
+        except Exception as e:
+            raise HttpError(500, str(e))
+
+        in_m.add_summary(stats)
+
+        return response
+
+    async def handle_client(self, reader, writer):
+
+        with in_m.span("http.request"):
+            await self._handle_client(reader, writer)
+
+    async def _handle_client(self, reader, writer):
+
+        begin_s = time.time()
+        method  = "-"
+        path    = "-"
+
+        try:
+            (method, path, body) = await self.read_request(reader)
+            status   = 200
+            response = await self.dispatch(method, path, body)
+        except HttpError as e:
+            status   = e.status
+            response = { "error" : str(e) }
+        except asyncio.IncompleteReadError:
+            writer.close()
+            return
+        except Exception as e:
+            traceback.print_exc()
+            status   = 500
+            response = { "error" : str(e) }
+
+        in_m.count("http.requests")
+        if (status != 200):
+            in_m.count("http.errors")
+
+        payload = json.dumps(response).encode("utf-8")
+
+        writer.write(("HTTP/1.1 %d %s\r\n"
+                      "Content-Type: application/json\r\n"
+                      "Content-Length: %d\r\n"
+                      "Connection: close\r\n"
+                      "\r\n" % (status, g_http_reasons[status],
+                                len(payload))).encode("latin-1"))
+        writer.write(payload)
+
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+        if (self.m_options.debug):
+            _eprint("%s:debug:%s %s %d %.0f ms" %
+                    (self.m_mn, method, path, status,
+                     (time.time() - begin_s) * 1000))
+
+    def start(self):
+
+        if (self.m_options.unix_socket_path != None):
+            if (os.path.exists(self.m_options.unix_socket_path)):
+                os.remove(self.m_options.unix_socket_path)
+            coro = asyncio.start_unix_server(
+                        self.handle_client,
+                        path = self.m_options.unix_socket_path)
+        else:
+            coro = asyncio.start_server(
+                        self.handle_client,
+                        self.m_options.host, self.m_options.port)
+
+        self.m_server = self.m_loop.run_until_complete(coro)
+
+        if (self.m_options.debug):
+            _eprint("%s:debug:listening on %s" %
+                    (self.m_mn,
+                     str(self.m_server.sockets[0].getsockname())))
+
+    def stop(self):
+
+        if (self.m_server != None):
+            self.m_server.close()
+            self.m_loop.run_until_complete(self.m_server.wait_closed())
+
+        self.m_pool.terminate()
+        self.m_pool.join()
+
+        if (self.m_options.unix_socket_path != None and
+            os.path.exists(self.m_options.unix_socket_path)):
+            os.remove(self.m_options.unix_socket_path)
+
+
+class Options(object):
+
+    def __init__(self, module_name):
+        self.m_mn               = module_name
+        self.m_host             = g_def_host
+        self.m_port             = g_def_port
+        self.m_unix_socket_path = None
+        self.m_num_workers      = os.cpu_count() or 1
+        self.m_debug            = False
+
+        # options passed on to srtdf_pipeline.py for each request
+
+        self.m_pipeline_options = pl_m.Options(module_name)
+
+    @property
+    def host(self):
+        return self.m_host
+
+    @host.setter
+    def host(self, v):
+        self.m_host = v
+
+    @property
+    def port(self):
+        return self.m_port
+
+    @port.setter
+    def port(self, v):
+        self.m_port = v
+
+    @property
+    def unix_socket_path(self):
+        return self.m_unix_socket_path
+
+    @unix_socket_path.setter
+    def unix_socket_path(self, v):
+        self.m_unix_socket_path = v
+
+    @property
+    def num_workers(self):
+        return self.m_num_workers
+
+    @num_workers.setter
+    def num_workers(self, v):
+        if (v < 1):
+            err_str = "%s: invalid number of workers %d" % (self.m_mn, v)
+            raise Exception (err_str)
+        self.m_num_workers = v
+
+    @property
+    def debug(self):
+        return self.m_debug
+
+    @debug.setter
+    def debug(self, v):
+        self.m_debug = v
+
+    @property
+    def pipeline_options(self):
+        return self.m_pipeline_options
+
+    def parse_cmdline(self):
+        opts, args = \
+            getopt.getopt(sys.argv[1:],
+                    "H:p:u:j:l:MPc:E:B:vh",
+                    [
+                      "host=",
+                      "port=",
+                      "unix-socket=",
+                      "num-workers=",
+                      "lang-model=",
+                      "minimal-pipeline",
+                      "suppress-pos",
+                      "cache-dir=",
+                      "engine=",
+                      "band-ms=",
+                      "verbose",
+                      "help"
+                    ])
+
+        popt = self.m_pipeline_options
+
+        for o, v in opts:
+            if o in ("-h", "--help"):
+                usage()
+                sys.exit(0)
+            elif o in ("-H", "--host"):
+                self.host = v
+            elif o in ("-p", "--port"):
+                self.port = int(v)
+            elif o in ("-u", "--unix-socket"):
+                self.unix_socket_path = v
+            elif o in ("-j", "--num-workers"):
+                self.num_workers = int(v)
+            elif o in ("-l", "--lang-model"):
+                popt.writer_options.lang_model = v
+            elif o in ("-M", "--minimal-pipeline"):
+                popt.writer_options.minimal_pipeline = True
+            elif o in ("-P", "--suppress-pos"):
+                popt.writer_options.suppress_pos = True
+            elif o in ("-c", "--cache-dir"):
+                popt.writer_options.cache_dir = v
+            elif o in ("-E", "--engine"):
+                popt.lev_options.engine = v
+            elif o in ("-B", "--band-ms"):
+                popt.lev_options.band_ms = int(v)
+            elif o in ("-v", "--verbose"):
+                self.debug = True
+
+    #https://dbader.org/blog/python-repr-vs-str
+
+    def __str__(self):
+        ret = {
+                "--host"        : self.m_host,
+                "--port"        : self.m_port,
+                "--unix-socket" : self.m_unix_socket_path,
+                "--num-workers" : self.m_num_workers,
+                "--verbose"     : self.m_debug,
+                "pipeline"      : str(self.m_pipeline_options)
+              }
+        return str(ret)
+
+#+------+
+#| MAIN |
+#+------+
+
+if __name__ == '__main__':
+
+    try:
+        g_module_name  = os.path.basename(__file__)
+
+        options = Options(g_module_name)
+        options.parse_cmdline()
+        in_m.enable_from_env()
+        if (options.debug):
+            _eprint("%s:debug:options:%s" %
+                    (g_module_name, str(options)))
+
+        loop   = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        server = SrtDiffServer(g_module_name, options, loop)
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, loop.stop)
+
+        try:
+            server.start()
+            loop.run_forever()
+        finally:
+            server.stop()
+            loop.close()
+            in_m.write_summary(g_module_name)
+
+    except:
+        traceback.print_exc()
+        sys.exit(1)
+
+    sys.exit(0)
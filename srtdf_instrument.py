@@ -0,0 +1,457 @@
+#+---------+
+#| IMPORTS |
+#+---------+
+
+import os
+import sys
+import traceback
+import getopt
+import json
+import time
+import resource
+
+#+------------------+
+#| GLOBAL VARIABLES |
+#+------------------+
+
+g_module_name = None
+
+g_env_var = "SRTDF_STATS_FILEPATH"
+
+g_shell_module_name = "shell"   # the module of the spans given with -t
+
+# the state of the instrumentation of this process. nothing is recorded
+# unless enable() has been called.
+
+g_enabled        = False
+g_stats_filepath = None
+g_start_time     = None
+g_spans          = {}       # name -> [ count, secs ]
+g_counters       = {}       # name -> value
+
+#+-----------+
+#| FUNCTIONS |
+#+-----------+
+
+def _eprint(*args, **kwargs):
+    print(*args, file=sys.stderr, flush=True, **kwargs)
+    #sys.stderr.flush()
+
+def usage():
+    format_str = """
+NAME
+
+    %s - merges the instrumentation summaries of srt-diff runs
+
+SYNOPSIS
+
+    %s [-o output_filepath] [-t span_name=secs] ... [-h]
+       [summary_filepath ...]
+
+DESCRIPTION
+
+    The python modules of srt-diff time the stages of a run with span
+    timers and count what they process with counters. They do so only
+    when the environment variable %s holds the path of the file in
+    which they write their summary (in json) when they end. Otherwise
+    a span or a counter costs a function call.
+
+    The spans are
+
+        srt.read            reading and parsing the srt files
+        srt.prepare         normalizing them and inferring end times
+        nlp.load            loading the language model
+        nlp.pipe            tokenizing the texts with nlp.pipe
+        srtcomp.parse       reading a srt compare file (srt_lev)
+        lev.distance        the levenshtein alignment, including
+        lev.traceback       the walk back through the matrix
+        lev.details         writing the levenshtein details and metrics
+        lev.hist            the histogram of the levenshtein details
+        batch.pair          a pair of the manifest (srtdf_batch.py)
+        http.request        a request to srtdf_daemon.py
+        live.step           aligning the words of srtdf_live_diff.py
+                            and making them final
+
+    and the counters
+
+        srt.files, srt.bytes_read, srt.cues
+        nlp.docs, nlp.tokens
+        token_cache.hits, token_cache.misses
+        lev.words_1, lev.words_2
+        lev.cells           the cells of the matrix that are evaluated
+        output.bytes_written
+                            the bytes written in the output files (and
+                            on stdout if it is a file)
+        batch.pairs, batch.failed
+        http.requests, http.errors
+        live.cues, live.publishes
+
+    Spans may nest. A summary is as follows
+
+    {
+      "modules"  : [ { "module" : ..., "pid" : ..., "wall_secs" : ...,
+                       "max_rss_kb" : ...,
+                       "spans" : { name : { "count" : ...,
+                                            "secs"  : ... }, ... },
+                       "counters" : { name : value, ... } }, ... ],
+      "spans"    : { name : { "count" : ..., "secs" : ... }, ... },
+      "counters" : { name : value, ... }
+    }
+
+    where "spans" and "counters" add up those of the modules. The
+    wall_secs of a module are counted from the time it starts recording
+    (after its imports). The spans given with -t are those of a module
+    named 'shell'. srtdf_batch.py and srtdf_daemon.py add what their 
+    worker processes record to their own summary.
+
+    This script merges the summary files (of single modules or merged
+    ones) and the spans of -t into one summary, written in json on
+    output_filepath. srt_diff.sh -s uses it to write stats.json.
+
+OPTIONS
+
+    -o output_filepath
+       this is optional. default is stdout.
+
+    -t span_name=secs
+       adds a span that was timed outside python (the stages of the
+       shell scripts).
+       this is optional.
+
+    -h
+       Displays this help and quits.
+       This is optional.
+
+EXAMPLE
+
+    SRTDF_STATS_FILEPATH=/tmp/lev.json \\
+        python3 srtdf_srt_lev.py -l -i srtcomp.txt > srtcomplev.txt
+    python3 %s -t shell.lev=2.5 -o stats.json /tmp/lev.json
+
+"""
+    _eprint(format_str % (g_module_name, g_module_name, g_env_var,
+                          g_module_name))
+
+
+def enable(stats_filepath = None):
+
+    # starts recording. the summary is written on stats_filepath by
+    # write_summary.
+
+    global g_enabled, g_stats_filepath, g_start_time
+
+    g_enabled        = True
+    g_stats_filepath = stats_filepath
+    g_start_time     = time.perf_counter()
+
+
+def enable_from_env():
+
+    # enables the instrumentation if the environment variable g_env_var
+    # is set. returns whether it is enabled.
+
+    stats_filepath = os.environ.get(g_env_var)
+    if (stats_filepath):
+        enable(stats_filepath)
+
+    return g_enabled
+
+
+def is_enabled():
+    return g_enabled
+
+
+def count(name, n = 1):
+    if (not g_enabled):
+        return
+    g_counters[name] = g_counters.get(name, 0) + n
+
+
+def count_output_bytes(fp, name = "output.bytes_written"):
+
+    # counts the bytes written so far on fp. nothing is counted if fp
+    # cannot tell (a pipe or a terminal).
+
+    if (not g_enabled):
+        return
+    try:
+        fp.flush()
+        n = fp.tell()
+    except (OSError, ValueError):
+        return
+    count(name, n)
+
+
+def span(name):
+
+    # returns a context manager that adds the time spent in it to the
+    # span name
+
+    if (not g_enabled):
+        return g_null_span
+    return Span(name)
+
+
+def summary(module_name):
+
+    # returns the summary of the spans and counters of this process
+
+    return {
+             "module"     : module_name,
+             "pid"        : os.getpid(),
+             "wall_secs"  : round(time.perf_counter() - g_start_time, 6),
+             "max_rss_kb" : resource.getrusage(
+                                resource.RUSAGE_SELF).ru_maxrss,
+             "spans"      : { name : { "count" : c, "secs" : round(t, 6) }
+                              for (name, (c, t)) in sorted(g_spans.items()) },
+             "counters"   : dict(sorted(g_counters.items()))
+           }
+
+
+def clear():
+
+    # clears the spans and the counters recorded so far. a worker
+    # process forked by a parent that recorded some calls it first, so
+    # that they are not counted twice.
+
+    g_spans.clear()
+    g_counters.clear()
+
+
+def take_summary(module_name):
+
+    # returns the summary of what was recorded since the last call (None
+    # if disabled) and clears the spans and the counters. a worker 
+    # process returns it with its result so that the parent can add it
+    # to its own (see add_summary).
+
+    if (not g_enabled):
+        return None
+
+    s = summary(module_name)
+    clear()
+
+    return s
+
+
+def add_summary(s):
+
+    # adds the spans and the counters of the summary s of a module to
+    # those of this process
+
+    if (not g_enabled or s == None):
+        return
+
+    for (name, v) in s["spans"].items():
+        span = g_spans.get(name)
+        if (span == None):
+            g_spans[name] = [ v["count"], v["secs"] ]
+        else:
+            span[0] = span[0] + v["count"]
+            span[1] = span[1] + v["secs"]
+
+    for (name, v) in s["counters"].items():
+        count(name, v)
+
+
+def write_summary(module_name):
+
+    # writes the summary of this process on the file given to enable
+    # (if it was enabled)
+
+    if (not g_enabled or g_stats_filepath == None):
+        return
+
+    with open(g_stats_filepath, "w") as f:
+        json.dump(merge_summaries([ summary(module_name) ]), f, indent = 2)
+        f.write("\n")
+
+
+def merge_summaries(summaries, extra_spans = []):
+
+    # returns the summary of the summaries (of modules, or merged ones)
+    # and of the (name, secs) extra_spans. the extra spans are kept as
+    # the spans of a 'shell' module so that they are merged again with
+    # the summary.
+
+    modules = []
+    for s in summaries:
+        if ("modules" in s):
+            modules.extend(s["modules"])
+        else:
+            modules.append(s)
+
+    if (len(extra_spans) > 0):
+        shell_spans = {}
+        for (name, secs) in extra_spans:
+            (c, t) = shell_spans.get(name, (0, 0.0))
+            shell_spans[name] = (c + 1, t + secs)
+        modules.append({
+            "module"   : g_shell_module_name,
+            "spans"    : { name : { "count" : c, "secs" : round(t, 6) }
+                           for (name, (c, t)) in shell_spans.items() },
+            "counters" : {}
+        })
+
+    spans    = {}
+    counters = {}
+    for m in modules:
+        for (name, v) in m.get("spans", {}).items():
+            (c, t) = spans.get(name, (0, 0.0))
+            spans[name] = (c + v["count"], t + v["secs"])
+        for (name, v) in m.get("counters", {}).items():
+            counters[name] = counters.get(name, 0) + v
+
+    return {
+             "modules"  : modules,
+             "spans"    : { name : { "count" : c, "secs" : round(t, 6) }
+                            for (name, (c, t)) in sorted(spans.items()) },
+             "counters" : dict(sorted(counters.items()))
+           }
+
+
+def read_summary_file(filepath):
+    with open(filepath, "r") as f:
+        return json.load(f)
+
+#+---------+
+#| CLASSES |
+#+---------+
+
+class Span(object):
+
+    def __init__(self, name):
+        self.m_name = name
+
+    def __enter__(self):
+        self.m_start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        secs = time.perf_counter() - self.m_start_time
+        span = g_spans.get(self.m_name)
+        if (span == None):
+            g_spans[self.m_name] = [ 1, secs ]
+        else:
+            span[0] = span[0] + 1
+            span[1] = span[1] + secs
+        return False
+
+
+class NullSpan(object):
+
+    # the span of a disabled instrumentation
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        return False
+
+
+g_null_span = NullSpan()
+
+
+class Options(object):
+    def __init__(self, module_name):
+        self.m_mn                = module_name
+        self.m_output_filepath   = None
+        self.m_extra_spans       = []
+        self.m_summary_filepaths = []
+
+    @property
+    def output_filepath(self):
+        return self.m_output_filepath
+
+    @output_filepath.setter
+    def output_filepath(self, v):
+        self.m_output_filepath = v
+
+    @property
+    def extra_spans(self):
+        return self.m_extra_spans
+
+    def add_extra_span(self, v):
+        (name, sep, secs) = v.partition("=")
+        try:
+            secs = float(secs)
+        except ValueError:
+            secs = None
+        if (name == "" or sep == "" or secs == None):
+            err_str = "%s: invalid span %s" % (self.m_mn, v)
+            raise Exception (err_str)
+        self.m_extra_spans.append((name, secs))
+
+    @property
+    def summary_filepaths(self):
+        return self.m_summary_filepaths
+
+    def parse_cmdline(self):
+        opts, args = \
+            getopt.getopt(sys.argv[1:],
+                    "o:t:h",
+                    [
+                      "output=",
+                      "span=",
+                      "help"
+                    ])
+
+        for o, v in opts:
+            if o in ("-h", "--help"):
+                usage()
+                sys.exit(0)
+            elif o in ("-o", "--output"):
+                self.output_filepath = v
+            elif o in ("-t", "--span"):
+                self.add_extra_span(v)
+
+        for filepath in args:
+            if (not os.path.isfile(filepath)):
+                err_str = "%s: %s not present" % (self.m_mn, filepath)
+                raise Exception (err_str)
+            self.m_summary_filepaths.append(filepath)
+
+    #https://dbader.org/blog/python-repr-vs-str
+
+    def __str__(self):
+        ret = {
+                "--output" : self.m_output_filepath,
+                "--span"   : self.m_extra_spans,
+                "args"     : self.m_summary_filepaths
+              }
+        return str(ret)
+
+#+------+
+#| MAIN |
+#+------+
+
+if __name__ == '__main__':
+
+    try:
+        g_module_name  = os.path.basename(__file__)
+
+        options = Options(g_module_name)
+        options.parse_cmdline()
+
+        # an empty file is left out: the module that was to write it
+        # may have failed
+
+        summaries = [ read_summary_file(filepath)
+                      for filepath in options.summary_filepaths
+                      if os.path.getsize(filepath) > 0 ]
+
+        out_str = json.dumps(merge_summaries(summaries,
+                                             options.extra_spans),
+                             indent = 2) + "\n"
+
+        if (options.output_filepath != None):
+            with open(options.output_filepath, "w") as f:
+                f.write(out_str)
+        else:
+            sys.stdout.write(out_str)
+
+    except:
+        traceback.print_exc()
+        sys.exit(1)
+
+    sys.exit(0)
@@ -0,0 +1,368 @@
+#+---------+
+#| IMPORTS |
+#+---------+
+
+import os
+import sys
+import traceback
+import getopt
+import numpy as np
+
+#+------------------+
+#| GLOBAL VARIABLES |
+#+------------------+
+
+g_module_name = None
+
+g_def_range_spec = """
+BEGIN_I,END_E,NAME
+0,25,0000-0025-ms
+25,50,0025-0050-ms
+50,100,0050-0100-ms
+100,200,0100-0200-ms
+200,500,0200-0500-ms
+500,1000,0500-1000-ms
+1000,2000,1000-2000-ms
+2000,*,2000-****-ms
+"""
+
+g_aggregate_name = "*"      # the FILE of the aggregate histogram
+
+g_header      = "NAME,VALUE,NRECORDS"
+g_file_header = "FILE,NAME,VALUE,NRECORDS"
+
+#+-----------+
+#| FUNCTIONS |
+#+-----------+
+
+def _eprint(*args, **kwargs):
+    print(*args, file=sys.stderr, flush=True, **kwargs)
+    #sys.stderr.flush()
+
+def usage():
+    format_str = """
+NAME
+
+    %s - Dumps histogram values using srtlev.csv files.
+
+SYNOPSIS
+
+    %s [-r rangespec_filepath] [-s] [-h] [srtlev_filepath ...]
+
+DESCRIPTION
+
+    Does what srtdf_lev_hist.sh does, for any number of files, within
+    a single process.
+
+    The srtlev_filepath is the levenshtein details in csv format
+    generated by the srt_diff.sh script. if no srtlev_filepath is
+    specified, stdin is used. The histogram is that of the TS_DIFF
+    column (the last one). The header line and the records without a
+    TS_DIFF (deletions and insertions) are not counted.
+
+    The rangespec_filepath must be as follows
+    BEGIN_I, END_E, NAME
+    ......,  ....,  ....
+    ......,  ....,  ....
+    where BEGIN_I => range BEGIN Inclusive
+    and   END_E   => range END   Exclusive ('*' for no end)
+    i.e. [BEGIN_I, END_E[
+    The ranges may overlap or leave gaps.
+
+    The default rangespec_filepath is as follows:
+%s
+    The output for a single srtlev_filepath (or stdin) is
+
+    NAME,VALUE,NRECORDS
+    ....,.....,........
+
+    The output for more than one srtlev_filepath is
+
+    FILE,NAME,VALUE,NRECORDS
+    ....,....,.....,........
+
+    with the rows of each file in the order of the arguments, followed
+    by those of the aggregate histogram of all the files, the FILE of
+    which is '%s'.
+
+OPTIONS
+
+    -r  rangespec_filepath
+        this is optional.
+
+    -s
+        summary. only the aggregate histogram is output, in the format
+        of a single file.
+        this is optional.
+
+    -h
+        Displays this help and quits.
+        This is optional.
+"""
+    usage_str = format_str % (g_module_name, g_module_name,
+                              "\n".join([ "    " + line for line in
+                                          g_def_range_spec.split("\n") ]),
+                              g_aggregate_name)
+    _eprint(usage_str)
+
+
+def read_range_spec_file(filepath):
+    with open(filepath) as f:
+        return RangeSpec(g_module_name, f.read(), filepath)
+
+
+def read_ts_diffs(lines):
+
+    # returns the TS_DIFF values of the lines of a srtlev.csv as a numpy
+    # array. TS_DIFF is the last column, which is empty for deletions and
+    # insertions. the header line is left out.
+
+    values = [ line.rstrip("\r\n").rpartition(",")[2] for line in lines ]
+    values = [ v for v in values if v != "" ]
+
+    if (values):
+        try:
+            float(values[0])
+        except ValueError:
+            values = values[1:]     # the header
+
+    return np.array(values, dtype = np.float64)
+
+
+def read_ts_diffs_file(filepath):
+
+    # the TS_DIFF values of a srtlev.csv file, or of stdin if filepath
+    # is None
+
+    if (filepath == None):
+        return read_ts_diffs(sys.stdin)
+
+    with open(filepath) as f:
+        return read_ts_diffs(f)
+
+
+def lev_hist(csv_str, range_spec = None):
+
+    # returns what srtdf_lev_hist.sh outputs for the srtlev.csv contents
+
+    if (range_spec == None):
+        range_spec = RangeSpec(g_module_name)
+
+    ts_diffs = read_ts_diffs(csv_str.split("\n"))
+    return range_spec.to_csv_string(range_spec.histogram(ts_diffs),
+                                    len(ts_diffs))
+
+
+def lev_hist_file(srtlev_filepath, hist_filepath, range_spec = None):
+
+    # writes the histogram of a srtlev.csv file on hist_filepath
+
+    if (range_spec == None):
+        range_spec = RangeSpec(g_module_name)
+
+    ts_diffs = read_ts_diffs_file(srtlev_filepath)
+
+    with open(hist_filepath, "w") as f:
+        f.write(range_spec.to_csv_string(range_spec.histogram(ts_diffs),
+                                         len(ts_diffs)))
+
+#+---------+
+#| CLASSES |
+#+---------+
+
+class RangeSpec(object):
+
+    # the buckets of a rangespec file
+
+    def __init__(self, module_name, spec_str = g_def_range_spec,
+                 filepath = "default rangespec"):
+
+        self.m_mn    = module_name
+        self.m_names = []
+        begins       = []
+        ends         = []
+
+        header_seen = False
+        for line_num, line in enumerate(spec_str.split("\n"), 1):
+            if (line.strip() == ""):
+                continue
+            if (not header_seen):
+                header_seen = True
+                continue
+
+            tokens = line.split(",")
+            if (len(tokens) != 3):
+                err_str = "%s: %d tokens found at line %d in %s" % \
+                            (self.m_mn, len(tokens), line_num, filepath)
+                raise Exception (err_str)
+
+            try:
+                begins.append(float(tokens[0]))
+                if (tokens[1].strip() == "*"):
+                    ends.append(np.inf)
+                else:
+                    ends.append(float(tokens[1]))
+            except ValueError:
+                err_str = "%s: invalid range at line %d in %s" % \
+                            (self.m_mn, line_num, filepath)
+                raise Exception (err_str)
+
+            self.m_names.append(tokens[2])
+
+        if (len(self.m_names) == 0):
+            err_str = "%s: no records found in %s" % (self.m_mn, filepath)
+            raise Exception (err_str)
+
+        self.m_begins = np.array(begins)
+        self.m_ends   = np.array(ends)
+
+    @property
+    def names(self):
+        return self.m_names
+
+    def histogram(self, ts_diffs):
+
+        # returns the number of ts_diffs in each bucket. the ts_diffs are
+        # sorted once, after which each bucket is two binary searches.
+
+        ts_diffs = np.sort(ts_diffs)
+        counts   = np.searchsorted(ts_diffs, self.m_ends, "left") - \
+                   np.searchsorted(ts_diffs, self.m_begins, "left")
+        return np.maximum(counts, 0)
+
+    def to_csv_lines(self, counts, num_records, filename = None):
+
+        # the rows of the histogram (see g_header). the FILE column (see
+        # g_file_header) is added if filename is not None.
+
+        rows = [ "%s,%d,%d" % (name, count, num_records)
+                 for name, count in zip(self.m_names, counts.tolist()) ]
+
+        if (filename != None):
+            rows = [ "%s,%s" % (filename, row) for row in rows ]
+
+        return rows
+
+    def to_csv_string(self, counts, num_records):
+
+        # the histogram in the format of srtdf_lev_hist.sh
+
+        return "\n".join([ g_header ] + 
+                         self.to_csv_lines(counts, num_records)) + "\n"
+
+
+class Options(object):
+    def __init__(self, module_name):
+        self.m_mn                  = module_name
+        self.m_range_spec_filepath = None
+        self.m_summary             = False
+        self.m_srtlev_filepaths    = []
+
+    @property
+    def range_spec_filepath(self):
+        return self.m_range_spec_filepath
+
+    @range_spec_filepath.setter
+    def range_spec_filepath(self, v):
+        if (not os.path.isfile(v)):
+            err_str = "%s: %s not present" % (self.m_mn, v)
+            raise Exception (err_str)
+        self.m_range_spec_filepath = v
+
+    @property
+    def summary(self):
+        return self.m_summary
+
+    @summary.setter
+    def summary(self, v):
+        self.m_summary = v
+
+    @property
+    def srtlev_filepaths(self):
+        return self.m_srtlev_filepaths
+
+    def parse_cmdline(self):
+        opts, args = \
+            getopt.getopt(sys.argv[1:],
+                    "r:sh",
+                    [
+                      "range-spec=",
+                      "summary",
+                      "help"
+                    ])
+
+        for o, v in opts:
+            if o in ("-h", "--help"):
+                usage()
+                sys.exit(0)
+            elif o in ("-r", "--range-spec"):
+                self.range_spec_filepath = v
+            elif o in ("-s", "--summary"):
+                self.summary = True
+
+        for filepath in args:
+            if (not os.path.isfile(filepath)):
+                err_str = "%s: %s not present" % (self.m_mn, filepath)
+                raise Exception (err_str)
+            self.m_srtlev_filepaths.append(filepath)
+
+    #https://dbader.org/blog/python-repr-vs-str
+
+    def __str__(self):
+        ret = {
+                "--range-spec" : self.m_range_spec_filepath,
+                "--summary"    : self.m_summary,
+                "args"         : self.m_srtlev_filepaths
+              }
+        return str(ret)
+
+#+------+
+#| MAIN |
+#+------+
+
+if __name__ == '__main__':
+
+    try:
+        g_module_name  = os.path.basename(__file__)
+
+        options = Options(g_module_name)
+        options.parse_cmdline()
+
+        if (options.range_spec_filepath != None):
+            range_spec = read_range_spec_file(options.range_spec_filepath)
+        else:
+            range_spec = RangeSpec(g_module_name)
+
+        filepaths = options.srtlev_filepaths
+        if (len(filepaths) == 0):
+            filepaths = [ None ]        # stdin
+
+        counts_total  = np.zeros(len(range_spec.names), dtype = np.int64)
+        records_total = 0
+        out_lines     = []
+
+        for filepath in filepaths:
+            ts_diffs = read_ts_diffs_file(filepath)
+            counts   = range_spec.histogram(ts_diffs)
+
+            counts_total  = counts_total + counts
+            records_total = records_total + len(ts_diffs)
+
+            if (len(filepaths) > 1 and not options.summary):
+                out_lines.extend(range_spec.to_csv_lines(
+                        counts, len(ts_diffs), filepath))
+
+        if (len(filepaths) > 1 and not options.summary):
+            out_lines.extend(range_spec.to_csv_lines(
+                    counts_total, records_total, g_aggregate_name))
+            sys.stdout.write("\n".join([ g_file_header ] + out_lines) + 
+                             "\n")
+        else:
+            sys.stdout.write(range_spec.to_csv_string(counts_total,
+                                                      records_total))
+
+    except:
+        traceback.print_exc()
+        sys.exit(1)
+
+    sys.exit(0)
@@ -66,7 +66,9 @@ DETAILS
 
     The srtlev_filepath is the levenshtein details in csv format
     generated by the srt_diff.sh script. if srtlev_filepath is not 
-    specified, stdin is used.
+    specified, stdin is used. its header line is not counted.
+
+    srtdf_lev_hist.py does the same for any number of files at once.
 
     The rangespec_filepath must be as follows
     BEGIN_I, END_E, NAME
@@ -187,7 +189,7 @@ fi
 #+-------------------------+
 
 cat $OPT_SRT_LEV_FILE_PATH  |\
-gawk -F ',' '{ print $10; }' |\
+gawk -F ',' 'NR > 1 { print $10; }' |\
 gawk -F ',' \
      -v v_rangespec_filepath=$OPT_RANGE_SPEC_FILE_PATH \
      -v v_debug=$OPT_DEBUG \
@@ -1,8 +1,12 @@
 import os
 import sys
 import traceback
+import array
+import multiprocessing
 import numpy as np
 
+import srtdf_instrument as in_m
+
 #+----------------------------------+
 #| Original source : sashis-lv-3.py |
 #+----------------------------------+
@@ -19,8 +23,15 @@ class Levenshtein(object):
     OP_DELETE = 'D'
     OP_INSERT = 'I'
 
+    OPB_NONE   = ord(OP_NONE)
+    OPB_MATCH  = ord(OP_MATCH)
+    OPB_SUBST  = ord(OP_SUBST)
+    OPB_DELETE = ord(OP_DELETE)
+    OPB_INSERT = ord(OP_INSERT)
+
     # intmd_state stores the operation 'applied' at [i,j]
-    # intmd_state is len(s1)*len(s2) 2-D matrix
+    # intmd_state is (len(s1)+1)*(len(s2)+1) 2-D matrix stored row after
+    # row in a bytearray, one byte (OPB_*) per element
     # Each elements of 2-d array can take one of the following values
     #   OP_MATCH  if min(i,j) = min(i-1, j-1)      <- Match
     #   OP_SUBST  if min(i,j) = min(i-1, j-1) + 1  <- Substitution
@@ -50,96 +61,883 @@ class Levenshtein(object):
             _eprint("lev:from:len = ", len(self.m_from))
             _eprint("lev:to:len   = ", len(self.m_to))
 
-        if len(self.m_from) == 0:
+        n = len(self.m_from)
+        m = len(self.m_to)
+        w = m + 1                                       # row width
 
-            intmd_state = [ [OP_INSERT] * (len(self.m_to) + 1) ]
-            self.m_intmd_state[0][0] = Levenshtein.OP_NONE
-            self.m_dist = len(self.m_to)
+        in_m.count("lev.cells", n * m)
 
-        elif len(self.m_to) == 0:
+        # intmd_state holds one byte (the op character) per cell, row 
+        # after row. the cost rows are two int32 arrays that are reused.
 
-            intmd_state = [ [OP_DELETE] for i in range(len(self.m_from) + 1) ]
-            self.m_intmd_state[0][0] = Levenshtein.OP_NONE
-            self.m_dist = len(self.m_from)
-
-        else:
+        intmd_state = bytearray([Levenshtein.OPB_NONE] + 
+                                [Levenshtein.OPB_INSERT] * m)
+        intmd_state.extend(bytes([Levenshtein.OPB_DELETE] + 
+                                 [Levenshtein.OPB_NONE] * m) * n)
+        if (verbose >= 2):
+            _eprint(self._intmd_state_matrix(intmd_state, n, m))
 
-            intmd_state = [ [Levenshtein.OP_NONE]*(len(self.m_to) + 1) 
-                            for i in range(len(self.m_from) + 1)]
-            for i in range(1, len(self.m_from) + 1):
-                intmd_state[i][0] = Levenshtein.OP_DELETE
-            for j in range(1, len(self.m_to) + 1):
-                intmd_state[0][j] = Levenshtein.OP_INSERT
-            if (verbose >= 2):
-                _eprint(np.matrix(intmd_state))
+        previous_row = array.array('i', range(w))
+        current_row  = array.array('i', range(w))
 
-            previous_row = range(len(self.m_to) + 1)
+        for i, c1 in enumerate(self.m_from, 1):         # i starts from 1
 
-            for i, c1 in enumerate(self.m_from, 1):     # i starts from 1
+            current_row[0] = i
+            row_offset     = i * w
 
-                current_row = [i]
+            if (verbose >= 2):
+                _eprint("lev:from:current_row = ", i)
 
-                if (verbose >= 1):
-                    _eprint("lev:from:current_row = ", i)
+            for j, c2 in enumerate(self.m_to, 1):       # j starts from 1,...
 
-                for j, c2 in enumerate(self.m_to, 1):   # j starts from 1,...
+                is_same = (self.m_efnx (c1,c2))
 
-                    is_same = (self.m_efnx (c1,c2))
+                deletions     = previous_row[j] + 1 
+                insertions    = current_row [j - 1] + 1       
+                substitutions = previous_row[j - 1] + int(not is_same)
+                min_val       = min(insertions, deletions, substitutions)
+                current_row[j] = min_val
 
-                    deletions     = previous_row[j] + 1 
-                    insertions    = current_row [j - 1] + 1       
-                    substitutions = previous_row[j - 1] + int(not is_same)
-                    min_val       = min(insertions, deletions, substitutions)
-                    current_row.append(min_val)
+                if (verbose >= 2):
+                    _eprint("")
+                    _eprint(np.matrix(previous_row))
+                    _eprint(np.matrix(current_row[:j + 1]))
+                    _eprint("M, @>[", i, j, "], S>(", c1, c2, ")", ", I>", insertions, ", D>", deletions, ", R>", substitutions, ", M>", min_val)
 
-                    if (verbose >= 2):
-                        _eprint("")
-                        _eprint(np.matrix(previous_row))
-                        _eprint(np.matrix(current_row))
-                        _eprint("M, @>[", i, j, "], S>(", c1, c2, ")", ", I>", insertions, ", D>", deletions, ", R>", substitutions, ", M>", min_val)
+                if min_val == insertions:
+                    intmd_state[row_offset + j] = Levenshtein.OPB_INSERT
+                elif min_val == deletions:
+                    intmd_state[row_offset + j] = Levenshtein.OPB_DELETE
+                elif (min_val == substitutions) and not is_same:
+                    intmd_state[row_offset + j] = Levenshtein.OPB_SUBST
+                else:
+                    intmd_state[row_offset + j] = Levenshtein.OPB_MATCH
 
-                    if min_val == insertions:
-                        intmd_state[i][j] = Levenshtein.OP_INSERT
-                    elif min_val == deletions:
-                        intmd_state[i][j] = Levenshtein.OP_DELETE
-                    elif (min_val == substitutions) and not is_same:
-                        intmd_state[i][j] = Levenshtein.OP_SUBST
-                    else:
-                        intmd_state[i][j] = Levenshtein.OP_MATCH
+                if (verbose >= 2):
+                    _eprint(self._intmd_state_matrix(intmd_state, n, m))
 
-                    if (verbose >= 2):
-                        _eprint(np.matrix(intmd_state))
+            previous_row, current_row = current_row, previous_row
 
-                previous_row = current_row
-            
-            self.m_dist = previous_row[-1]
+        self.m_dist = previous_row[-1]
 
         #+---------------+
         #| SET WALK PATH |
         #+---------------+
 
+        self._set_walk_path(lambda i, j : chr(intmd_state[i * w + j]), verbose)
+
+        #+-----------------+
+        #| RETURN DISTANCE |
+        #+-----------------+
+
+        return self.m_dist
+
+
+    def _intmd_state_matrix(self, intmd_state, n, m):
+
+        # decodes intmd_state into a matrix of op characters (debugging)
+
+        w = m + 1
+        return np.matrix([ [ chr(b) for b in intmd_state[i * w:(i + 1) * w] ]
+                           for i in range(n + 1) ])
+
+
+    def _set_walk_path(self, op_at, verbose):
+
+        # op_at(i,j) returns the operation 'applied' at [i,j]
+
         i = len(self.m_from)
         j = len(self.m_to)
 
-        while True:
-            op = intmd_state[i][j]
-            if (verbose >= 1):
-                _eprint("W, @>[", i,j, "], O>", op)
+        with in_m.span("lev.traceback"):
+
+            while (i > 0 or j > 0):
+                op = op_at(i, j)
+                if (verbose >= 2):
+                    _eprint("W, @>[", i,j, "], O>", op)
+                if op == Levenshtein.OP_DELETE:
+                    self.m_walk_path.append((op, self.m_from[i-1], None))
+                    i = i-1
+                elif op == Levenshtein.OP_INSERT:
+                    self.m_walk_path.append((op, None, self.m_to[j-1]))
+                    j = j-1
+                else:
+                    self.m_walk_path.append((op, self.m_from[i-1], self.m_to[j-1]))
+                    i = i-1
+                    j = j-1
+
+            self.m_walk_path.reverse()
+
+
+    def _set_walk_path_ops(self, ops):
+
+        # sets the walk path from the string of its operations, from 
+        # [0, 0] to [len(from), len(to)]. returns the number of operations
+        # that are not matches (the distance).
+
+        i, j = 0, 0
+        dist = 0
+
+        with in_m.span("lev.traceback"):
+
+            for op in ops:
+                if op == Levenshtein.OP_DELETE:
+                    self.m_walk_path.append((op, self.m_from[i], None))
+                    i = i+1
+                elif op == Levenshtein.OP_INSERT:
+                    self.m_walk_path.append((op, None, self.m_to[j]))
+                    j = j+1
+                else:
+                    self.m_walk_path.append((op, self.m_from[i], self.m_to[j]))
+                    i = i+1
+                    j = j+1
+
+                if (op != Levenshtein.OP_MATCH):
+                    dist = dist + 1
+
+        return dist
+
+
+    def walk(self):
+
+        for op in self.m_walk_path:
+            yield op
+
+
+def intern_words(from_l, to_l, key_fnx):
+
+    # maps the key of every element (see key_fnx) of from_l and to_l to
+    # an integer id. elements with the same key get the same id.
+    # returns (from_ids, to_ids) as numpy int32 arrays
+    #
+    # key_fnx may be None if from_l and to_l already carry the ids of 
+    # their elements, drawn from one vocabulary, as numpy arrays in 
+    # their word_ids attribute (see srtdf_srt_compare_reader.
+    # TimestampedWords). these are then used as they are.
+
+    if (key_fnx == None):
+        return (from_l.word_ids, to_l.word_ids)
+
+    vocab = {}
+
+    from_ids = np.fromiter(
+                (vocab.setdefault(key_fnx(e), len(vocab)) for e in from_l),
+                dtype=np.int32, count=len(from_l))
+    to_ids   = np.fromiter(
+                (vocab.setdefault(key_fnx(e), len(vocab)) for e in to_l),
+                dtype=np.int32, count=len(to_l))
+
+    return (from_ids, to_ids)
+
+
+class NumpyLevenshtein(Levenshtein):
+
+    # Computes the same distance and walk path as Levenshtein but
+    # sweeps the cost matrix one anti-diagonal at a time using numpy.
+    #
+    # All cells on anti-diagonal k (i+j == k) depend only on the cells of
+    # anti-diagonals k-1 and k-2, so each of them can be evaluated in one
+    # vectorized step. Only three anti-diagonals of costs are kept.
+    #
+    # Instead of an equality function, elements are compared through 
+    # key_fnx(element) which must return a hashable key. The keys are
+    # interned to integer ids once (see intern_words).
+
+    OP_CODES = [ Levenshtein.OP_NONE,       # 0
+                 Levenshtein.OP_MATCH,      # 1
+                 Levenshtein.OP_SUBST,      # 2
+                 Levenshtein.OP_DELETE,     # 3
+                 Levenshtein.OP_INSERT ]    # 4
+
+    OPC_NONE   = 0
+    OPC_MATCH  = 1
+    OPC_SUBST  = 2
+    OPC_DELETE = 3
+    OPC_INSERT = 4
+
+    def __init__(self, module_name, from_l, to_l, key_fnx):
+
+        super().__init__(module_name, from_l, to_l, 
+                         lambda e1, e2 : key_fnx(e1) == key_fnx(e2))
+        self.m_kfnx = key_fnx
+
+
+    def distance(self, verbose):
+
+        if (self.m_dist != -1):
+            return self.m_dist  # return result of earlier computation
+
+        #+-----------------------------------------------+
+        #| COMPUTE DISTANCE AND FILL INTERMEDIATE STATES |
+        #+-----------------------------------------------+
+
+        n = len(self.m_from)
+        m = len(self.m_to)
+
+        if (verbose >= 1):
+            _eprint("lev:from:len = ", n)
+            _eprint("lev:to:len   = ", m)
+
+        from_ids, to_ids = intern_words(self.m_from, self.m_to, self.m_kfnx)
+
+        in_m.count("lev.cells", n * m)
+
+        ops = np.empty((n + 1, m + 1), dtype=np.uint8)
+        ops[0, 0]  = NumpyLevenshtein.OPC_NONE
+        ops[1:, 0] = NumpyLevenshtein.OPC_DELETE
+        ops[0, 1:] = NumpyLevenshtein.OPC_INSERT
+
+        # diags[k % 3][i] holds the cost at [i, k-i]
+
+        diags = [ np.zeros(n + 1, dtype=np.int32) for k in range(3) ]
+
+        for k in range(1, n + m + 1):
+
+            prev_2 = diags[(k - 2) % 3]
+            prev_1 = diags[(k - 1) % 3]
+            curr   = diags[k % 3]
+
+            if (k <= m):
+                curr[0] = k
+            if (k <= n):
+                curr[k] = k
+
+            lo = max(1, k - m)  # first i on the diagonal (j >= 1)
+            hi = min(n, k - 1)  # last  i on the diagonal (j >= 1)
+            if (lo > hi):
+                continue
+
+            # j = k-i, so to_ids[j-1] runs backwards as i runs forwards
+
+            not_same      = (from_ids[lo-1:hi] != to_ids[k-hi-1:k-lo][::-1])
+            deletions     = prev_1[lo-1:hi] + 1
+            insertions    = prev_1[lo:hi+1] + 1
+            substitutions = prev_2[lo-1:hi] + not_same
+            min_val       = np.minimum(np.minimum(insertions, deletions),
+                                       substitutions)
+            curr[lo:hi+1] = min_val
+
+            # same tie breaking order as Levenshtein.distance
+
+            op = np.where(min_val == insertions, 
+                          NumpyLevenshtein.OPC_INSERT,
+                 np.where(min_val == deletions,
+                          NumpyLevenshtein.OPC_DELETE,
+                 np.where(not_same,
+                          NumpyLevenshtein.OPC_SUBST,
+                          NumpyLevenshtein.OPC_MATCH)))
+
+            i = np.arange(lo, hi + 1)
+            ops[i, k - i] = op
+
+        self.m_dist = int(diags[(n + m) % 3][n])
+
+        #+---------------+
+        #| SET WALK PATH |
+        #+---------------+
+
+        op_codes = NumpyLevenshtein.OP_CODES
+        self._set_walk_path(lambda i, j : op_codes[ops[i, j]], verbose)
+
+        #+-----------------+
+        #| RETURN DISTANCE |
+        #+-----------------+
+
+        return self.m_dist
+
+
+class BitParallelLevenshtein(Levenshtein):
+
+    # Computes only the distance (walk() is not available) using the
+    # bit-parallel algorithm of Myers as adapted by Hyyro for the 
+    # Levenshtein distance.
+    #
+    # One column of the cost matrix is represented by two bit vectors
+    # (vp/vn: positions where the cost goes up/down by one when moving 
+    # down the column) held in python integers of len(from) bits. Every
+    # element of to_l then costs a handful of big-int operations, i.e.
+    # about len(from)/64 machine word operations.
+    #
+    # As in NumpyLevenshtein, elements are compared through their
+    # key_fnx(element) keys.
+
+    def __init__(self, module_name, from_l, to_l, key_fnx):
+
+        super().__init__(module_name, from_l, to_l, 
+                         lambda e1, e2 : key_fnx(e1) == key_fnx(e2))
+        self.m_kfnx = key_fnx
+
+
+    def distance(self, verbose):
+
+        if (self.m_dist != -1):
+            return self.m_dist  # return result of earlier computation
+
+        n = len(self.m_from)
+        m = len(self.m_to)
+
+        if (verbose >= 1):
+            _eprint("lev:from:len = ", n)
+            _eprint("lev:to:len   = ", m)
+
+        if (n == 0):
+            self.m_dist = m
+            return self.m_dist
+
+        from_ids, to_ids = intern_words(self.m_from, self.m_to, self.m_kfnx)
+
+        in_m.count("lev.cells", n * m)
+
+        # peq[id] has bit i set if from_l[i] has that id
+
+        peq = {}
+        for i, c in enumerate(from_ids.tolist()):
+            peq[c] = peq.get(c, 0) | (1 << i)
+
+        all_ones = (1 << n) - 1
+        last_bit = 1 << (n - 1)
+
+        vp    = all_ones    # first column is 0,1,2,...,n
+        vn    = 0
+        score = n           # cost at the last row of the current column
+
+        for c in to_ids.tolist():
+
+            eq = peq.get(c, 0)
+            xv = eq | vn
+            xh = (((eq & vp) + vp) ^ vp) | eq
+            hp = vn | (all_ones & ~(xh | vp))
+            hn = vp & xh
+
+            if (hp & last_bit):
+                score = score + 1
+            elif (hn & last_bit):
+                score = score - 1
+
+            hp = ((hp << 1) | 1) & all_ones  # first row is 0,1,2,...,m
+            hn = (hn << 1) & all_ones
+            vp = hn | (all_ones & ~(xv | hp))
+            vn = hp & xv
+
+        self.m_dist = score
+
+        return self.m_dist
+
+
+    def walk(self):
+
+        err_str = "%s: walk is not available when only the distance is computed" % (self.m_mn)
+        raise Exception (err_str)
+
+
+class HirschbergLevenshtein(Levenshtein):
+
+    # Computes the same distance and walk path as Levenshtein while 
+    # keeping only a few rows of the cost matrix in memory, by dividing
+    # and conquering the way Hirschberg's algorithm does.
+    #
+    # The walk path of Levenshtein is the one traced back from 
+    # [len(from), len(to)] using the costs computed from [0, 0]. To get 
+    # exactly that path, a sub-problem is a rectangle [i0..i1]x[j0..j1]
+    # through whose corners the path is known to pass, together with the
+    # costs on its top row and left column. The costs inside the rectangle
+    # are then the same as those of the full matrix.
+    #
+    # A forward pass over the rectangle records the costs at the middle
+    # row and, for every cell below it, the column at which tracing back 
+    # from that cell first reaches the middle row. The label of the 
+    # bottom right cell splits the rectangle into two smaller ones.
+    #
+    # Rows are evaluated with numpy. Rectangles with at most 
+    # max_base_cells cells are traced back directly.
+    #
+    # As in NumpyLevenshtein, elements are compared through their
+    # key_fnx(element) keys.
+
+    def __init__(self, module_name, from_l, to_l, key_fnx, 
+                 max_base_cells = 1 << 16):
+
+        super().__init__(module_name, from_l, to_l, 
+                         lambda e1, e2 : key_fnx(e1) == key_fnx(e2))
+        self.m_kfnx = key_fnx
+        self.m_max_base_cells = max_base_cells
+
+
+    def distance(self, verbose):
+
+        if (self.m_dist != -1):
+            return self.m_dist  # return result of earlier computation
+
+        n = len(self.m_from)
+        m = len(self.m_to)
+
+        if (verbose >= 1):
+            _eprint("lev:from:len = ", n)
+            _eprint("lev:to:len   = ", m)
+
+        self.m_from_ids, self.m_to_ids = \
+            intern_words(self.m_from, self.m_to, self.m_kfnx)
+
+        #+-------------------------------------------+
+        #| COMPUTE DISTANCE AND WALK PATH OPERATIONS |
+        #+-------------------------------------------+
+
+        # m_ops collects operations from [n, m] back to [0, 0]
+
+        self.m_ops = []
+
+        top  = np.arange(m + 1, dtype=np.int32)     # costs at [0, 0..m]
+        left = np.arange(n + 1, dtype=np.int32)     # costs at [0..n, 0]
+
+        self.m_dist = self._solve(0, n, 0, m, top, left, verbose)
+
+        #+---------------+
+        #| SET WALK PATH |
+        #+---------------+
+
+        ops = iter(self.m_ops)
+        self._set_walk_path(lambda i, j : next(ops), verbose)
+
+        self.m_ops = None
+        self.m_from_ids = None
+        self.m_to_ids = None
+
+        #+-----------------+
+        #| RETURN DISTANCE |
+        #+-----------------+
+
+        return self.m_dist
+
+
+    def _row(self, i, j0, j1, prev_row, left_cost):
+
+        # computes the costs at [i, j0..j1] given the costs at [i-1, j0..j1]
+        # and the cost at [i, j0]. 
+        # returns (costs, op codes at [i, j0+1..j1])
+
+        in_m.count("lev.cells", j1 - j0)
+
+        not_same      = (self.m_to_ids[j0:j1] != self.m_from_ids[i-1])
+        deletions     = prev_row[1:] + 1
+        substitutions = prev_row[:-1] + not_same
+        candidates    = np.minimum(deletions, substitutions)
+
+        # row[k] = min(candidates[k-1], row[k-1] + 1) 
+        #   <=> row[k] - k = min(left_cost, min(candidates[t-1] - t, t <= k))
+
+        offsets = np.arange(j1 - j0 + 1, dtype=np.int32)
+        row     = np.empty(j1 - j0 + 1, dtype=np.int32)
+        row[0]  = left_cost
+        row[1:] = candidates - offsets[1:]
+        row     = np.minimum.accumulate(row) + offsets
+
+        min_val    = row[1:]
+        insertions = row[:-1] + 1
+
+        op = np.where(min_val == insertions, 
+                      NumpyLevenshtein.OPC_INSERT,
+             np.where(min_val == deletions,
+                      NumpyLevenshtein.OPC_DELETE,
+             np.where(not_same,
+                      NumpyLevenshtein.OPC_SUBST,
+                      NumpyLevenshtein.OPC_MATCH)))
+
+        return (row, op)
+
+
+    def _solve(self, i0, i1, j0, j1, top, left, verbose):
+
+        # appends the operations from [i1, j1] back to [i0, j0] to m_ops.
+        # top holds the costs at [i0, j0..j1], left those at [i0..i1, j0].
+        # returns the cost at [i1, j1].
+
+        if (verbose >= 2):
+            _eprint("lev:hirschberg:[", i0, i1, "]x[", j0, j1, "]")
+
+        if (i0 == i1):
+            self.m_ops.extend([Levenshtein.OP_INSERT] * (j1 - j0))
+            return int(top[-1])
+
+        if (j0 == j1):
+            self.m_ops.extend([Levenshtein.OP_DELETE] * (i1 - i0))
+            return int(left[-1])
+
+        if ((i1 - i0 == 1) or 
+            ((i1 - i0) * (j1 - j0) <= self.m_max_base_cells)):
+            return self._solve_base(i0, i1, j0, j1, top, left)
+
+        #+----------------------------------------+
+        #| FIND WHERE THE PATH CROSSES THE MIDDLE |
+        #+----------------------------------------+
+
+        mid    = (i0 + i1) // 2
+        cols   = np.arange(1, j1 - j0 + 1)
+        prev   = top
+        labels = None
+
+        for i in range(i0 + 1, i1 + 1):
+
+            row, op = self._row(i, j0, j1, prev, left[i - i0])
+
+            if (i == mid):
+                mid_row = row
+                labels  = np.arange(j0, j1 + 1)
+
+            elif (i > mid):
+
+                # the label of a cell is that of the cell traced back to.
+                # runs of insertions take the label of the first cell to 
+                # their left that is not an insertion.
+
+                traced = np.empty(j1 - j0 + 1, dtype=labels.dtype)
+                traced[0]  = labels[0]
+                traced[1:] = np.where(op == NumpyLevenshtein.OPC_DELETE,
+                                      labels[1:], labels[:-1])
+                source     = np.zeros(j1 - j0 + 1, dtype=cols.dtype)
+                source[1:] = np.where(op == NumpyLevenshtein.OPC_INSERT, 
+                                      0, cols)
+                labels     = traced[np.maximum.accumulate(source)]
+
+            prev = row
+
+        dist = int(prev[-1])
+        c    = int(labels[-1])
+
+        #+--------------------------------------------+
+        #| COSTS AT THE LEFT COLUMN OF THE LOWER HALF |
+        #+--------------------------------------------+
+
+        lower_left    = np.empty(i1 - mid + 1, dtype=np.int32)
+        lower_left[0] = mid_row[c - j0]
+        prev          = mid_row[:c - j0 + 1]
+
+        for i in range(mid + 1, i1 + 1):
+            prev, op = self._row(i, j0, c, prev, left[i - i0])
+            lower_left[i - mid] = prev[-1]
+
+        #+------------------------------+
+        #| SOLVE LOWER, THEN UPPER HALF |
+        #+------------------------------+
+
+        self._solve(mid, i1, c, j1, mid_row[c - j0:], lower_left, verbose)
+        self._solve(i0, mid, j0, c, top[:c - j0 + 1], left[:mid - i0 + 1],
+                    verbose)
+
+        return dist
+
+
+    def _solve_base(self, i0, i1, j0, j1, top, left):
+
+        ops = np.empty((i1 - i0 + 1, j1 - j0 + 1), dtype=np.uint8)
+        ops[0, :] = NumpyLevenshtein.OPC_INSERT
+        ops[:, 0] = NumpyLevenshtein.OPC_DELETE
+
+        prev = top
+        for i in range(i0 + 1, i1 + 1):
+            prev, ops[i - i0, 1:] = self._row(i, j0, j1, prev, left[i - i0])
+
+        op_codes = NumpyLevenshtein.OP_CODES
+
+        i = i1 - i0
+        j = j1 - j0
+
+        while (i > 0 or j > 0):
+            op = op_codes[ops[i, j]]
+            self.m_ops.append(op)
             if op == Levenshtein.OP_DELETE:
-                self.m_walk_path.append((op, self.m_from[i-1], None))
                 i = i-1
             elif op == Levenshtein.OP_INSERT:
-                self.m_walk_path.append((op, None, self.m_to[j-1]))
                 j = j-1
             else:
-                self.m_walk_path.append((op, self.m_from[i-1], self.m_to[j-1]))
                 i = i-1
                 j = j-1
 
-            if i==0 and j==0:
+        return int(prev[-1])
+
+
+class BandedLevenshtein(Levenshtein):
+
+    # Computes the distance and walk path considering only the cells 
+    # [i, j] where the timestamps of from_l[i-1] and to_l[j-1] are at most
+    # band_ms apart. The words of a subtitle and of its transcription are
+    # seldom far apart in time, so the band holds almost all of the
+    # optimal path while its size grows linearly with the input.
+    #
+    # Each row i of the band is a range of columns [L[i], R[i]]. The 
+    # ranges are widened where required so that every row is reachable
+    # from the previous one and [len(from), len(to)] lies in the band.
+    # Only the operations of the band cells are stored, row after row,
+    # in a flat uint8 buffer.
+    #
+    # The result may be larger than the unrestricted distance, and the
+    # walk path does not have to touch the edge of the band for that to
+    # happen (band_edge_hits, the number of its cells on the edge, may 
+    # be 0). A path that leaves the band does so through a cell next to
+    # it, and costs at least the band cost of the cell it leaves from, 
+    # plus that step, plus a lower bound of the cost of what is left 
+    # (see _exit_bound).
+    # band_excess is the result minus the smallest of these bounds (0 
+    # if none is below the result, which is then the smallest distance):
+    # the result exceeds the unrestricted distance by at most as much.
+    #
+    # Elements are compared through their key_fnx(element) keys and
+    # ts_fnx(element) returns their timestamp in milliseconds. ts_fnx may
+    # be None if from_l and to_l carry the timestamps as numpy arrays in
+    # their timestamps attribute (see intern_words for key_fnx).
+
+    INFINITY = 1 << 40
+
+    max_bag_bounds = 256
+
+    def __init__(self, module_name, from_l, to_l, key_fnx, ts_fnx, band_ms):
+
+        super().__init__(module_name, from_l, to_l, 
+                         lambda e1, e2 : key_fnx(e1) == key_fnx(e2))
+        self.m_kfnx    = key_fnx
+        self.m_tsfnx   = ts_fnx
+        self.m_band_ms = band_ms
+        self.m_band_edge_hits = 0
+        self.m_exit_bound     = BandedLevenshtein.INFINITY
+
+
+    @property
+    def band_edge_hits(self):
+        return self.m_band_edge_hits
+
+
+    @property
+    def band_excess(self):
+        return max(0, self.m_dist - self.m_exit_bound)
+
+
+    def _band(self):
+
+        # returns (L, R), the column range of every row of the band
+
+        n = len(self.m_from)
+        m = len(self.m_to)
+
+        L = np.zeros(n + 1, dtype=np.int64)
+        R = np.full(n + 1, m, dtype=np.int64)
+
+        if (n == 0 or m == 0):
+            return (L, R)
+
+        # timestamps are made non decreasing so that they can be searched
+
+        if (self.m_tsfnx == None):
+            from_ts = np.maximum.accumulate(self.m_from.timestamps)
+            to_ts   = np.maximum.accumulate(self.m_to.timestamps)
+        else:
+            from_ts = np.maximum.accumulate(np.fromiter(
+                        (self.m_tsfnx(e) for e in self.m_from), 
+                        dtype=np.int64, count=n))
+            to_ts   = np.maximum.accumulate(np.fromiter(
+                        (self.m_tsfnx(e) for e in self.m_to), 
+                        dtype=np.int64, count=m))
+
+        L[1:] = np.searchsorted(to_ts, from_ts - self.m_band_ms, 'left') + 1
+        R[1:] = np.searchsorted(to_ts, from_ts + self.m_band_ms, 'right')
+        L[L == 1] = 0           # column 0 is in the band if column 1 is
+        L[L > m]  = m
+        R[0]      = R[1]
+        R[n]      = m
+
+        for i in range(1, n + 1):
+            L[i] = min(L[i], R[i-1] + 1)    # reachable from the row above
+            R[i] = max(R[i], L[i])          # at least one cell per row
+
+        return (L, R)
+
+
+    def _exits(self, i, lo, hi, row, from_ids, to_ids, L, R):
+
+        # returns the cells [i', j'] next to the band that a path can
+        # leave it for from row i (whose costs at [i, lo..hi] are row), 
+        # that is [i, hi+1], [i+1, j] or [i+1, j+1], as the arrays 
+        # (costs, i's, j's), where costs are those of the paths up to
+        # these cells
+
+        n = len(from_ids)
+        m = len(to_ids)
+
+        exits = []
+
+        if (hi < m):    # insertion
+            exits.append((row[-1:] + 1, i, np.array([ hi + 1 ])))
+
+        if (i < n):
+
+            next_lo, next_hi = int(L[i+1]), int(R[i+1])
+
+            # deletions to [i+1, j], j < next_lo or j > next_hi
+
+            for (a, b) in ((lo, min(hi, next_lo - 1)), 
+                           (max(lo, next_hi + 1), hi)):
+                if (a <= b):
+                    exits.append((row[a - lo:b - lo + 1] + 1, i + 1,
+                                  np.arange(a, b + 1)))
+
+            # substitutions and matches to [i+1, j+1], j+1 < next_lo or
+            # j+1 > next_hi
+
+            for (a, b) in ((lo, min(hi, next_lo - 2)), 
+                           (max(lo, next_hi), min(hi, m - 1))):
+                if (a <= b):
+                    exits.append((row[a - lo:b - lo + 1] + 
+                                  (to_ids[a:b + 1] != from_ids[i]), i + 1,
+                                  np.arange(a + 1, b + 2)))
+
+        return [ (costs, np.full(len(js), i1, dtype=np.int64), js)
+                 for (costs, i1, js) in exits ]
+
+
+    def _exit_bound(self, exits, from_ids, to_ids):
+
+        # returns a lower bound of the distance along the paths that 
+        # leave the band (see _exits), or the band distance if it is 
+        # smaller. the cost from [i', j'] to the end is at least the 
+        # difference of the lengths that are left and at least their bag
+        # distance (the words of the longer one that the other one does 
+        # not have). the latter costs O(n + m) per cell, so it is worked
+        # out for at most max_bag_bounds of the cells, the most promising 
+        # first.
+
+        if (len(exits) == 0):
+            return self.m_dist
+
+        n = len(from_ids)
+        m = len(to_ids)
+
+        costs = np.concatenate([ e[0] for e in exits ])
+        i1s   = np.concatenate([ e[1] for e in exits ])
+        j1s   = np.concatenate([ e[2] for e in exits ])
+
+        left   = np.abs((n - i1s) - (m - j1s))
+        bounds = costs + left
+        order  = np.argsort(bounds, kind='stable')
+
+        num_ids = int(max(np.max(from_ids, initial=-1), 
+                          np.max(to_ids, initial=-1))) + 1
+
+        bound = self.m_dist
+        for (k, c) in enumerate(order.tolist()):
+            if (bounds[c] >= bound):
                 break
+            if (k == BandedLevenshtein.max_bag_bounds):
+                bound = int(bounds[c])
+                break
+            i1, j1 = int(i1s[c]), int(j1s[c])
+            common = int(np.sum(np.minimum(
+                         np.bincount(from_ids[i1:], minlength = num_ids),
+                         np.bincount(to_ids[j1:], minlength = num_ids))))
+            bag = max(n - i1, m - j1) - common
+            bound = min(bound, int(costs[c]) + max(int(left[c]), bag))
+
+        return bound
 
-        self.m_walk_path.reverse()
+
+    def distance(self, verbose):
+
+        if (self.m_dist != -1):
+            return self.m_dist  # return result of earlier computation
+
+        #+-----------------------------------------------+
+        #| COMPUTE DISTANCE AND FILL INTERMEDIATE STATES |
+        #+-----------------------------------------------+
+
+        n = len(self.m_from)
+        m = len(self.m_to)
+
+        if (verbose >= 1):
+            _eprint("lev:from:len = ", n)
+            _eprint("lev:to:len   = ", m)
+
+        from_ids, to_ids = intern_words(self.m_from, self.m_to, self.m_kfnx)
+
+        L, R = self._band()
+
+        offsets     = np.zeros(n + 2, dtype=np.int64)
+        offsets[1:] = np.cumsum(R - L + 1)
+
+        if (verbose >= 1):
+            _eprint("lev:band:cells = ", int(offsets[-1]))
+
+        in_m.count("lev.cells", int(offsets[-1]))
+
+        ops = np.empty(int(offsets[-1]), dtype=np.uint8)
+
+        prev = np.arange(R[0] + 1, dtype=np.int64)  # costs at [0, 0..R[0]]
+        ops[0:R[0] + 1] = NumpyLevenshtein.OPC_INSERT
+        ops[0]          = NumpyLevenshtein.OPC_NONE
+
+        exits = self._exits(0, 0, int(R[0]), prev, from_ids, to_ids, L, R)
+
+        for i in range(1, n + 1):
+
+            lo, hi = int(L[i]), int(R[i])
+            prev_lo, prev_hi = int(L[i-1]), int(R[i-1])
+
+            # costs at [i-1, lo-1..hi], infinite outside the band
+
+            above  = np.full(hi - lo + 2, BandedLevenshtein.INFINITY, 
+                             dtype=np.int64)
+            a      = max(lo - 1, prev_lo)
+            b      = min(hi, prev_hi)
+            if (a <= b):
+                above[a - lo + 1:b - lo + 2] = prev[a - prev_lo:b - prev_lo + 1]
+
+            not_same = np.ones(hi - lo + 1, dtype=bool)
+            first    = max(lo, 1)
+            not_same[first - lo:] = (to_ids[first - 1:hi] != from_ids[i-1])
+
+            deletions     = above[1:] + 1
+            substitutions = above[:-1] + not_same
+            candidates    = np.minimum(deletions, substitutions)
+
+            # row[k] = min(candidates[k], row[k-1] + 1)
+
+            cols = np.arange(hi - lo + 1, dtype=np.int64)
+            row  = np.minimum.accumulate(candidates - cols) + cols
+
+            min_val       = row
+            insertions    = np.empty(hi - lo + 1, dtype=np.int64)
+            insertions[0] = BandedLevenshtein.INFINITY
+            insertions[1:] = row[:-1] + 1
+
+            ops[offsets[i]:offsets[i+1]] = \
+                np.where(min_val == insertions, 
+                         NumpyLevenshtein.OPC_INSERT,
+                np.where(min_val == deletions,
+                         NumpyLevenshtein.OPC_DELETE,
+                np.where(not_same,
+                         NumpyLevenshtein.OPC_SUBST,
+                         NumpyLevenshtein.OPC_MATCH)))
+
+            prev = row
+
+            exits.extend(self._exits(i, lo, hi, row, 
+                                     from_ids, to_ids, L, R))
+
+        self.m_dist       = int(prev[-1])
+        self.m_exit_bound = self._exit_bound(exits, from_ids, to_ids)
+
+        #+---------------+
+        #| SET WALK PATH |
+        #+---------------+
+
+        op_codes = NumpyLevenshtein.OP_CODES
+
+        def op_at(i, j):
+            if ((j == L[i] and L[i] > 0) or (j == R[i] and R[i] < m)):
+                self.m_band_edge_hits = self.m_band_edge_hits + 1
+            return op_codes[ops[offsets[i] + j - L[i]]]
+
+        self._set_walk_path(op_at, verbose)
+
+        if (verbose >= 1):
+            _eprint("lev:band:edge_hits = ", self.m_band_edge_hits)
+            _eprint("lev:band:excess = ", self.band_excess)
 
         #+-----------------+
         #| RETURN DISTANCE |
@@ -148,10 +946,626 @@ class Levenshtein(object):
         return self.m_dist
 
 
-    def walk(self):
+def _align_gap(args):
 
-        for op in self.m_walk_path:
-            yield op
+    # aligns one gap of AnchoredLevenshtein. runs in a worker process.
+    # returns the walk path operations as a string
+
+    from_ids, to_ids, max_matrix_cells = args
+
+    if (len(from_ids) * len(to_ids) > max_matrix_cells):
+        lev = HirschbergLevenshtein("gap", from_ids, to_ids, lambda e : e)
+    else:
+        lev = NumpyLevenshtein("gap", from_ids, to_ids, lambda e : e)
+    lev.distance(0)
+
+    return "".join([op_rec[0] for op_rec in lev.walk()])
+
+
+class AnchoredLevenshtein(Levenshtein):
+
+    # Aligns long inputs by first matching the runs of words that are
+    # common to both of them and then aligning only the gaps between 
+    # these runs.
+    #
+    # Anchors are found much as in patience diff: the keys that occur 
+    # exactly once in from_l and once in to_l are paired up, and a 
+    # sequence of pairs that is increasing in both inputs is kept (the 
+    # one that leaves the most balanced gaps, see _anchors). Each 
+    # anchor is then extended in both directions while the keys match.
+    #
+    # The gaps are independent of each other. With num_jobs > 1 they are
+    # aligned in a pool of processes using NumpyLevenshtein (or 
+    # HirschbergLevenshtein above max_matrix_cells cells). The 
+    # operations of all runs and gaps are merged into one walk path.
+    #
+    # The result is an alignment, but not necessarily one with the 
+    # smallest distance, as the anchors are taken as given. It is at 
+    # most the sum over the gaps of the larger of their two lengths.
+    #
+    # Elements are compared through their key_fnx(element) keys.
+
+    max_anchor_lookback = 1024
+
+    def __init__(self, module_name, from_l, to_l, key_fnx,
+                 num_jobs = 1, max_matrix_cells = 50000000):
+
+        super().__init__(module_name, from_l, to_l, 
+                         lambda e1, e2 : key_fnx(e1) == key_fnx(e2))
+        self.m_kfnx = key_fnx
+        self.m_num_jobs = num_jobs
+        self.m_max_matrix_cells = max_matrix_cells
+
+
+    def _anchors(self, from_ids, to_ids):
+
+        # returns the list of (i, j) pairs of unique keys, increasing in
+        # both i and j. of the chains of such pairs, the one kept is not
+        # the longest one but the one with the smallest sum, over the 
+        # gaps it leaves, of the larger of their two lengths. this sum is
+        # an upper bound of the distance the gaps are aligned with, while
+        # a long chain can pair up words that are far apart and leave 
+        # gaps that only one of the inputs has. a pair is chained to one
+        # of the max_anchor_lookback pairs before it at most.
+
+        n = len(from_ids)
+        m = len(to_ids)
+
+        from_count = np.bincount(from_ids, minlength = 1)
+        to_count   = np.bincount(to_ids, minlength = 1)
+
+        to_pos = {}
+        for j, c in enumerate(to_ids.tolist()):
+            if (to_count[c] == 1):
+                to_pos[c] = j
+
+        pairs = []
+        for i, c in enumerate(from_ids.tolist()):
+            if (from_count[c] == 1 and c in to_pos):
+                pairs.append((i, to_pos[c]))
+
+        if (len(pairs) == 0):
+            return []
+
+        # cost[k] : the smallest sum of the gaps up to pair k of a chain
+        # that ends with it (pairs are sorted by i)
+
+        pair_is = np.array([ p[0] for p in pairs ], dtype=np.int64)
+        pair_js = np.array([ p[1] for p in pairs ], dtype=np.int64)
+        cost    = np.empty(len(pairs), dtype=np.int64)
+        back    = [-1] * len(pairs)
+
+        for k, (i, j) in enumerate(pairs):
+            cost[k] = max(i, j)     # first pair of the chain
+            k0 = max(0, k - AnchoredLevenshtein.max_anchor_lookback)
+            if (k0 < k):
+                gaps = np.maximum(i - pair_is[k0:k], j - pair_js[k0:k]) - 1
+                costs = np.where(pair_js[k0:k] < j, cost[k0:k] + gaps,
+                                 np.iinfo(np.int64).max)
+                p = int(np.argmin(costs))
+                if (costs[p] < cost[k]):
+                    cost[k] = costs[p]
+                    back[k] = k0 + p
+
+        ends = cost + np.maximum(n - 1 - pair_is, m - 1 - pair_js)
+        k    = int(np.argmin(ends))
+        if (ends[k] >= max(n, m)):
+            return []               # no chain beats aligning it all
+
+        anchors = []
+        while (k != -1):
+            anchors.append(pairs[k])
+            k = back[k]
+        anchors.reverse()
+
+        return anchors
+
+
+    def _runs(self, from_ids, to_ids):
+
+        # returns the list of (i, j, length) matching runs around anchors
+
+        runs = []
+        prev_i, prev_j = 0, 0   # end of previous run
+
+        for (i, j) in self._anchors(from_ids, to_ids):
+
+            if (i < prev_i or j < prev_j):
+                continue        # already part of the previous run
+
+            b = 0
+            while (i - b - 1 >= prev_i and j - b - 1 >= prev_j and
+                   from_ids[i - b - 1] == to_ids[j - b - 1]):
+                b = b + 1
+
+            f = 1
+            while (i + f < len(from_ids) and j + f < len(to_ids) and
+                   from_ids[i + f] == to_ids[j + f]):
+                f = f + 1
+
+            runs.append((i - b, j - b, b + f))
+            prev_i, prev_j = i + f, j + f
+
+        return runs
+
+
+    def distance(self, verbose):
+
+        if (self.m_dist != -1):
+            return self.m_dist  # return result of earlier computation
+
+        n = len(self.m_from)
+        m = len(self.m_to)
+
+        if (verbose >= 1):
+            _eprint("lev:from:len = ", n)
+            _eprint("lev:to:len   = ", m)
+
+        from_ids, to_ids = intern_words(self.m_from, self.m_to, self.m_kfnx)
+
+        runs = self._runs(from_ids, to_ids)
+
+        #+-------------------------+
+        #| ALIGN GAPS BETWEEN RUNS |
+        #+-------------------------+
+
+        gaps = []
+        prev_i, prev_j = 0, 0
+        for (i, j, length) in runs + [(n, m, 0)]:
+            gaps.append((from_ids[prev_i:i], to_ids[prev_j:j], 
+                         self.m_max_matrix_cells))
+            prev_i, prev_j = i + length, j + length
+
+        if (verbose >= 1):
+            _eprint("lev:anchored:runs = ", len(runs))
+            _eprint("lev:anchored:max_gap_cells = ", 
+                    max([len(g[0]) * len(g[1]) for g in gaps]))
+
+        if (self.m_num_jobs > 1):
+            # the counters of the workers are lost. their cells are
+            # counted here.
+            in_m.count("lev.cells", sum([ len(g[0]) * len(g[1])
+                                          for g in gaps ]))
+            with multiprocessing.Pool(self.m_num_jobs) as pool:
+                gap_ops = pool.map(_align_gap, gaps, chunksize = 1)
+        else:
+            gap_ops = [ _align_gap(gap) for gap in gaps ]
+
+        #+---------------+
+        #| SET WALK PATH |
+        #+---------------+
+
+        ops = gap_ops[0] + "".join([ Levenshtein.OP_MATCH * runs[k][2] + 
+                                     gap_ops[k + 1] 
+                                     for k in range(len(runs)) ])
+
+        self.m_dist = self._set_walk_path_ops(ops)
+
+        #+-----------------+
+        #| RETURN DISTANCE |
+        #+-----------------+
+
+        return self.m_dist
+
+
+class IncrementalLevenshtein(Levenshtein):
+
+    # Re-aligns from_l to a to_l that differs from the to_l of a previous
+    # alignment (of the same from_l) only in to_l[ja:jb], recomputing 
+    # only the rows of the cost matrix around that region.
+    #
+    # Here the rows of the cost matrix are the elements of to_l and its
+    # columns are those of from_l. The state of an alignment (see the 
+    # state property) holds its walk path operations and, at every
+    # checkpoint_interval rows, the rows of two cost matrices:
+    #
+    #   forward  D[r][i] = distance(from_l[:i], to_l[:r])
+    #   backward E[r][i] = distance(from_l[i:], to_l[r:])
+    #
+    # The rows of D above ja and those of E below jb are the same for 
+    # the new to_l. From the D checkpoint r0 <= ja the rows are computed
+    # down to the E checkpoint r1 >= jb, and the column where
+    # D[r1] + E[r1] is the smallest gives the distance. The walk path is
+    # traced back from there to row r0 and spliced between the parts of 
+    # the previous walk path above r0 and below r1. Any part of an 
+    # optimal walk path is optimal between its ends, so the result is an
+    # optimal alignment. If the previous walk path does not pass through
+    # the cells where the new one crosses r0 and r1, the region is 
+    # widened to the next checkpoints.
+    #
+    # The distance is the same as that of NumpyLevenshtein. Among
+    # alignments of the same distance, the walk path may be another one
+    # than NumpyLevenshtein's.
+    #
+    # Without a previous state (or with a previous state of another
+    # from_l) the whole alignment is computed with NumpyLevenshtein (or
+    # HirschbergLevenshtein above max_matrix_cells cells), followed by 
+    # one pass over the rows in each direction for the checkpoints.
+    #
+    # The state takes 4 * (len(from_l) + 1) bytes per checkpoint. The
+    # region takes a byte per cell.
+    #
+    # Elements are compared through their key_fnx(element) keys (see
+    # intern_words).
+
+    def __init__(self, module_name, from_l, to_l, key_fnx, 
+                 prev_state = None, changed = None,
+                 checkpoint_interval = 1024, max_matrix_cells = 50000000):
+
+        # changed is (ja, jb) such that to_l[:ja] is the previous 
+        # to_l[:ja] and to_l[ja + len(to_l) - m_prev:] is the previous
+        # to_l[jb:] (m_prev being the length of the previous to_l)
+
+        super().__init__(module_name, from_l, to_l, 
+                         lambda e1, e2 : key_fnx(e1) == key_fnx(e2))
+        self.m_kfnx       = key_fnx
+        self.m_prev_state = prev_state
+        self.m_changed    = changed
+        self.m_interval   = checkpoint_interval
+        self.m_max_matrix_cells = max_matrix_cells
+        self.m_ops        = None
+        self.m_fwd        = {}      # row -> costs of D at that row
+        self.m_bwd        = {}      # row -> costs of E at that row
+        self.m_region     = None
+
+
+    @property
+    def region(self):
+
+        # the (r0, r1) rows between which the costs were recomputed, 
+        # (0, len(to_l)) for a whole alignment
+
+        return self.m_region
+
+
+    @property
+    def state(self):
+
+        # a dict of numpy arrays (for numpy.savez) from which a later
+        # IncrementalLevenshtein can start
+
+        def stack(checkpoints):
+            rows = sorted(checkpoints)
+            costs = np.stack([ checkpoints[r] for r in rows ]).astype(np.int32)
+            return (np.array(rows, dtype=np.int64), costs)
+
+        (fwd_rows, fwd_costs) = stack(self.m_fwd)
+        (bwd_rows, bwd_costs) = stack(self.m_bwd)
+
+        return { 
+                 "lev_dims"      : np.array([ len(self.m_from), 
+                                              len(self.m_to) ],
+                                            dtype=np.int64),
+                 "lev_ops"       : np.frombuffer(self.m_ops.encode("ascii"),
+                                                 dtype=np.uint8),
+                 "lev_fwd_rows"  : fwd_rows,
+                 "lev_fwd_costs" : fwd_costs,
+                 "lev_bwd_rows"  : bwd_rows,
+                 "lev_bwd_costs" : bwd_costs
+               }
+
+
+    @staticmethod
+    def _cost_row(prev, from_ids, to_id, cols):
+
+        # the costs at row r given those at row r-1 (prev) and the id of
+        # to[r-1]. returns (costs, not_same, insertions)
+
+        in_m.count("lev.cells", len(from_ids))
+
+        not_same      = (from_ids != to_id)
+        insertions    = prev + 1
+        candidates    = insertions.copy()
+        candidates[1:] = np.minimum(insertions[1:], prev[:-1] + not_same)
+
+        # row[i] = min(candidates[i], row[i-1] + 1)
+
+        row = np.minimum.accumulate(candidates - cols) + cols
+
+        return (row, not_same, insertions)
+
+
+    def _op_row(self, prev, to_id):
+
+        # the costs at row r and the op codes of its cells
+
+        (row, not_same, insertions) = IncrementalLevenshtein._cost_row(
+                prev, self.m_from_ids, to_id, self.m_cols)
+
+        op    = np.empty(len(row), dtype=np.uint8)
+        op[0] = NumpyLevenshtein.OPC_INSERT
+
+        # same tie breaking order as Levenshtein.distance
+
+        min_val = row[1:]
+        op[1:]  = np.where(min_val == insertions[1:], 
+                           NumpyLevenshtein.OPC_INSERT,
+                  np.where(min_val == row[:-1] + 1,
+                           NumpyLevenshtein.OPC_DELETE,
+                  np.where(not_same,
+                           NumpyLevenshtein.OPC_SUBST,
+                           NumpyLevenshtein.OPC_MATCH)))
+
+        return (row, op)
+
+
+    def _is_checkpoint(self, r):
+        return ((r % self.m_interval) == 0)
+
+
+    def _forward_rows(self, r, r_end):
+
+        # computes the rows of D from the checkpoint at r down to r_end,
+        # keeping the checkpoints
+
+        row = self.m_fwd[r]
+        while (r < r_end):
+            r   = r + 1
+            row = IncrementalLevenshtein._cost_row(
+                    row, self.m_from_ids, self.m_to_ids[r - 1],
+                    self.m_cols)[0]
+            if (self._is_checkpoint(r) or r == r_end):
+                self.m_fwd[r] = row
+
+
+    def _backward_rows(self, r, r_end):
+
+        # computes the rows of E from the checkpoint at r up to r_end,
+        # keeping the checkpoints. E is D for the reversed lists.
+
+        from_ids = self.m_from_ids[::-1]
+        row      = self.m_bwd[r][::-1]
+        while (r > r_end):
+            r   = r - 1
+            row = IncrementalLevenshtein._cost_row(
+                    row, from_ids, self.m_to_ids[r], self.m_cols)[0]
+            if (self._is_checkpoint(r) or r == r_end):
+                self.m_bwd[r] = row[::-1].copy()
+
+
+    def _full(self, verbose):
+
+        # aligns the whole lists and sets the checkpoints
+
+        n = len(self.m_from_ids)
+        m = len(self.m_to_ids)
+
+        self.m_ops = _align_gap((self.m_from_ids, self.m_to_ids, 
+                                 self.m_max_matrix_cells))
+
+        self.m_fwd = { 0 : self.m_cols.copy() }
+        self._forward_rows(0, m)
+        self.m_bwd = { m : (n - self.m_cols) }
+        self._backward_rows(m, 0)
+
+        self.m_region = (0, m)
+
+
+    def _prev_path_cells(self, prev_ops):
+
+        # returns (rows, cols), the cells of the previous walk path, one
+        # per operation plus [0, 0]
+
+        ops   = np.frombuffer(prev_ops.encode("ascii"), dtype=np.uint8)
+        steps = len(ops) + 1
+
+        rows = np.zeros(steps, dtype=np.int64)
+        cols = np.zeros(steps, dtype=np.int64)
+        rows[1:] = np.cumsum(ops != Levenshtein.OPB_DELETE)
+        cols[1:] = np.cumsum(ops != Levenshtein.OPB_INSERT)
+
+        return (rows, cols)
+
+
+    def _prev_path_step(self, path_cells, r, i):
+
+        # returns the index of the operation of the previous walk path 
+        # that leaves [r, i] (in the previous rows), None if the path
+        # does not pass through [r, i]
+
+        (rows, cols) = path_cells
+        lo = int(np.searchsorted(rows, r, 'left'))
+        hi = int(np.searchsorted(rows, r, 'right'))
+        k  = lo + int(np.searchsorted(cols[lo:hi], i, 'left'))
+
+        if (k < hi and cols[k] == i):
+            return k
+        return None
+
+
+    def _region(self, r0, r1):
+
+        # computes the rows r0+1..r1 of D from the checkpoint at r0.
+        # returns (ops, new checkpoints) where ops[r - r0 - 1] are the op
+        # codes of row r
+
+        n   = len(self.m_from_ids)
+        ops = np.empty((r1 - r0, n + 1), dtype=np.uint8)
+        fwd = {}
+
+        row = self.m_fwd[r0]
+        for r in range(r0 + 1, r1 + 1):
+            (row, ops[r - r0 - 1]) = self._op_row(row, self.m_to_ids[r - 1])
+            if (self._is_checkpoint(r)):
+                fwd[r] = row
+        fwd[r1] = row
+
+        return (ops, fwd)
+
+
+    def _trace_back(self, ops, r0, r1, i):
+
+        # traces the walk path back from [r1, i] to row r0. returns 
+        # (the operations from row r0 to [r1, i], the column at row r0)
+
+        op_codes = NumpyLevenshtein.OP_CODES
+        path = []
+        r    = r1
+
+        while (r > r0):
+            op = op_codes[ops[r - r0 - 1, i]]
+            path.append(op)
+            if op == Levenshtein.OP_DELETE:
+                i = i-1
+            elif op == Levenshtein.OP_INSERT:
+                r = r-1
+            else:
+                r = r-1
+                i = i-1
+
+        path.reverse()
+        return ("".join(path), i)
+
+
+    def _update(self, verbose):
+
+        # re-aligns the changed region of the previous alignment
+
+        n = len(self.m_from_ids)
+        m = len(self.m_to_ids)
+
+        prev_ops = self.m_prev_state["lev_ops"].tobytes().decode("ascii")
+        prev_m   = int(self.m_prev_state["lev_dims"][1])
+        delta    = m - prev_m
+        (ja, jb) = self.m_changed
+        jb_new   = jb + delta
+
+        if (ja == jb and delta == 0):
+            self.m_ops = prev_ops   # no change
+            self.m_fwd = dict(zip(self.m_prev_state["lev_fwd_rows"].tolist(),
+                                  self.m_prev_state["lev_fwd_costs"]))
+            self.m_bwd = dict(zip(self.m_prev_state["lev_bwd_rows"].tolist(),
+                                  self.m_prev_state["lev_bwd_costs"]))
+            self.m_region = (ja, ja)
+            return
+
+        # the checkpoints that still hold, in the rows of the new to_l
+
+        self.m_fwd = { r : costs for r, costs in 
+                       zip(self.m_prev_state["lev_fwd_rows"].tolist(),
+                           self.m_prev_state["lev_fwd_costs"])
+                       if r <= ja }
+        self.m_bwd = { r + delta : costs for r, costs in
+                       zip(self.m_prev_state["lev_bwd_rows"].tolist(),
+                           self.m_prev_state["lev_bwd_costs"])
+                       if r >= jb }
+
+        # the previous state may lack the checkpoints next to the region
+        # (the rows below a previous region have no D, those above it
+        # have no E)
+
+        r0 = max([ r for r in self.m_fwd if r <= ja ])
+        if (ja - r0 > self.m_interval):
+            self._forward_rows(r0, ja - (ja % self.m_interval))
+        r1 = min([ r for r in self.m_bwd if r >= jb_new ])
+        if (r1 - jb_new > self.m_interval):
+            self._backward_rows(r1, jb_new + (-jb_new % self.m_interval))
+
+        path_cells = self._prev_path_cells(prev_ops)
+
+        r0 = max([ r for r in self.m_fwd if r <= ja ])
+        r1 = min([ r for r in self.m_bwd if r >= jb_new ])
+
+        while True:
+
+            if (verbose >= 1):
+                _eprint("lev:incremental:rows = ", r0, r1)
+
+            (ops, fwd) = self._region(r0, r1)
+
+            #+------------------------------------------------+
+            #| THE COLUMN AT r1 ON A PREVIOUS OPTIMAL PATH    |
+            #+------------------------------------------------+
+
+            total    = fwd[r1] + self.m_bwd[r1]
+            min_cols = np.flatnonzero(total == total.min())
+
+            if (r1 == m):
+                i1 = int(min_cols[-1])
+                suffix_ops = Levenshtein.OP_DELETE * (n - i1)
+            else:
+                i1 = None
+                for i in min_cols.tolist():
+                    k = self._prev_path_step(path_cells, r1 - delta, i)
+                    if (k != None):
+                        (i1, suffix_ops) = (i, prev_ops[k:])
+                        break
+                if (i1 == None):
+                    r1 = min([ r for r in self.m_bwd if r > r1 ])
+                    continue
+
+            #+------------------------------------------------+
+            #| THE COLUMN AT r0, WHICH MUST BE ON THE PREVIOUS |
+            #| PATH TOO                                       |
+            #+------------------------------------------------+
+
+            (region_ops, i0) = self._trace_back(ops, r0, r1, i1)
+
+            if (r0 == 0):
+                prefix_ops = Levenshtein.OP_DELETE * i0
+                break
+
+            k = self._prev_path_step(path_cells, r0, i0)
+            if (k != None):
+                prefix_ops = prev_ops[:k]
+                break
+
+            r0 = max([ r for r in self.m_fwd if r < r0 ])
+
+        self.m_ops = prefix_ops + region_ops + suffix_ops
+
+        self.m_fwd.update(fwd)
+        self.m_fwd = { r : costs for r, costs in self.m_fwd.items() 
+                       if r <= r1 }
+        self.m_bwd = { r : costs for r, costs in self.m_bwd.items() 
+                       if r >= r1 }
+
+        self.m_region = (r0, r1)
+        self.m_dist   = int(total.min())
+
+
+    def distance(self, verbose):
+
+        if (self.m_dist != -1):
+            return self.m_dist  # return result of earlier computation
+
+        n = len(self.m_from)
+        m = len(self.m_to)
+
+        if (verbose >= 1):
+            _eprint("lev:from:len = ", n)
+            _eprint("lev:to:len   = ", m)
+
+        self.m_from_ids, self.m_to_ids = \
+            intern_words(self.m_from, self.m_to, self.m_kfnx)
+        self.m_cols = np.arange(n + 1, dtype=np.int32)
+
+        if (self.m_prev_state != None and 
+            int(self.m_prev_state["lev_dims"][0]) == n):
+            self._update(verbose)
+        else:
+            self._full(verbose)
+
+        if (verbose >= 1):
+            _eprint("lev:incremental:region = ", self.m_region)
+
+        #+---------------+
+        #| SET WALK PATH |
+        #+---------------+
+
+        dist = self._set_walk_path_ops(self.m_ops)
+
+        if (self.m_dist != -1 and dist != self.m_dist):
+            err_str = "%s: walk path of distance %d found for a distance of %d" % (self.m_mn, dist, self.m_dist)
+            raise Exception (err_str)
+
+        self.m_dist = dist
+
+        #+-----------------+
+        #| RETURN DISTANCE |
+        #+-----------------+
+
+        return self.m_dist
 
 
 def utest_1(verbose):
@@ -0,0 +1,762 @@
+#+---------+
+#| IMPORTS |
+#+---------+
+
+import os
+import sys
+import traceback
+import getopt
+import re
+import time
+import select
+import signal
+import stat
+import bisect
+import itertools
+import numpy as np
+
+import srtdf_srt_compare_writer as cw_m
+import srtdf_srt_compare_reader as scr_m
+import srtdf_srt_lev as sl_m
+import srtdf_srt_reader as sr_m
+import srtdf_srt_metrics as sm_m
+import srtdf_levenshtein as lev_m
+import srtdf_pipeline as pl_m
+import srtdf_instrument as in_m
+
+#+------------------+
+#| GLOBAL VARIABLES |
+#+------------------+
+
+g_module_name = None
+
+g_def_lag_ms         = 10000
+g_def_publish_secs   = 5
+g_def_max_window     = 2000
+g_poll_secs          = 0.25     # how often a growing file is read
+g_read_size          = 1 << 16
+
+# the end of a srt entry (a blank line)
+g_entry_end_re = re.compile(rb"(?:\r\n|\r|\n)[ \t]*(?:\r\n|\r|\n)")
+
+#+-----------+
+#| FUNCTIONS |
+#+-----------+
+
+def _eprint(*args, **kwargs):
+    print(*args, file=sys.stderr, flush=True, **kwargs)
+    #sys.stderr.flush()
+
+def usage():
+    format_str = """
+NAME
+
+    %s - compares a growing transcribed srt file to the original one
+
+SYNOPSIS
+
+    %s -O original_srt_file_path -T transcribed_srt_file_path|-
+       [-L lag_ms] [-n publish_secs] [-m max_window_words] [-x idle_secs]
+       [-o csv_filepath] [-k srtcomp_filepath] [-W weight_table] ...
+       [-l language_model] [-M] [-P] [-c cache_dir] [-v] [-h]
+
+DESCRIPTION
+
+    Does what srtdf_pipeline.py does while the transcribed srt file is
+    being written, for example by a live captioning session. The file is
+    followed as it grows (as 'tail -f' does), or read from stdin if it
+    is '-'. Its entries are taken in as soon as they are complete (are
+    followed by a blank line) and their words are aligned to the words
+    of the original file.
+
+    The live edge is the end time of the last entry taken in. The
+    alignment operations of the words that are more than lag_ms behind
+    the live edge are final and are written on stdout, in the format of
+    the 'details' section of srtdf_srt_lev.py -l (the csv records and
+    the '>' and '<' lines of their entries). Only the words that are not
+    final yet, those of both files around the live edge, are aligned
+    again as new entries come in. They are at most max_window_words on
+    each side: beyond that, the oldest of them are made final whatever
+    their time.
+
+    Every publish_secs seconds, and at the end, the numbers of the words
+    made final so far are written on stdout
+
+    #--metrics--
+    live edge ms                .....
+    levenshtein_distance        .....
+    pending words               ..... .....
+    min timeDiffMs              .....
+    ...
+
+    see srtdf_srt_lev.py for the rest of them. The records that follow
+    are preceded by a '#--details--' line. The pending words are those
+    of each file that are not final yet. At the end, the words of the
+    original file that are more than lag_ms past the live edge are not
+    aligned, their number is given as 'unreached words'.
+
+    The transcribed file ends at the end of stdin, after idle_secs
+    seconds without growth, or on SIGINT/SIGTERM.
+
+    If the environment variable SRTDF_STATS_FILEPATH is set, the time
+    spent in each stage and the counters are written on that file at
+    the end (see srtdf_instrument.py).
+
+    Lines of the transcribed srt file that begin with '#' are ignored.
+
+OPTIONS
+
+    -O original_srt_file_path
+       the original/reference srt file. it must be complete.
+       this is mandatory.
+
+    -T transcribed_srt_file_path
+       the srt file that is being transcribed. '-' for stdin.
+       this is mandatory.
+
+    -L lag_ms
+       how far behind the live edge the words are made final.
+       this is optional. default is %d.
+
+    -n publish_secs
+       how often the metrics are written.
+       this is optional. default is %d.
+
+    -m max_window_words
+       the most words of each file that are aligned again.
+       this is optional. default is %d.
+
+    -x idle_secs
+       the transcribed file ends when it has not grown for idle_secs
+       seconds. not used with stdin.
+       this is optional. default is to follow the file until SIGINT or
+       SIGTERM.
+
+    -o csv_filepath
+       also write the records made final in csv format (as srtlev.csv)
+       on csv_filepath.
+       this is optional.
+
+    -k srtcomp_filepath
+       write the srt comparison (see srtdf_srt_compare_writer.py) on
+       srtcomp_filepath, the 'W' records of each transcribed entry as
+       soon as it is taken in. the entries of the two files are in the
+       order srtdf_srt_compare_writer.py gives them.
+       this is optional.
+
+    -W weight_table
+       see srtdf_srt_lev.py.
+       this is optional.
+
+    -l language_model, -M, -P, -c cache_dir
+       see srtdf_srt_compare_writer.py.
+       these are optional.
+
+    -v
+       verbose mode. debug messages are generated on stderr.
+       this is optional.
+
+    -h
+       this help.
+       this is optional.
+"""
+    usage_str = format_str % (g_module_name, g_module_name, g_def_lag_ms,
+                              g_def_publish_secs, g_def_max_window)
+    _eprint(usage_str)
+
+
+def _on_sigterm(signum, frame):
+    raise KeyboardInterrupt()
+
+#+---------+
+#| CLASSES |
+#+---------+
+
+class SrtCueTail(object):
+
+    # reads the complete entries of a srt file as it is being written.
+    # fd is a file (which is followed) or a pipe (which is read up to its
+    # end).
+
+    def __init__(self, module_name, fd, idle_secs = None):
+        self.m_mn        = module_name
+        self.m_fd        = fd
+        self.m_is_pipe   = not stat.S_ISREG(os.fstat(fd).st_mode)
+        self.m_idle_secs = idle_secs
+        self.m_buf       = b""
+        self.m_eof       = False
+        self.m_grown_s   = time.monotonic()
+
+    @property
+    def eof(self):
+        return self.m_eof
+
+    def read_cues(self, timeout_secs):
+
+        # waits at most timeout_secs for more of the file and returns the
+        # SrtCue objects of the entries completed by it
+
+        data = self._read(timeout_secs)
+        if (data):
+            self.m_buf = self.m_buf + data
+
+        if (self.m_eof):
+            (done, self.m_buf) = (self.m_buf, b"")
+        else:
+            last = None
+            for last in g_entry_end_re.finditer(self.m_buf):
+                pass
+            if (last == None):
+                return []
+            done       = self.m_buf[:last.end()]
+            self.m_buf = self.m_buf[last.end():]
+
+        return list(sr_m.parse_srt_bytes(done, True))
+
+    def _read(self, timeout_secs):
+
+        if (self.m_is_pipe):
+            (readable, w, x) = select.select([ self.m_fd ], [], [],
+                                             timeout_secs)
+            if (not readable):
+                return b""
+            data = os.read(self.m_fd, g_read_size)
+            if (not data):
+                self.m_eof = True
+            return data
+
+        data = os.read(self.m_fd, g_read_size)
+        if (data):
+            self.m_grown_s = time.monotonic()
+            return data
+
+        if (self.m_idle_secs != None and
+            time.monotonic() - self.m_grown_s >= self.m_idle_secs):
+            self.m_eof = True
+        else:
+            time.sleep(timeout_secs)
+        return b""
+
+
+class LiveAligner(object):
+
+    # aligns the words of the transcribed file, as they come, to those
+    # of the original file. the words that are not final yet (from the
+    # cursors m_ref_next and m_tran_next on) are aligned again at each
+    # step and the operations of the alignment, from its beginning, are
+    # made final as long as their words are behind the horizon.
+
+    def __init__(self, module_name, srt_parser, options, fp, csv_fp,
+                 weight_tables):
+        self.m_mn          = module_name
+        self.m_parser      = srt_parser
+        self.m_options     = options
+        self.m_fp          = fp
+        self.m_ref         = srt_parser.ts_words_in_1.words
+        self.m_ref_ts      = np.array(srt_parser.ts_words_in_1.timestamps)
+        self.m_tran        = srt_parser.ts_words_in_2.words
+        self.m_ref_next    = 0
+        self.m_tran_next   = 0
+        self.m_edge_ms     = None
+        self.m_dist        = 0
+        self.m_tables      = weight_tables
+        self.m_cols        = sm_m.MetricColumns()
+
+        print("#--details--", file=fp)
+        self.m_rd = sl_m.LevRecordDumper(module_name,
+                                         options.lev_options.col_names,
+                                         fp, True, csv_fp)
+
+    @property
+    def edge_ms(self):
+        return self.m_edge_ms
+
+    def add_cue(self, cue, tokens):
+
+        # takes in an entry of the transcribed file
+
+        pl_m.add_srt_item(self.m_parser, False, cue, tokens,
+                          self.m_options.writer_options)
+        in_m.count("live.cues")
+        if (self.m_edge_ms == None or cue.end_ms > self.m_edge_ms):
+            self.m_edge_ms = cue.end_ms
+
+    def step(self, final = False):
+
+        # aligns the words that are not final yet and makes final those
+        # that can be. all of them are made final if final is True. the
+        # words are aligned at most max_window words of each file at a 
+        # time.
+
+        if (self.m_edge_ms == None):
+            return
+
+        ref_end = int(np.searchsorted(self.m_ref_ts,
+                                      self.m_edge_ms + self.m_options.lag_ms,
+                                      "right"))
+        ref_end = max(ref_end, self.m_ref_next)
+
+        with in_m.span("live.step"):
+            while (self._step_window(ref_end, final)):
+                pass
+
+        self.m_rd.flush()
+
+    def _step_window(self, ref_end, final):
+
+        # aligns the words of the window that begins at the cursors and 
+        # makes final those that can be. returns True if the window did 
+        # not reach ref_end or the last word of the transcribed file and
+        # made words final.
+
+        max_window = self.m_options.max_window
+        horizon_ms = self.m_edge_ms - self.m_options.lag_ms
+
+        # a side with more than max_window words is cut at the time of
+        # its last word that fits, and so is the other side. the times
+        # of the transcribed words can go backwards (entries that overlap
+        # or come out of order), so that side is cut on their running
+        # maximum: the side that was cut by its own time keeps all of
+        # its max_window words and the window always makes progress.
+
+        win_ref_end  = min(ref_end, self.m_ref_next + max_window)
+        win_tran_end = min(len(self.m_tran), self.m_tran_next + max_window)
+
+        tran_max_ts = list(itertools.accumulate(
+                          (self.m_tran[j][0]
+                           for j in range(self.m_tran_next, win_tran_end)),
+                          max))
+
+        cut_ms = None
+        if (ref_end - self.m_ref_next > max_window):
+            cut_ms = self.m_ref_ts[self.m_ref_next + max_window - 1]
+        if (len(self.m_tran) - self.m_tran_next > max_window):
+            ts = tran_max_ts[-1]
+            cut_ms = ts if cut_ms == None else min(cut_ms, ts)
+
+        if (cut_ms != None):
+            win_ref_end = max(min(win_ref_end,
+                                  int(np.searchsorted(self.m_ref_ts, cut_ms,
+                                                      "right"))),
+                              self.m_ref_next)
+            win_tran_end = self.m_tran_next + \
+                               bisect.bisect_right(tran_max_ts, cut_ms)
+        truncated = (cut_ms != None)
+
+        from_l = [ self.m_ref[i] for i in range(self.m_ref_next,
+                                                win_ref_end) ]
+        to_l   = [ self.m_tran[j] for j in range(self.m_tran_next,
+                                                 win_tran_end) ]
+        if (not from_l and not to_l):
+            return False
+
+        # the oldest words are made final regardless of the horizon, as
+        # long as a side fills the window. near the end of a window that
+        # was cut short the alignment is not known, so then only those
+        # are made final, whatever the horizon and even if final is True.
+
+        need_ref  = len(from_l) - max_window // 2 \
+                        if len(from_l) >= max_window else 0
+        need_tran = len(to_l) - max_window // 2 \
+                        if len(to_l) >= max_window else 0
+        all_final = final and not truncated
+
+        lev = lev_m.NumpyLevenshtein(self.m_mn, from_l, to_l,
+                                     lambda e : e[1])
+        lev.distance(False)
+
+        num_ref  = 0
+        num_tran = 0
+        for op_rec in lev.walk():
+            (op, item_in_1, item_in_2) = op_rec
+
+            if (not all_final and num_ref >= need_ref and 
+                num_tran >= need_tran and
+                (final or truncated or
+                 (item_in_1 != None and item_in_1[0] >= horizon_ms) or
+                 (item_in_2 != None and item_in_2[0] >= horizon_ms))):
+                break
+
+            self.m_rd.dump(op_rec)
+            self.m_cols.add(op_rec)
+            if (op != lev_m.Levenshtein.OP_MATCH):
+                self.m_dist = self.m_dist + 1
+            if (item_in_1 != None):
+                num_ref = num_ref + 1
+            if (item_in_2 != None):
+                num_tran = num_tran + 1
+
+        self.m_ref_next  = self.m_ref_next + num_ref
+        self.m_tran_next = self.m_tran_next + num_tran
+
+        if (self.m_options.debug):
+            _eprint("%s:debug:edge %d ms, aligned %d x %d words, %d x %d made final" %
+                    (self.m_mn, self.m_edge_ms, len(from_l), len(to_l),
+                     num_ref, num_tran))
+
+        # a window that was cut short but made nothing final would be
+        # aligned again as is
+
+        return truncated and (num_ref > 0 or num_tran > 0)
+
+    def publish(self, final = False):
+
+        # writes the metrics of the words made final so far
+
+        self.m_rd.flush()
+        in_m.count("live.publishes")
+
+        lines = [ "#--metrics--",
+                  "live edge ms                %s" %
+                    ("NA" if self.m_edge_ms == None else self.m_edge_ms),
+                  "levenshtein_distance        %d" % self.m_dist,
+                  "pending words               %d %d" %
+                    (len(self.m_ref_ts) - self.m_ref_next if not final else 0,
+                     len(self.m_tran) - self.m_tran_next) ]
+        if (final):
+            lines.append("unreached words             %d" %
+                         (len(self.m_ref_ts) - self.m_ref_next))
+
+        lines = lines + sm_m.metrics_section_lines(
+                            sm_m.SrtMetrics(self.m_cols, self.m_tables))
+        if (not final):
+            lines.append("#--details--")
+
+        print("\n".join(lines), file=self.m_fp, flush=True)
+
+
+class SrtCompWriter(object):
+
+    # writes the srt comparison of the two files as the entries of the
+    # transcribed file come. an entry of the transcribed file follows
+    # the entry of the original file in whose time range it begins (see
+    # cw_m.merge_srt_items), so the entries of the original file are
+    # written up to the first one that ends after it begins.
+
+    def __init__(self, module_name, fp, items_in_1, tokens_l_1, wopt):
+        self.m_mn        = module_name
+        self.m_fp        = fp
+        self.m_items_1   = items_in_1
+        self.m_tokens_1  = tokens_l_1
+        self.m_wopt      = wopt
+        self.m_lpad_str  = ' ' * wopt.indent_2_by
+        self.m_next      = 0
+
+    def _dump_org_item(self):
+        i = self.m_next
+        cw_m.dump_srt_item(self.m_items_1[i], self.m_tokens_1[i],
+                           self.m_wopt.prefix_1, "", self.m_wopt, self.m_fp)
+        self.m_next = i + 1
+
+    def add_cue(self, cue, tokens):
+        items = self.m_items_1
+        while (self.m_next < len(items) and
+               (self.m_next == 0 or
+                items[self.m_next - 1].end_ms < cue.start_ms)):
+            self._dump_org_item()
+        cw_m.dump_srt_item(cue, tokens, self.m_wopt.prefix_2,
+                           self.m_lpad_str, self.m_wopt, self.m_fp)
+
+    def flush(self):
+        self.m_fp.flush()
+
+    def close(self):
+        while (self.m_next < len(self.m_items_1)):
+            self._dump_org_item()
+        in_m.count_output_bytes(self.m_fp)
+        self.m_fp.close()
+
+
+class Options(object):
+
+    def __init__(self, module_name):
+        self.m_mn               = module_name
+        self.m_org_filepath     = None
+        self.m_tran_filepath    = None
+        self.m_lag_ms           = g_def_lag_ms
+        self.m_publish_secs     = g_def_publish_secs
+        self.m_max_window       = g_def_max_window
+        self.m_idle_secs        = None
+        self.m_csv_filepath     = None
+        self.m_srtcomp_filepath = None
+        self.m_debug            = False
+
+        # options passed on to the steps of the pipeline
+
+        self.m_writer_options = cw_m.Options(module_name)
+        self.m_lev_options    = sl_m.Options(module_name)
+        self.m_lev_options.lengthy   = True
+        self.m_lev_options.col_names = pl_m.g_def_col_names
+
+    @property
+    def org_filepath(self):
+        return self.m_org_filepath
+
+    @org_filepath.setter
+    def org_filepath(self, v):
+        if (not os.path.isfile(v)):
+            err_str = "%s: file %s not present" % (self.m_mn, v)
+            raise Exception (err_str)
+        self.m_org_filepath = v
+
+    @property
+    def tran_filepath(self):
+        return self.m_tran_filepath
+
+    @tran_filepath.setter
+    def tran_filepath(self, v):
+        if (v != "-" and not os.path.exists(v)):
+            err_str = "%s: file %s not present" % (self.m_mn, v)
+            raise Exception (err_str)
+        self.m_tran_filepath = v
+
+    @property
+    def lag_ms(self):
+        return self.m_lag_ms
+
+    @lag_ms.setter
+    def lag_ms(self, v):
+        self.m_lag_ms = v
+
+    @property
+    def publish_secs(self):
+        return self.m_publish_secs
+
+    @publish_secs.setter
+    def publish_secs(self, v):
+        self.m_publish_secs = v
+
+    @property
+    def max_window(self):
+        return self.m_max_window
+
+    @max_window.setter
+    def max_window(self, v):
+        if (v < 2):
+            err_str = "%s: -m must be at least 2" % (self.m_mn)
+            raise Exception (err_str)
+        self.m_max_window = v
+
+    @property
+    def idle_secs(self):
+        return self.m_idle_secs
+
+    @idle_secs.setter
+    def idle_secs(self, v):
+        self.m_idle_secs = v
+
+    @property
+    def csv_filepath(self):
+        return self.m_csv_filepath
+
+    @csv_filepath.setter
+    def csv_filepath(self, v):
+        self.m_csv_filepath = v
+
+    @property
+    def srtcomp_filepath(self):
+        return self.m_srtcomp_filepath
+
+    @srtcomp_filepath.setter
+    def srtcomp_filepath(self, v):
+        self.m_srtcomp_filepath = v
+
+    @property
+    def debug(self):
+        return self.m_debug
+
+    @debug.setter
+    def debug(self, v):
+        self.m_debug = v
+        self.m_writer_options.debug = v
+        self.m_lev_options.debug    = v
+
+    @property
+    def writer_options(self):
+        return self.m_writer_options
+
+    @property
+    def lev_options(self):
+        return self.m_lev_options
+
+    def parse_cmdline(self):
+        opts, args = \
+            getopt.getopt(sys.argv[1:],
+                    "O:T:L:n:m:x:o:k:W:l:MPc:vh",
+                    [
+                      "org=",
+                      "tran=",
+                      "lag-ms=",
+                      "publish-secs=",
+                      "max-window=",
+                      "idle-secs=",
+                      "csv-filepath=",
+                      "srtcomp-filepath=",
+                      "weight-table=",
+                      "lang-model=",
+                      "minimal-pipeline",
+                      "suppress-pos",
+                      "cache-dir=",
+                      "verbose",
+                      "help"
+                    ])
+
+        for o, v in opts:
+            if o in ("-h", "--help"):
+                usage()
+                sys.exit(0)
+            elif o in ("-O", "--org"):
+                self.org_filepath = v
+            elif o in ("-T", "--tran"):
+                self.tran_filepath = v
+            elif o in ("-L", "--lag-ms"):
+                self.lag_ms = int(v)
+            elif o in ("-n", "--publish-secs"):
+                self.publish_secs = float(v)
+            elif o in ("-m", "--max-window"):
+                self.max_window = int(v)
+            elif o in ("-x", "--idle-secs"):
+                self.idle_secs = float(v)
+            elif o in ("-o", "--csv-filepath"):
+                self.csv_filepath = v
+            elif o in ("-k", "--srtcomp-filepath"):
+                self.srtcomp_filepath = v
+            elif o in ("-W", "--weight-table"):
+                self.lev_options.weight_tables.append(v)
+            elif o in ("-l", "--lang-model"):
+                self.writer_options.lang_model = v
+            elif o in ("-M", "--minimal-pipeline"):
+                self.writer_options.minimal_pipeline = True
+            elif o in ("-P", "--suppress-pos"):
+                self.writer_options.suppress_pos = True
+            elif o in ("-c", "--cache-dir"):
+                self.writer_options.cache_dir = v
+            elif o in ("-v", "--verbose"):
+                self.debug = True
+
+        if (self.m_org_filepath == None):
+            err_str = "%s: -O option not specified" % (self.m_mn)
+            raise Exception (err_str)
+
+        if (self.m_tran_filepath == None):
+            err_str = "%s: -T option not specified" % (self.m_mn)
+            raise Exception (err_str)
+
+        self.lev_options.new_weight_tables()    # checks the -W values
+
+    #https://dbader.org/blog/python-repr-vs-str
+
+    def __str__(self):
+        ret = {
+                "--org"              : self.m_org_filepath,
+                "--tran"             : self.m_tran_filepath,
+                "--lag-ms"           : self.m_lag_ms,
+                "--publish-secs"     : self.m_publish_secs,
+                "--max-window"       : self.m_max_window,
+                "--idle-secs"        : self.m_idle_secs,
+                "--csv-filepath"     : self.m_csv_filepath,
+                "--srtcomp-filepath" : self.m_srtcomp_filepath,
+                "--verbose"          : self.m_debug,
+                "writer"             : str(self.m_writer_options),
+                "lev"                : str(self.m_lev_options)
+              }
+        return str(ret)
+
+#+------+
+#| MAIN |
+#+------+
+
+if __name__ == '__main__':
+
+    try:
+        g_module_name  = os.path.basename(__file__)
+        cw_m.g_module_name = g_module_name
+        sl_m.g_module_name = g_module_name
+        sm_m.g_module_name = g_module_name
+        pl_m.g_module_name = g_module_name
+
+        options = Options(g_module_name)
+        options.parse_cmdline()
+        in_m.enable_from_env()
+        if (options.debug):
+            _eprint("%s:debug:options:%s" %
+                    (g_module_name, str(options)))
+
+        signal.signal(signal.SIGTERM, _on_sigterm)
+
+        wopt = options.writer_options
+
+        # the original file, at once
+
+        items_in_1 = pl_m.load_srt_items(options.org_filepath)
+        tokens_l_1 = cw_m.tokenize_texts(
+                        [ cw_m.srt_item_text(item) for item in items_in_1 ],
+                        wopt)
+
+        srt_parser = scr_m.SrtCompareReader(g_module_name)
+        for item, tokens in zip(items_in_1, tokens_l_1):
+            pl_m.add_srt_item(srt_parser, True, item, tokens, wopt)
+
+        csv_fp = None
+        if (options.csv_filepath != None):
+            csv_fp = open(options.csv_filepath, "w")
+
+        srtcomp_w = None
+        if (options.srtcomp_filepath != None):
+            srtcomp_w = SrtCompWriter(g_module_name,
+                                      open(options.srtcomp_filepath, "w"),
+                                      items_in_1, tokens_l_1, wopt)
+
+        aligner = LiveAligner(g_module_name, srt_parser, options,
+                              sys.stdout, csv_fp,
+                              options.lev_options.new_weight_tables())
+
+        # the transcribed file, as it comes
+
+        if (options.tran_filepath == "-"):
+            fd = sys.stdin.fileno()
+        else:
+            fd = os.open(options.tran_filepath, os.O_RDONLY)
+        tail = SrtCueTail(g_module_name, fd, options.idle_secs)
+
+        published_s = time.monotonic()
+
+        try:
+            while (not tail.eof):
+                cues = tail.read_cues(g_poll_secs)
+
+                if (cues):
+                    tokens_l = cw_m.tokenize_texts(
+                                [ cw_m.srt_item_text(c) for c in cues ], wopt)
+                    for cue, tokens in zip(cues, tokens_l):
+                        aligner.add_cue(cue, tokens)
+                        if (srtcomp_w != None):
+                            srtcomp_w.add_cue(cue, tokens)
+                    if (srtcomp_w != None):
+                        srtcomp_w.flush()
+                    aligner.step()
+
+                if (time.monotonic() - published_s >= options.publish_secs):
+                    aligner.publish()
+                    published_s = time.monotonic()
+
+        except KeyboardInterrupt:
+            if (options.debug):
+                _eprint("%s:debug:interrupted" % (g_module_name))
+
+        aligner.step(True)
+        aligner.publish(True)
+
+        if (srtcomp_w != None):
+            srtcomp_w.close()
+        if (csv_fp != None):
+            in_m.count_output_bytes(csv_fp)
+            csv_fp.close()
+        in_m.count_output_bytes(sys.stdout)
+        in_m.write_summary(g_module_name)
+
+    except:
+        traceback.print_exc()
+        sys.exit(1)
+
+    sys.exit(0)
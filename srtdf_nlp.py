@@ -0,0 +1,130 @@
+
+#+---------+
+#| IMPORTS |
+#+---------+
+
+import os
+import sys
+import spacy
+
+#+------------------+
+#| GLOBAL VARIABLES |
+#+------------------+
+
+PIPELINE_FULL      = "full"         # all components of the model
+PIPELINE_MINIMAL   = "minimal"      # tokenizer + components needed for pos
+PIPELINE_TOKENIZER = "tokenizer"    # tokenizer only. no pos.
+
+POS_UNKNOWN = "?"   # used when pos is not computed. not a spacy pos tag
+
+# components of the spacy models that are not needed to arrive at
+# token.text, token.pos_ and token.is_stop.
+# (tok2vec, tagger and attribute_ruler are needed for pos)
+
+g_non_pos_components = [
+        "parser",
+        "senter",
+        "ner",
+        "entity_ruler",
+        "entity_linker",
+        "lemmatizer",
+        "trainable_lemmatizer",
+        "morphologizer",
+        "textcat",
+        "textcat_multilabel",
+        "spancat",
+        "span_finder"
+    ]
+
+g_pos_components = [
+        "tok2vec",
+        "tagger",
+        "attribute_ruler"
+    ]
+
+#+-----------+
+#| FUNCTIONS |
+#+-----------+
+
+def _eprint(*args, **kwargs):
+    print(*args, file=sys.stderr, flush=True, **kwargs)
+    #sys.stderr.flush()
+
+
+def load_nlp(model_name, pipeline, debug=False):
+
+    # loads the spacy model with only the components required by the
+    # pipeline (one of PIPELINE_*). the tokenizer and the vocabulary
+    # (hence token.is_stop) are always present.
+
+    if (pipeline == PIPELINE_FULL):
+        excluded = []
+    elif (pipeline == PIPELINE_MINIMAL):
+        excluded = g_non_pos_components
+    elif (pipeline == PIPELINE_TOKENIZER):
+        excluded = g_non_pos_components + g_pos_components
+    else:
+        raise Exception ("invalid pipeline %s" % (pipeline))
+
+    try:
+        nlp = spacy.load(model_name, exclude=excluded)
+    except TypeError:
+        # spacy 2.x does not know about exclude
+        nlp = spacy.load(model_name, disable=excluded)
+
+    if (debug):
+        _eprint("nlp:debug:model=%s pipeline=%s components=%s" %
+                (model_name, pipeline, str(nlp.pipe_names)))
+
+    return nlp
+
+
+def has_pos(pipeline):
+    return (pipeline != PIPELINE_TOKENIZER)
+
+
+def token_pos(token, pipeline):
+    if (has_pos(pipeline)):
+        return token.pos_
+    return POS_UNKNOWN
+
+
+def is_punct(token, pipeline):
+    if (has_pos(pipeline)):
+        return (token.pos_ == "PUNCT")
+    return token.is_punct
+
+
+def doc_tokens(doc, pipeline):
+
+    # returns the (text, pos, is_stop) tuples of the words of a spacy doc.
+    # punctuation is left out.
+
+    return [ (token.text, token_pos(token, pipeline), token.is_stop)
+             for token in doc if not is_punct(token, pipeline) ]
+
+
+def model_version(model_name, nlp=None):
+
+    # returns the version of the spacy model. 
+    # the model (nlp) is only consulted if the installed package or the 
+    # model folder does not tell.
+
+    version = None
+
+    try:
+        version = spacy.util.get_package_version(model_name)
+    except Exception:
+        pass
+
+    if (version == None and os.path.isdir(model_name)):
+        try:
+            version = spacy.util.get_model_meta(model_name)["version"]
+        except Exception:
+            pass
+
+    if (version == None and nlp != None):
+        version = nlp.meta.get("version")
+
+    return version
+
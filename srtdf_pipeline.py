@@ -0,0 +1,622 @@
+#+---------+
+#| IMPORTS |
+#+---------+
+
+import os
+import sys
+import traceback
+import getopt
+
+import srtdf_srt_compare_writer as cw_m
+import srtdf_srt_compare_reader as scr_m
+import srtdf_srt_lev as sl_m
+import srtdf_srt_prepare as sp_m
+import srtdf_instrument as in_m
+import srtdf_srt_reader as sr_m
+import srtdf_rescore_state as rs_m
+import srtdf_srt_metrics as sm_m
+
+#+------------------+
+#| GLOBAL VARIABLES |
+#+------------------+
+
+g_module_name = None
+g_def_col_names = "ORG_TS,ORG_WORD,ORG_POS,ORG_ISSTOP,LEV_OP,TRAN_TS,TRAN_WORD,TRAN_POS,TRAN_ISSTOP,TS_DIFF"
+
+#+-----------+
+#| FUNCTIONS |
+#+-----------+
+
+def _eprint(*args, **kwargs):
+    print(*args, file=sys.stderr, flush=True, **kwargs)
+    #sys.stderr.flush()
+
+def usage():
+    format_str = """
+NAME
+
+    %s - calculates the levenshtein distance between two srt files
+
+SYNOPSIS
+
+    %s -O original_srt_file_path -T transcribed_srt_file_path
+       [-d output_folder_path] [-p output_files_prefix] [-k]
+       [-I [-t tolerance_ms] [-w wpm]] [-l language_model] [-M] [-P] [-c cache_dir]
+       [-E engine] [-B band_ms] [-A [-j num_jobs]] [-S state_file_path]
+       [-W weight_table] ... [-v] [-h]
+
+DESCRIPTION
+
+    Does what srt_diff.sh does in a single python process. The srt items
+    of the two files, their words, the levenshtein alignment and the csv
+    records are passed from one step to the next as objects instead of
+    being written to and parsed back from the interim text files.
+
+    The distance is echoed on stdout followed by the paths of the files
+    that were written.
+
+    The following file is always written
+
+        levenshtein details in csv format (same as srt_diff.sh)
+        {output_files_prefix}srtlev.csv
+
+    The following interim files are written only if -k is specified
+
+        (a) srt comparison between the two files
+            {output_files_prefix}srtcomp.txt
+
+        (b) srt comparison (see (a)) with levenshtein details and distance
+            {output_files_prefix}srtcomplev.txt
+
+    Lines of the transcribed srt file that begin with '#' are ignored.
+
+OPTIONS
+
+    -O original_srt_file_path
+       the original/reference srt file.
+       this is mandatory.
+
+    -T transcribed_srt_file_path
+       the srt file that is the result of a transcription session.
+       this is mandatory.
+
+    -d output_folder_path
+       the folder in which the files are written.
+       this is optional. default is the current folder.
+
+    -p output_files_prefix
+       the prefix to be used for the files written.
+       this is optional. default is ''.
+
+    -k
+       keep (write) the interim files.
+       this is optional.
+
+    -I
+       prepare the srt files as my_d_srtdiff.sh does before comparing
+       them. they are normalized (srtdf_utf8_base.sh) and their end 
+       times are inferred (srtdf_infer_endtime.sh), in memory, by
+       srtdf_srt_prepare.py.
+       this is optional.
+
+    -t tolerance_ms, -w wpm
+       the -t and -w options of srtdf_srt_prepare.py. used with -I.
+       these are optional.
+
+    -l language_model, -M, -P, -c cache_dir
+       see srtdf_srt_compare_writer.py.
+       these are optional.
+
+    -E engine, -B band_ms, -A, -j num_jobs, -W weight_table
+       see srtdf_srt_lev.py. the metrics (see -W) are written in 
+       srtcomplev.txt, hence only with -k.
+       these are optional.
+
+    -S state_file_path
+       re-score incrementally. the words of both files, the tokens of
+       their texts and the levenshtein alignment (with the rows of the
+       cost matrix at checkpoints) are saved in state_file_path. when it
+       is run again with the same original file and the same -l, -M and
+       -P options, only the texts that are new are tokenized and only
+       the rows of the alignment from the first to the last changed
+       segment of the transcribed file are recomputed. the state is 
+       rewritten after each run. it is not used if the original file or
+       those options have changed. 
+       cannot be used with -E, -B or -A.
+       this is optional.
+
+    -v
+       verbose mode. debug messages are generated on stderr.
+       this is optional.
+
+    -h
+       this help.
+       this is optional.
+"""
+    usage_str = format_str % (g_module_name, g_module_name)
+    _eprint(usage_str)
+
+
+def parse_srt_text(text, strip_comments = False):
+
+    # returns the srt items (see srtdf_srt_reader.py) of the contents of
+    # a srt file. lines beginning with '#' are dropped first if 
+    # strip_comments is True.
+
+    return sr_m.parse_srt_string(text, strip_comments)
+
+
+def load_srt_items(filepath, strip_comments = False):
+
+    # returns the srt items of the srt file. see parse_srt_text.
+
+    return sr_m.read_srt_file(filepath, strip_comments)
+
+
+def add_srt_item(srt_parser, in_1, item, tokens, wopt):
+
+    # adds the segment and the words of a srt item (of the first file if
+    # in_1 is True) to srt_parser, as if it had parsed the lines that
+    # cw_m.dump_srt_item writes for the item
+
+    range_start_ms = item.start_ms
+    range_end_ms   = item.end_ms
+    srt_string     = cw_m.srt_item_text(item).encode(
+                            'ascii', 'ignore').decode('ascii')
+
+    srt_parser.add(in_1,
+                   item.index, item.start_str, item.end_str,
+                   range_start_ms, range_end_ms,
+                   range_end_ms - range_start_ms,
+                   srt_string,
+                   cw_m.srt_item_words(item, tokens, wopt))
+
+
+def rescore_signature(wopt):
+
+    # the writer options that the words of a rescore state depend on
+
+    return {
+             "lang_model" : wopt.lang_model,
+             "version"    : cw_m.model_version(wopt),
+             "pipeline"   : wopt.pipeline,
+             "to_lower"   : wopt.to_lower,
+             "too"        : wopt.too,
+             "too_mode"   : wopt.too_mode
+           }
+
+
+def tokenize_new_texts(texts, wopt, known_tokens):
+
+    # returns the tokens of each of the texts as tokenize_texts does. 
+    # known_tokens maps texts to their tokens; only the texts it does not
+    # have are tokenized. it is left with the tokens of the texts only.
+
+    new_texts = list(dict.fromkeys(
+                    [ t for t in texts if not t in known_tokens ]))
+
+    if (len(new_texts) > 0):
+        known_tokens.update(zip(new_texts,
+                                cw_m.tokenize_texts(new_texts, wopt)))
+
+    texts_set = set(texts)
+    for t in [ t for t in known_tokens if not t in texts_set ]:
+        del known_tokens[t]
+
+    if (wopt.debug):
+        _eprint("%s:debug:tokenized %d of %d texts" %
+                (g_module_name, len(new_texts), len(texts)))
+
+    return [ known_tokens[t] for t in texts ]
+
+
+def compare_srt_items(items_in_1, items_in_2, options, srtcomp_fp = None,
+                      known_tokens = None):
+
+    # returns a SrtCompareReader filled with the segments and words of
+    # the two lists of srt items, as if it had parsed the output of
+    # srtdf_srt_compare_writer.py. that output is written on srtcomp_fp,
+    # if it is not None. see tokenize_new_texts for known_tokens.
+
+    wopt     = options.writer_options
+    lpad_str = ' ' * wopt.indent_2_by
+
+    merged = cw_m.merge_srt_items(items_in_1, items_in_2, wopt, lpad_str)
+
+    texts = [ cw_m.srt_item_text(item) for (item, p, l) in merged ]
+
+    if (known_tokens == None):
+        tokens_l = cw_m.tokenize_texts(texts, wopt)
+    else:
+        tokens_l = tokenize_new_texts(texts, wopt, known_tokens)
+
+    srt_parser = scr_m.SrtCompareReader(g_module_name)
+
+    for tokens, (item, prefix_str, item_lpad_str) in zip(tokens_l, merged):
+
+        add_srt_item(srt_parser, prefix_str == wopt.prefix_1, item, tokens,
+                     wopt)
+
+        if (srtcomp_fp != None):
+            cw_m.dump_srt_item(item, tokens, prefix_str, item_lpad_str,
+                               wopt, srtcomp_fp)
+
+    return srt_parser
+
+
+def diff_srt_items(items_in_1, items_in_2, options, csv_fp,
+                   srtcomp_fp = None, srtcomplev_fp = None):
+
+    # compares the two lists of srt items and returns the levenshtein
+    # distance. the levenshtein details are written on csv_fp in the 
+    # format of srtlev.csv. the contents of srtcomp.txt and srtcomplev.txt
+    # are written on srtcomp_fp and srtcomplev_fp, if they are not None.
+
+    lopt = options.lev_options
+
+    if (options.state_filepath == None):
+        srt_parser = compare_srt_items(items_in_1, items_in_2, options,
+                                       srtcomp_fp)
+        words_1 = srt_parser.ts_words_in_1.words
+        words_2 = srt_parser.ts_words_in_2.words
+        lev = sl_m.new_levenshtein(lopt, words_1, words_2)
+        lev_dist = sl_m.lev_distance(lev, words_1, words_2, lopt.debug)
+    else:
+        rescore_state = rs_m.load_rescore_state(
+                            g_module_name, options.state_filepath,
+                            rescore_signature(options.writer_options))
+        srt_parser = compare_srt_items(items_in_1, items_in_2, options,
+                                       srtcomp_fp, rescore_state.tokens)
+        words_1 = srt_parser.ts_words_in_1.words
+        words_2 = srt_parser.ts_words_in_2.words
+        lev = rescore_state.new_levenshtein(words_1, words_2,
+                                            lopt.max_matrix_cells)
+        lev_dist = sl_m.lev_distance(lev, words_1, words_2, lopt.debug)
+        if (lopt.debug):
+            _eprint("%s:debug:rescore region:%s" %
+                    (g_module_name, str(lev.region)))
+        rescore_state.update(words_1, words_2, lev)
+        rescore_state.save(options.state_filepath)
+
+    if (lopt.band_ms != None and lev.band_excess > 0):
+        _eprint("%s:warning:the %d ms band may have constrained the alignment. the distance may exceed the smallest one by up to %d (the path touches the edge of the band at %d places). a larger -B value may reduce it" %
+                (g_module_name, lopt.band_ms, lev.band_excess,
+                 lev.band_edge_hits))
+
+    with in_m.span("lev.details"):
+        write_lev_details(lev, lev_dist, lopt, csv_fp, srtcomplev_fp)
+
+    return lev_dist
+
+
+def write_lev_details(lev, lev_dist, lopt, csv_fp, srtcomplev_fp = None):
+
+    # writes the levenshtein details of lev on csv_fp, and the contents
+    # of srtcomplev.txt on srtcomplev_fp if it is not None
+
+    if (srtcomplev_fp != None):
+        print("%d" % lev_dist, file=srtcomplev_fp)
+        print("#--details--", file=srtcomplev_fp)
+        lev_rd = sl_m.LevRecordDumper(g_module_name, lopt.col_names,
+                                      srtcomplev_fp, True, csv_fp)
+        metric_cols = sm_m.MetricColumns()
+    else:
+        lev_rd = sl_m.LevRecordDumper(g_module_name, lopt.col_names,
+                                      csv_fp, False)
+        metric_cols = None
+
+    for op_rec in lev.walk():
+        lev_rd.dump(op_rec)
+        if (metric_cols != None):
+            metric_cols.add(op_rec)
+    lev_rd.flush()
+
+    if (srtcomplev_fp != None):
+        print("#--metrics--", file=srtcomplev_fp)
+        print("\n".join(sm_m.metrics_section_lines(
+                sm_m.SrtMetrics(metric_cols, lopt.new_weight_tables()))),
+              file=srtcomplev_fp)
+
+
+def diff_srt_files(options):
+
+    # runs the pipeline. returns the levenshtein distance and the paths
+    # of the files written.
+
+    def out_path(name):
+        return os.path.join(options.output_folder,
+                            options.output_prefix + name)
+
+    srtlev_path     = out_path("srtlev.csv")
+    srtcomp_path    = out_path("srtcomp.txt")
+    srtcomplev_path = out_path("srtcomplev.txt")
+    paths           = [ srtlev_path ]
+
+    os.makedirs(options.output_folder, exist_ok = True)
+
+    if (options.prepare):
+        items_in_1 = sp_m.load_srt_items(options.org_filepath,
+                                         options.wpm, options.tolerance)
+        items_in_2 = sp_m.load_srt_items(options.tran_filepath,
+                                         options.wpm, options.tolerance)
+    else:
+        items_in_1 = load_srt_items(options.org_filepath)
+        items_in_2 = load_srt_items(options.tran_filepath, True)
+
+    if (not options.keep_interim):
+        with open(srtlev_path, "w") as csv_fp:
+            lev_dist = diff_srt_items(items_in_1, items_in_2, options,
+                                      csv_fp)
+            in_m.count_output_bytes(csv_fp)
+        return (lev_dist, paths)
+
+    paths = paths + [ srtcomp_path, srtcomplev_path ]
+
+    with open(srtlev_path, "w") as csv_fp, \
+         open(srtcomp_path, "w") as srtcomp_fp, \
+         open(srtcomplev_path, "w") as srtcomplev_fp:
+        lev_dist = diff_srt_items(items_in_1, items_in_2, options,
+                                  csv_fp, srtcomp_fp, srtcomplev_fp)
+        for fp in (csv_fp, srtcomp_fp, srtcomplev_fp):
+            in_m.count_output_bytes(fp)
+
+    return (lev_dist, paths)
+
+#+---------+
+#| CLASSES |
+#+---------+
+
+class Options(object):
+
+    def __init__(self, module_name):
+        self.m_mn             = module_name
+        self.m_org_filepath   = None
+        self.m_tran_filepath  = None
+        self.m_output_folder  = "."
+        self.m_output_prefix  = ""
+        self.m_keep_interim   = False
+        self.m_prepare        = False
+        self.m_tolerance      = None
+        self.m_wpm            = None
+        self.m_state_filepath = None
+        self.m_debug          = False
+
+        # options passed on to the steps of the pipeline
+
+        self.m_writer_options = cw_m.Options(module_name)
+        self.m_lev_options    = sl_m.Options(module_name)
+        self.m_lev_options.lengthy   = True
+        self.m_lev_options.col_names = g_def_col_names
+
+    @property
+    def org_filepath(self):
+        return self.m_org_filepath
+
+    @org_filepath.setter
+    def org_filepath(self, v):
+        if (not os.path.isfile(v)):
+            err_str = "%s: file %s not present" % (self.m_mn, v)
+            raise Exception (err_str)
+        self.m_org_filepath = v
+
+    @property
+    def tran_filepath(self):
+        return self.m_tran_filepath
+
+    @tran_filepath.setter
+    def tran_filepath(self, v):
+        if (not os.path.isfile(v)):
+            err_str = "%s: file %s not present" % (self.m_mn, v)
+            raise Exception (err_str)
+        self.m_tran_filepath = v
+
+    @property
+    def output_folder(self):
+        return self.m_output_folder
+
+    @output_folder.setter
+    def output_folder(self, v):
+        self.m_output_folder = v
+
+    @property
+    def output_prefix(self):
+        return self.m_output_prefix
+
+    @output_prefix.setter
+    def output_prefix(self, v):
+        self.m_output_prefix = v
+
+    @property
+    def keep_interim(self):
+        return self.m_keep_interim
+
+    @keep_interim.setter
+    def keep_interim(self, v):
+        self.m_keep_interim = v
+
+    @property
+    def prepare(self):
+        return self.m_prepare
+
+    @prepare.setter
+    def prepare(self, v):
+        self.m_prepare = v
+
+    @property
+    def tolerance(self):
+        return self.m_tolerance
+
+    @tolerance.setter
+    def tolerance(self, v):
+        self.m_tolerance = v
+
+    @property
+    def wpm(self):
+        return self.m_wpm
+
+    @wpm.setter
+    def wpm(self, v):
+        self.m_wpm = v
+
+    @property
+    def state_filepath(self):
+        return self.m_state_filepath
+
+    @state_filepath.setter
+    def state_filepath(self, v):
+        self.m_state_filepath = v
+
+    @property
+    def debug(self):
+        return self.m_debug
+
+    @debug.setter
+    def debug(self, v):
+        self.m_debug = v
+        self.m_writer_options.debug = v
+        self.m_lev_options.debug    = v
+
+    @property
+    def writer_options(self):
+        return self.m_writer_options
+
+    @property
+    def lev_options(self):
+        return self.m_lev_options
+
+    def parse_cmdline(self):
+        opts, args = \
+            getopt.getopt(sys.argv[1:],
+                    "O:T:d:p:kIt:w:l:MPc:E:B:Aj:S:W:vh",
+                    [
+                      "org=",
+                      "tran=",
+                      "output-folder=",
+                      "output-prefix=",
+                      "keep-interim",
+                      "prepare",
+                      "tolerance=",
+                      "wpm=",
+                      "lang-model=",
+                      "minimal-pipeline",
+                      "suppress-pos",
+                      "cache-dir=",
+                      "engine=",
+                      "band-ms=",
+                      "anchored",
+                      "num-jobs=",
+                      "state-filepath=",
+                      "weight-table=",
+                      "verbose",
+                      "help"
+                    ])
+
+        for o, v in opts:
+            if o in ("-h", "--help"):
+                usage()
+                sys.exit(0)
+            elif o in ("-O", "--org"):
+                self.org_filepath = v
+            elif o in ("-T", "--tran"):
+                self.tran_filepath = v
+            elif o in ("-d", "--output-folder"):
+                self.output_folder = v
+            elif o in ("-p", "--output-prefix"):
+                self.output_prefix = v
+            elif o in ("-k", "--keep-interim"):
+                self.keep_interim = True
+            elif o in ("-I", "--prepare"):
+                self.prepare = True
+            elif o in ("-t", "--tolerance"):
+                self.tolerance = int(v)
+            elif o in ("-w", "--wpm"):
+                self.wpm = int(v)
+            elif o in ("-l", "--lang-model"):
+                self.writer_options.lang_model = v
+            elif o in ("-M", "--minimal-pipeline"):
+                self.writer_options.minimal_pipeline = True
+            elif o in ("-P", "--suppress-pos"):
+                self.writer_options.suppress_pos = True
+            elif o in ("-c", "--cache-dir"):
+                self.writer_options.cache_dir = v
+            elif o in ("-E", "--engine"):
+                self.lev_options.engine = v
+            elif o in ("-B", "--band-ms"):
+                self.lev_options.band_ms = int(v)
+            elif o in ("-A", "--anchored"):
+                self.lev_options.anchored = True
+            elif o in ("-j", "--num-jobs"):
+                self.lev_options.num_jobs = int(v)
+            elif o in ("-W", "--weight-table"):
+                self.lev_options.weight_tables.append(v)
+            elif o in ("-S", "--state-filepath"):
+                self.state_filepath = v
+            elif o in ("-v", "--verbose"):
+                self.debug = True
+
+        if (self.m_org_filepath == None):
+            err_str = "%s: -O option not specified" % (self.m_mn)
+            raise Exception (err_str)
+
+        if (self.m_tran_filepath == None):
+            err_str = "%s: -T option not specified" % (self.m_mn)
+            raise Exception (err_str)
+
+        if (self.m_state_filepath != None and
+            (self.lev_options.engine != "auto" or 
+             self.lev_options.band_ms != None or self.lev_options.anchored)):
+            err_str = "%s: -S cannot be used with -E, -B or -A" % (self.m_mn)
+            raise Exception (err_str)
+
+        self.lev_options.new_weight_tables()    # checks the -W values
+
+    #https://dbader.org/blog/python-repr-vs-str
+
+    def __str__(self):
+        ret = {
+                "--org"           : self.m_org_filepath,
+                "--tran"          : self.m_tran_filepath,
+                "--output-folder" : self.m_output_folder,
+                "--output-prefix" : self.m_output_prefix,
+                "--keep-interim"  : self.m_keep_interim,
+                "--prepare"       : self.m_prepare,
+                "--tolerance"     : self.m_tolerance,
+                "--wpm"           : self.m_wpm,
+                "--state-filepath": self.m_state_filepath,
+                "--verbose"       : self.m_debug,
+                "writer"          : str(self.m_writer_options),
+                "lev"             : str(self.m_lev_options)
+              }
+        return str(ret)
+
+#+------+
+#| MAIN |
+#+------+
+
+if __name__ == '__main__':
+
+    try:
+        g_module_name  = os.path.basename(__file__)
+        cw_m.g_module_name = g_module_name
+        sl_m.g_module_name = g_module_name
+        sp_m.g_module_name = g_module_name
+        sm_m.g_module_name = g_module_name
+
+        options = Options(g_module_name)
+        options.parse_cmdline()
+        in_m.enable_from_env()
+        if (options.debug):
+            _eprint("%s:debug:options:%s" %
+                    (g_module_name, str(options)))
+
+        (lev_dist, paths) = diff_srt_files(options)
+
+        print("%d %s" % (lev_dist, " ".join(paths)))
+
+        in_m.write_summary(g_module_name)
+
+    except:
+        traceback.print_exc()
+        sys.exit(1)
+
+    sys.exit(0)
@@ -0,0 +1,183 @@
+#+---------+
+#| IMPORTS |
+#+---------+
+
+import os
+import sys
+import json
+import numpy as np
+
+import srtdf_levenshtein as lev_m
+
+#+------------------+
+#| GLOBAL VARIABLES |
+#+------------------+
+
+g_state_version = 1
+
+g_def_checkpoint_interval = 1024
+
+#+-----------+
+#| FUNCTIONS |
+#+-----------+
+
+def _eprint(*args, **kwargs):
+    print(*args, file=sys.stderr, flush=True, **kwargs)
+    #sys.stderr.flush()
+
+
+def words_keys(ts_words):
+
+    # the words (strings) of a TimestampedWords, in order
+
+    vocab = ts_words.vocab
+    return [ vocab.string(i) for i in ts_words.word_ids.tolist() ]
+
+
+def changed_range(prev_keys, keys, seg_indices):
+
+    # returns (ja, jb) such that keys[:ja] is prev_keys[:ja] and
+    # keys[ja + len(keys) - len(prev_keys):] is prev_keys[jb:], with the
+    # changed words widened to the whole srt segments (cues) they are
+    # in. seg_indices are the segment indices of the words of keys.
+
+    m_prev = len(prev_keys)
+    m      = len(keys)
+    common = min(m_prev, m)
+
+    p = 0
+    while (p < common and prev_keys[p] == keys[p]):
+        p = p + 1
+
+    if (p == m_prev and p == m):
+        return (m, m_prev)      # no change
+
+    s = 0
+    while (s < common - p and prev_keys[m_prev - 1 - s] == keys[m - 1 - s]):
+        s = s + 1
+
+    (ja, jb, jb_new) = (p, m_prev - s, m - s)
+
+    # the words before ja and after jb_new that share a segment with
+    # the changed ones are common to both, so both ends move alike
+
+    seg = np.asarray(seg_indices)
+    if (ja < m):
+        ja = int(np.searchsorted(seg, seg[ja], 'left'))
+    if (jb_new > 0):
+        end = int(np.searchsorted(seg, seg[jb_new - 1], 'right'))
+        jb  = jb + max(end - jb_new, 0)
+
+    return (min(ja, p), jb)
+
+
+def load_rescore_state(module_name, filepath, signature):
+
+    # returns the RescoreState saved in filepath. a new (empty) one is
+    # returned if there is no such file or if it was saved with another
+    # signature or version.
+
+    state = RescoreState(module_name, signature)
+
+    if (not os.path.isfile(filepath)):
+        return state
+
+    with np.load(filepath, allow_pickle = False) as npz:
+        meta   = json.loads(npz["meta"].tobytes().decode("utf-8"))
+        arrays = { name : npz[name] for name in npz.files
+                   if name.startswith("lev_") }
+
+    if (meta.get("version") != g_state_version or
+        meta.get("signature") != signature):
+        return state
+
+    state.m_from_keys = meta["from_keys"]
+    state.m_to_keys   = meta["to_keys"]
+    state.m_tokens    = meta["tokens"]
+    state.m_lev_state = arrays
+
+    return state
+
+#+---------+
+#| CLASSES |
+#+---------+
+
+class RescoreState(object):
+
+    # What is kept between two runs of srtdf_pipeline.py -S over the same
+    # reference srt file: the words of both files, the tokens of the
+    # texts of their segments (by text) and the state of their
+    # IncrementalLevenshtein alignment.
+    #
+    # The signature tells the options that the words depend on (language
+    # model, pipeline, ...). A state saved with another signature is not
+    # used.
+    #
+    # A state is saved with numpy.savez. The words and the tokens are
+    # stored as json in the 'meta' array and the alignment state in the
+    # 'lev_*' arrays.
+
+    def __init__(self, module_name, signature):
+        self.m_mn        = module_name
+        self.m_signature = signature
+        self.m_from_keys = None
+        self.m_to_keys   = None
+        self.m_tokens    = {}
+        self.m_lev_state = None
+
+    @property
+    def tokens(self):
+        # text -> tokens ((text, pos, is_stop) lists)
+        return self.m_tokens
+
+    @property
+    def is_empty(self):
+        return (self.m_lev_state == None)
+
+    def new_levenshtein(self, words_1, words_2,
+                        max_matrix_cells = 50000000,
+                        checkpoint_interval = g_def_checkpoint_interval):
+
+        # returns the IncrementalLevenshtein of the two TimestampedWords.
+        # it starts from the saved alignment if words_1 are the saved
+        # words of the first file.
+
+        prev_state = None
+        changed    = None
+
+        if (not self.is_empty and words_keys(words_1) == self.m_from_keys):
+            prev_state = self.m_lev_state
+            changed    = changed_range(self.m_to_keys, words_keys(words_2),
+                                       words_2.segment_indices)
+
+        return lev_m.IncrementalLevenshtein(
+                    self.m_mn, words_1, words_2, None, prev_state, changed,
+                    checkpoint_interval, max_matrix_cells)
+
+    def update(self, words_1, words_2, lev):
+
+        # takes the words and the alignment of this run. the distance of
+        # lev must have been computed.
+
+        self.m_from_keys = words_keys(words_1)
+        self.m_to_keys   = words_keys(words_2)
+        self.m_lev_state = lev.state
+
+    def save(self, filepath):
+
+        # the file is replaced only once it is completely written
+
+        meta = {
+                 "version"   : g_state_version,
+                 "signature" : self.m_signature,
+                 "from_keys" : self.m_from_keys,
+                 "to_keys"   : self.m_to_keys,
+                 "tokens"    : self.m_tokens
+               }
+        meta_bytes = np.frombuffer(json.dumps(meta).encode("utf-8"),
+                                   dtype = np.uint8)
+
+        tmp_filepath = filepath + ".tmp"
+        with open(tmp_filepath, "wb") as f:
+            np.savez(f, meta = meta_bytes, **self.m_lev_state)
+        os.replace(tmp_filepath, filepath)
@@ -0,0 +1,368 @@
+#+---------+
+#| IMPORTS |
+#+---------+
+
+import os
+import sys
+import traceback
+import mmap
+import struct
+import numpy as np
+
+#+------------------+
+#| GLOBAL VARIABLES |
+#+------------------+
+
+g_module_name = None
+
+MAGIC = b"SRTDFCB1"
+
+# The binary srt compare format. It carries what the text format of
+# srtdf_srt_compare_writer.py carries, with every number stored as a
+# little endian integer and every column stored as one array.
+#
+#   magic            8 bytes  "SRTDFCB1"
+#   header           u4[8]    indent_2_by, num_segments, num_words,
+#                             num_vocab, num_pos, 0, 0, 0
+#   seg_side         u1[num_segments]  0 for '>' (first file), 1 for '<'
+#   seg_index        i8[num_segments]  the I line
+#   seg_begin_ms     i8[num_segments]  the R line (duration is end-begin)
+#   seg_end_ms       i8[num_segments]
+#   seg_word_end     u4[num_segments]  the words of segment k are
+#                                      [seg_word_end[k-1], seg_word_end[k])
+#   word_ts          i8[num_words]     the W lines
+#   word_id          u4[num_words]     index into the vocab strings
+#   word_pos         u2[num_words]     index into the pos strings
+#   word_stop        u1[(num_words+7)/8]  is_stop, packed 8 per byte,
+#                                      first word in the high bit
+#   vocab strings    u4[num_vocab+1] offsets followed by utf-8 bytes
+#   pos strings      u4[num_pos+1] offsets followed by utf-8 bytes
+#   text strings     u4[3*num_segments+1] offsets followed by utf-8 bytes.
+#                    3k, 3k+1 and 3k+2 are the begin and end time strings
+#                    (the T line) and the string (the S line) of
+#                    segment k.
+#
+# Every array starts at a multiple of 8 bytes. Segments are in the order
+# of the text format, those of the two files interleaved.
+
+g_header_fmt = "<8I"
+
+#+-----------+
+#| FUNCTIONS |
+#+-----------+
+
+def _eprint(*args, **kwargs):
+    print(*args, file=sys.stderr, flush=True, **kwargs)
+    #sys.stderr.flush()
+
+
+def _pad(n):
+    return (8 - (n % 8)) % 8
+
+
+def _strings_bytes(strings):
+
+    # returns the offsets array and the bytes of a list of strings
+
+    encoded = [ s.encode("utf-8") for s in strings ]
+    offsets = np.zeros(len(encoded) + 1, dtype = "<u4")
+    if (len(encoded) > 0):
+        offsets[1:] = np.cumsum([ len(b) for b in encoded ])
+    return (offsets, b"".join(encoded))
+
+
+def is_binary(head):
+
+    # tells if the leading bytes of a file are those of the binary format
+
+    return head[:len(MAGIC)] == MAGIC
+
+
+#+---------+
+#| CLASSES |
+#+---------+
+
+class SrtCompareBinaryWriter(object):
+
+    # collects the segments and words given to add() and writes them in
+    # the binary format on close()
+
+    def __init__(self, module_name, fp, indent_2_by):
+        self.m_mn          = module_name
+        self.m_fp          = fp
+        self.m_indent_2_by = indent_2_by
+
+        self.m_seg_side     = []
+        self.m_seg_index    = []
+        self.m_seg_begin_ms = []
+        self.m_seg_end_ms   = []
+        self.m_seg_word_end = []
+        self.m_texts        = []
+
+        self.m_word_ts   = []
+        self.m_word_id   = []
+        self.m_word_pos  = []
+        self.m_word_stop = []
+
+        self.m_vocab     = {}
+        self.m_pos       = {}
+
+    def add(self, in_1, srt_index, begin_time_str, end_time_str,
+            begin_time_ms, end_time_ms, srt_string, words):
+
+        # words are (ts_ms, word, pos, is_stop) tuples
+
+        self.m_seg_side.append(0 if in_1 else 1)
+        self.m_seg_index.append(srt_index)
+        self.m_seg_begin_ms.append(begin_time_ms)
+        self.m_seg_end_ms.append(end_time_ms)
+        self.m_texts.extend([ begin_time_str, end_time_str, srt_string ])
+
+        for (ts_ms, word, pos, is_stop) in words:
+            self.m_word_ts.append(ts_ms)
+            self.m_word_id.append(
+                    self.m_vocab.setdefault(word, len(self.m_vocab)))
+            self.m_word_pos.append(
+                    self.m_pos.setdefault(pos, len(self.m_pos)))
+            self.m_word_stop.append(bool(is_stop))
+
+        self.m_seg_word_end.append(len(self.m_word_ts))
+
+    def _write(self, data):
+        self.m_fp.write(data)
+        self.m_fp.write(b"\0" * _pad(len(data)))
+
+    def close(self):
+
+        self.m_fp.write(MAGIC)
+        self.m_fp.write(struct.pack(g_header_fmt,
+                                    self.m_indent_2_by,
+                                    len(self.m_seg_side),
+                                    len(self.m_word_ts),
+                                    len(self.m_vocab),
+                                    len(self.m_pos),
+                                    0, 0, 0))
+
+        self._write(np.array(self.m_seg_side,     dtype="<u1").tobytes())
+        self._write(np.array(self.m_seg_index,    dtype="<i8").tobytes())
+        self._write(np.array(self.m_seg_begin_ms, dtype="<i8").tobytes())
+        self._write(np.array(self.m_seg_end_ms,   dtype="<i8").tobytes())
+        self._write(np.array(self.m_seg_word_end, dtype="<u4").tobytes())
+
+        self._write(np.array(self.m_word_ts,  dtype="<i8").tobytes())
+        self._write(np.array(self.m_word_id,  dtype="<u4").tobytes())
+        self._write(np.array(self.m_word_pos, dtype="<u2").tobytes())
+        self._write(np.packbits(
+                        np.array(self.m_word_stop, dtype=bool)).tobytes())
+
+        for strings in (list(self.m_vocab), list(self.m_pos), self.m_texts):
+            (offsets, data) = _strings_bytes(strings)
+            self._write(offsets.tobytes())
+            self._write(data)
+
+        self.m_fp.flush()
+
+
+class SrtCompareBinary(object):
+
+    # A file in the binary format. A file path is memory-mapped; bytes
+    # (such as the contents of stdin) are used as they are. The columns
+    # are numpy arrays that share memory with the mapping.
+
+    def __init__(self, module_name, source):
+
+        self.m_mn   = module_name
+        self.m_mmap = None
+
+        if (isinstance(source, str)):
+            with open(source, "rb") as f:
+                self.m_mmap = mmap.mmap(f.fileno(), 0,
+                                        access = mmap.ACCESS_READ)
+            buf = self.m_mmap
+        else:
+            buf = source
+
+        if (not is_binary(buf[:len(MAGIC)])):
+            err_str = "%s: not in the binary srt compare format" % (self.m_mn)
+            raise Exception (err_str)
+
+        pos = len(MAGIC)
+        (self.m_indent_2_by, num_segments, num_words, num_vocab, num_pos,
+         r1, r2, r3) = struct.unpack_from(g_header_fmt, buf, pos)
+        pos = pos + struct.calcsize(g_header_fmt)
+
+        def column(dtype, count):
+            nonlocal pos
+            a = np.frombuffer(buf, dtype = dtype, count = count,
+                              offset = pos)
+            pos = pos + a.nbytes + _pad(a.nbytes)
+            return a
+
+        self.m_seg_side     = column("<u1", num_segments)
+        self.m_seg_index    = column("<i8", num_segments)
+        self.m_seg_begin_ms = column("<i8", num_segments)
+        self.m_seg_end_ms   = column("<i8", num_segments)
+        self.m_seg_word_end = column("<u4", num_segments)
+
+        self.m_word_ts      = column("<i8", num_words)
+        self.m_word_id      = column("<u4", num_words)
+        self.m_word_pos     = column("<u2", num_words)
+        self.m_word_stop    = column("<u1", (num_words + 7) // 8)
+
+        def strings(count):
+            offsets = column("<u4", count + 1)
+            data    = column("<u1", int(offsets[-1]))
+            return (offsets, data)
+
+        self.m_vocab = strings(num_vocab)
+        self.m_pos   = strings(num_pos)
+        self.m_texts = strings(3 * num_segments)
+
+    @staticmethod
+    def _strings(offsets_data):
+        (offsets, data) = offsets_data
+        raw = data.tobytes()
+        o   = offsets.tolist()
+        return [ raw[o[i]:o[i+1]].decode("utf-8")
+                 for i in range(len(o) - 1) ]
+
+    @property
+    def indent_2_by(self):
+        return self.m_indent_2_by
+
+    @property
+    def num_segments(self):
+        return len(self.m_seg_side)
+
+    @property
+    def seg_side(self):
+        return self.m_seg_side
+
+    @property
+    def seg_index(self):
+        return self.m_seg_index
+
+    @property
+    def seg_begin_ms(self):
+        return self.m_seg_begin_ms
+
+    @property
+    def seg_end_ms(self):
+        return self.m_seg_end_ms
+
+    @property
+    def seg_word_end(self):
+        return self.m_seg_word_end
+
+    @property
+    def word_ts(self):
+        return self.m_word_ts
+
+    @property
+    def word_id(self):
+        return self.m_word_id
+
+    @property
+    def word_pos(self):
+        return self.m_word_pos
+
+    @property
+    def word_stop(self):
+        # a bool array. unlike the others this is a copy
+        return np.unpackbits(self.m_word_stop)[:len(self.m_word_ts)] \
+                 .astype(bool)
+
+    def vocab_strings(self):
+        return SrtCompareBinary._strings(self.m_vocab)
+
+    def pos_strings(self):
+        return SrtCompareBinary._strings(self.m_pos)
+
+    def text_strings(self):
+        return SrtCompareBinary._strings(self.m_texts)
+
+    def render(self, fp, prefix_1 = "> ", prefix_2 = "< "):
+
+        # writes the text format (as srtdf_srt_compare_writer.py does)
+
+        vocab = self.vocab_strings()
+        poss  = self.pos_strings()
+        texts = self.text_strings()
+        stops = self.word_stop.tolist()
+
+        word_ts  = self.m_word_ts.tolist()
+        word_id  = self.m_word_id.tolist()
+        word_pos = self.m_word_pos.tolist()
+
+        lpad_2 = ' ' * self.m_indent_2_by
+        w = 0
+
+        for k in range(self.num_segments):
+
+            if (self.m_seg_side[k] == 0):
+                prefix_str, lpad_str = prefix_1, ""
+            else:
+                prefix_str, lpad_str = prefix_2, lpad_2
+
+            begin_ms = int(self.m_seg_begin_ms[k])
+            end_ms   = int(self.m_seg_end_ms[k])
+
+            lines = [
+                "%sI %s%d" % (prefix_str, lpad_str, self.m_seg_index[k]),
+                "%sT %s%s --> %s" % (prefix_str, lpad_str,
+                                     texts[3*k], texts[3*k + 1]),
+                "%sR %s%d %d %d" % (prefix_str, lpad_str,
+                                    begin_ms, end_ms, end_ms - begin_ms),
+                "%sS %s%s" % (prefix_str, lpad_str, texts[3*k + 2])
+            ]
+
+            word_end = int(self.m_seg_word_end[k])
+            while (w < word_end):
+                lines.append("%sW %s%d %s %s %s" %
+                             (prefix_str, lpad_str, word_ts[w],
+                              vocab[word_id[w]], poss[word_pos[w]],
+                              stops[w]))
+                w = w + 1
+
+            lines.append(prefix_str)
+            fp.write("\n".join(lines) + "\n")
+
+    def close(self):
+
+        # the columns share memory with the mapping, which cannot be 
+        # closed while they are around
+
+        self.m_seg_side     = self.m_seg_index  = None
+        self.m_seg_begin_ms = self.m_seg_end_ms = self.m_seg_word_end = None
+        self.m_word_ts      = self.m_word_id    = None
+        self.m_word_pos     = self.m_word_stop  = None
+        self.m_vocab        = self.m_pos        = self.m_texts = None
+
+        if (self.m_mmap != None):
+            self.m_mmap.close()
+            self.m_mmap = None
+
+#+------+
+#| MAIN |
+#+------+
+
+if __name__ == '__main__':
+
+    # renders a file in the binary format (the path is the argument, or
+    # stdin) in the text format on stdout
+
+    try:
+        g_module_name  = os.path.basename(__file__)
+
+        if (len(sys.argv) > 1):
+            srtcb = SrtCompareBinary(g_module_name, sys.argv[1])
+        else:
+            srtcb = SrtCompareBinary(g_module_name, sys.stdin.buffer.read())
+
+        srtcb.render(sys.stdout)
+
+    except:
+        traceback.print_exc()
+        sys.exit(1)
+
+    sys.exit(0)
@@ -1,23 +1,167 @@
 import os
 import sys
 import traceback
+import codecs
+import array
+import numpy as np
+import srtdf_srt_compare_binary as scb_m
 
 def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, flush=True, **kwargs)
     #sys.stderr.flush()
 
+class Vocabulary(object):
+
+    # maps strings to small integer ids (in the order in which they are
+    # first seen) and back
+
+    def __init__(self):
+        self.m_ids     = {}
+        self.m_strings = []     # built from m_ids when needed
+
+    def id(self, string):
+        return self.m_ids.setdefault(string, len(self.m_ids))
+
+    def string(self, i):
+        if (i >= len(self.m_strings)):
+            self.m_strings = list(self.m_ids)
+        return self.m_strings[i]
+
+    def __len__(self):
+        return len(self.m_ids)
+
+
 class TimestampedWords(object):
-    def __init__(self, module_name):
-        self.m_mn       = module_name
-        self.m_ts_words = []    # array of tuples (timestamp, word, SrtSegment, part_of_speech, is_stopword)
+
+    # The words are stored column by column
+    #
+    #   m_ts          array('q')  timestamp in ms
+    #   m_word_ids    array('i')  id of the word in the vocabulary
+    #   m_pos_codes   array('H')  id of the part of speech in pos_vocab
+    #   m_stop_bits   bytearray   is_stop, one bit per word
+    #   m_seg_indices array('i')  index of the SrtSegment in m_segments
+    #
+    # which takes about 18 bytes per word. Words that share a vocabulary
+    # have equal ids if and only if they are equal, so the two files of a
+    # SrtCompareReader (which share one) can be compared through their 
+    # word_ids alone.
+    #
+    # Indexing (and iterating) returns the tuple 
+    #   (timestamp, word, part_of_speech, is_stopword, SrtSegment)
+    # built on demand.
+
+    def __init__(self, module_name, vocab = None, pos_vocab = None):
+        self.m_mn          = module_name
+        self.m_vocab       = vocab if vocab != None else Vocabulary()
+        self.m_pos_vocab   = pos_vocab if pos_vocab != None else Vocabulary()
+        self.m_ts          = array.array('q')
+        self.m_word_ids    = array.array('i')
+        self.m_pos_codes   = array.array('H')
+        self.m_stop_bits   = bytearray()
+        self.m_seg_indices = array.array('i')
+        self.m_segments    = []
 
     def add(self, ts_ms, word, pos, is_stop, srt_segment):
-        self.m_ts_words.append((ts_ms, word, pos, is_stop, srt_segment))
-        return len(self.m_ts_words)-1   # returns index 
+
+        i = len(self.m_ts)
+
+        segments = self.m_segments
+        if (not segments or segments[-1] is not srt_segment):
+            segments.append(srt_segment)
+
+        self.m_ts.append(ts_ms)
+        self.m_word_ids.append(self.m_vocab.id(word))
+        self.m_pos_codes.append(self.m_pos_vocab.id(pos))
+        self.m_seg_indices.append(len(segments) - 1)
+
+        if ((i & 7) == 0):
+            self.m_stop_bits.append(0)
+        if (is_stop):
+            self.m_stop_bits[i >> 3] |= (0x80 >> (i & 7))
+
+        return i   # returns index 
+
+    def extend(self, ts, word_ids, pos_codes, stop_flags, seg_indices,
+               segments):
+
+        # appends words given column by column (numpy arrays, word and
+        # pos ids of this vocabulary and pos_vocab). seg_indices index
+        # into segments, the SrtSegment objects of the words, which must
+        # not already be among the segments of the words.
+
+        seg_base = len(self.m_segments)
+        stops    = np.concatenate((self.stop_flags,
+                                   np.asarray(stop_flags, dtype = bool)))
+
+        self.m_ts.frombytes(np.asarray(ts, dtype = np.int64).tobytes())
+        self.m_word_ids.frombytes(
+            np.asarray(word_ids, dtype = np.intc).tobytes())
+        self.m_pos_codes.frombytes(
+            np.asarray(pos_codes, dtype = np.uint16).tobytes())
+        self.m_seg_indices.frombytes(
+            (np.asarray(seg_indices, dtype = np.intc) + seg_base).tobytes())
+        self.m_stop_bits = bytearray(np.packbits(stops).tobytes())
+        self.m_segments.extend(segments)
+
+    def is_stop(self, i):
+        return (self.m_stop_bits[i >> 3] & (0x80 >> (i & 7))) != 0
+
+    def __len__(self):
+        return len(self.m_ts)
+
+    def __getitem__(self, i):
+        if (i < 0):
+            i = i + len(self.m_ts)
+        return (self.m_ts[i],
+                self.m_vocab.string(self.m_word_ids[i]),
+                self.m_pos_vocab.string(self.m_pos_codes[i]),
+                self.is_stop(i),
+                self.m_segments[self.m_seg_indices[i]])
+
+    def __iter__(self):
+        for i in range(len(self.m_ts)):
+            yield self[i]
 
     @property
     def words(self):
-        return self.m_ts_words
+        return self
+
+    @property
+    def vocab(self):
+        return self.m_vocab
+
+    # numpy views of the columns. they share memory with the columns
+    # (no copy is made), which cannot grow while a view exists. so these
+    # are meant to be taken once all words have been added.
+
+    @staticmethod
+    def _np_view(column, dtype):
+        if (len(column) == 0):
+            return np.zeros(0, dtype = dtype)
+        return np.frombuffer(column, dtype = dtype)
+
+    @property
+    def timestamps(self):
+        return TimestampedWords._np_view(self.m_ts, np.int64)
+
+    @property
+    def word_ids(self):
+        return TimestampedWords._np_view(self.m_word_ids, np.intc)
+
+    @property
+    def pos_codes(self):
+        return TimestampedWords._np_view(self.m_pos_codes, np.uint16)
+
+    @property
+    def segment_indices(self):
+        return TimestampedWords._np_view(self.m_seg_indices, np.intc)
+
+    @property
+    def stop_flags(self):
+        # a bool array. unlike the others this is a copy
+        return np.unpackbits(
+                TimestampedWords._np_view(self.m_stop_bits, np.uint8)
+               )[:len(self.m_ts)].astype(bool)
 
 
 class SrtSegment(object):
@@ -54,10 +198,26 @@ class SrtSegment(object):
         |9              |
     """
 
+    # the state is kept in slots rather than in a dict. a field that has
+    # not been seen yet is None. see the state property for the names.
+
+    __slots__ = ("m_mn", "m_ts_words",
+                 "m_srt_index", "m_begin_time_str", "m_end_time_str",
+                 "m_begin_time_ms", "m_end_time_ms", "m_duration_ms",
+                 "m_srt_string", "m_begin_index", "m_end_index")
+
     def __init__(self, module_name, ts_words):
-        self.m_mn       = module_name
-        self.m_ts_words = ts_words
-        self.m_state    = {}       
+        self.m_mn             = module_name
+        self.m_ts_words       = ts_words
+        self.m_srt_index      = None
+        self.m_begin_time_str = None
+        self.m_end_time_str   = None
+        self.m_begin_time_ms  = None
+        self.m_end_time_ms    = None
+        self.m_duration_ms    = None
+        self.m_srt_string     = None
+        self.m_begin_index    = None
+        self.m_end_index      = None
 
     #returns false at end of segment, true otherwise
     def parse(self, line):
@@ -76,43 +236,74 @@ class SrtSegment(object):
 
         mnemonic = tokens[1]
         if (mnemonic == 'I'):
-            self.m_state["srt_index"] = int(tokens[2])
+            self.m_srt_index = int(tokens[2])
         elif (mnemonic == 'T'):
-            self.m_state["begin_time_str"] = tokens[2]
-            self.m_state["end_time_str"]   = tokens[4]
+            self.m_begin_time_str = tokens[2]
+            self.m_end_time_str   = tokens[4]
         elif (mnemonic == 'R'):
-            self.m_state["begin_time_ms"]  = int(tokens[2])
-            self.m_state["end_time_ms"]    = int(tokens[3])
-            self.m_state["duration_ms"]    = int(tokens[4])
+            self.m_begin_time_ms  = int(tokens[2])
+            self.m_end_time_ms    = int(tokens[3])
+            self.m_duration_ms    = int(tokens[4])
         elif (mnemonic == 'S'):
-            self.m_state["srt_string"] = " ".join(tokens[2:])  
-            # split and join ! what a waste !
+            self.m_srt_string = " ".join(tokens[2:])  
         elif (mnemonic == 'W'):
             if (len(tokens) >= 4):
-                timestamp_ms = int(tokens[2])
-                word    = tokens[3]
-                pos     = tokens[4]
                 is_stop = ((tokens[5]).lower() == "true")
-
-                i = self.m_ts_words.add(int(tokens[2]), tokens[3], pos, is_stop, self)
-                if (not "begin_index" in self.m_state):
-                    self.m_state["begin_index"] = i
-                self.m_state["end_index"]   = i
+                self.add_word(int(tokens[2]), tokens[3], tokens[4], is_stop)
+
+    def add_word(self, timestamp_ms, word, pos, is_stop):
+        i = self.m_ts_words.add(timestamp_ms, word, pos, is_stop, self)
+        if (self.m_begin_index == None):
+            self.m_begin_index = i
+        self.m_end_index = i
+
+    def set(self, srt_index, begin_time_str, end_time_str,
+            begin_time_ms, end_time_ms, duration_ms, srt_string, words):
+
+        # fills the segment from the values that parse() reads off the
+        # I, T, R, S and W lines. words are (ts_ms, word, pos, is_stop) 
+        # tuples. a word that the W line cannot carry (empty or with 
+        # white space in it) is left out.
+
+        self.m_srt_index      = srt_index
+        self.m_begin_time_str = begin_time_str
+        self.m_end_time_str   = end_time_str
+        self.m_begin_time_ms  = begin_time_ms
+        self.m_end_time_ms    = end_time_ms
+        self.m_duration_ms    = duration_ms
+        self.m_srt_string     = " ".join(srt_string.split())
+
+        for (timestamp_ms, word, pos, is_stop) in words:
+            if (word.split() != [word]):
+                continue
+            self.add_word(timestamp_ms, word, pos, is_stop)
 
     def is_valid(self):
-        return ("srt_index"      in self.m_state and
-                "begin_time_str" in self.m_state and
-                "end_time_str"   in self.m_state and
-                "begin_time_ms"  in self.m_state and
-                "srt_string"     in self.m_state and
-                "begin_index"    in self.m_state)
+        return (self.m_srt_index      != None and
+                self.m_begin_time_str != None and
+                self.m_end_time_str   != None and
+                self.m_begin_time_ms  != None and
+                self.m_srt_string     != None and
+                self.m_begin_index    != None)
+
+    @property
+    def state(self):
+        # the fields seen so far, by name
+        state = {}
+        for name in ("srt_index", "begin_time_str", "end_time_str",
+                     "begin_time_ms", "end_time_ms", "duration_ms",
+                     "srt_string", "begin_index", "end_index"):
+            v = getattr(self, "m_" + name)
+            if (v != None):
+                state[name] = v
+        return state
 
     def __str__(self):
-        return str(self.m_state)
+        return str(self.state)
 
     @property
     def index(self):
-        return self.m_state["srt_index"]
+        return self.m_srt_index
 
     def to_diff_format_string(self, prefix_str, indent_str):
         
@@ -123,22 +314,22 @@ class SrtSegment(object):
 %s%s S %s
 """ % (prefix_str, 
        indent_str, 
-       self.m_state["srt_index"],
+       self.m_srt_index,
 
        prefix_str, 
        indent_str, 
-       self.m_state["begin_time_str"], 
-       self.m_state["end_time_str"],
+       self.m_begin_time_str, 
+       self.m_end_time_str,
 
        prefix_str, 
        indent_str, 
-       self.m_state["begin_time_ms"], 
-       self.m_state["end_time_ms"],
-       self.m_state["duration_ms"],
+       self.m_begin_time_ms, 
+       self.m_end_time_ms,
+       self.m_duration_ms,
 
        prefix_str, 
        indent_str, 
-       self.m_state["srt_string"])
+       self.m_srt_string)
 
 
 class SrtSegments(object):
@@ -157,6 +348,61 @@ class SrtSegments(object):
                 self.m_srt_segments.append(self.m_curr_srt_segment)
             self.m_curr_srt_segment = None
 
+    def parse_fast(self, line):
+
+        # same as parse(), for lines of the form 
+        #     "<prefix char> <mnemonic char> <values>"
+        # which is how srtdf_srt_compare_writer.py writes them. only the 
+        # values are split. other lines are handed over to parse().
+
+        if (len(line) < 4 or line[1] != " " or line[3] != " " or 
+            line[2] == " "):
+            return self.parse(line)
+
+        srt_segment = self.m_curr_srt_segment
+        if (srt_segment == None):
+            srt_segment = SrtSegment(self.m_mn, self.m_ts_words)
+            self.m_curr_srt_segment = srt_segment
+
+        mnemonic = line[2]
+        if (mnemonic == 'W'):
+            values = line[4:].split()
+            if (len(values) >= 2):
+                srt_segment.add_word(int(values[0]), values[1], values[2],
+                                     values[3].lower() == "true")
+        elif (mnemonic == 'S'):
+            srt_string = line[4:].strip()
+            if ("  " in srt_string or "\t" in srt_string):
+                srt_string = " ".join(srt_string.split())
+            srt_segment.m_srt_string = srt_string
+        elif (mnemonic == 'I'):
+            srt_segment.m_srt_index = int(line[4:].split()[0])
+        elif (mnemonic == 'T'):
+            values = line[4:].split()
+            srt_segment.m_begin_time_str = values[0]
+            srt_segment.m_end_time_str   = values[2]
+        elif (mnemonic == 'R'):
+            values = line[4:].split()
+            srt_segment.m_begin_time_ms  = int(values[0])
+            srt_segment.m_end_time_ms    = int(values[1])
+            srt_segment.m_duration_ms    = int(values[2])
+
+    def add(self, *args):
+        
+        # adds a segment built from values instead of parsed lines. 
+        # see SrtSegment.set for the arguments.
+
+        srt_segment = SrtSegment(self.m_mn, self.m_ts_words)
+        srt_segment.set(*args)
+        if (srt_segment.is_valid()):
+            self.m_srt_segments.append(srt_segment)
+
+    def add_segments(self, srt_segments):
+
+        # appends segments that are already complete and valid
+
+        self.m_srt_segments.extend(srt_segments)
+
     def segments(self):
         for i in range(len(self.m_srt_segments)):
             yield self.m_srt_segments[i]
@@ -168,8 +414,16 @@ class SrtCompareReader(object):
 
         self.m_mn         = module_name
 
-        self.m_ts_words_1 = TimestampedWords(module_name)
-        self.m_ts_words_2 = TimestampedWords(module_name)
+        # the two files share the vocabularies so that their word ids
+        # can be compared
+
+        self.m_vocab      = Vocabulary()
+        self.m_pos_vocab  = Vocabulary()
+
+        self.m_ts_words_1 = TimestampedWords(module_name, self.m_vocab,
+                                             self.m_pos_vocab)
+        self.m_ts_words_2 = TimestampedWords(module_name, self.m_vocab,
+                                             self.m_pos_vocab)
 
         self.m_segments_1 = SrtSegments(module_name, self.m_ts_words_1)
         self.m_segments_2 = SrtSegments(module_name, self.m_ts_words_2)
@@ -183,6 +437,159 @@ class SrtCompareReader(object):
             self.m_segments_2.parse(line)
 
 
+    def parse_stream(self, fp, block_size = 1 << 20, head = b""):
+
+        # parses all of fp, a binary file (like sys.stdin.buffer), 
+        # reading it in blocks of block_size bytes. same as calling 
+        # parse() for each line, only faster. head is what has already
+        # been read off fp.
+
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        carry   = ""
+
+        parse_1 = self.m_segments_1.parse_fast
+        parse_2 = self.m_segments_2.parse_fast
+
+        while True:
+            block = fp.read(block_size)
+            if (head):
+                block = head + block
+                head  = b""
+            lines = (carry + decoder.decode(block, not block)).split("\n")
+            carry = lines.pop()
+
+            for line in lines:
+                if (line.startswith("> ")):
+                    parse_1(line)
+                else:
+                    parse_2(line)
+
+            if (not block):
+                break
+
+        if (carry != ""):
+            if (carry.startswith("> ")):
+                parse_1(carry)
+            else:
+                parse_2(carry)
+
+
+    def read(self, fp):
+
+        # reads all of fp, a binary file in either the text or the 
+        # binary format
+
+        head = fp.read(len(scb_m.MAGIC))
+        if (scb_m.is_binary(head)):
+            self.load_binary(head + fp.read())
+        else:
+            self.parse_stream(fp, head = head)
+
+
+    def read_file(self, filepath):
+
+        # reads the file at filepath, which is in either the text or the
+        # binary format. the binary format is memory-mapped.
+
+        with open(filepath, "rb") as fp:
+            head = fp.read(len(scb_m.MAGIC))
+            if (not scb_m.is_binary(head)):
+                self.parse_stream(fp, head = head)
+                return
+
+        self.load_binary(filepath)
+
+
+    def load_binary(self, source):
+
+        # loads the binary format of srtdf_srt_compare_binary.py. source 
+        # is a file path (which is memory-mapped) or bytes. same as 
+        # parse_stream() on the text format of the same segments.
+
+        srtcb = scb_m.SrtCompareBinary(self.m_mn, source)
+
+        try:
+            # ids of the file -> ids of the vocabularies of the reader.
+            # words that a W line cannot carry (see SrtSegment.set) map
+            # to -1 and are left out.
+
+            vocab_map = np.array(
+                [ self.m_vocab.id(w) if w.split() == [w] else -1
+                  for w in srtcb.vocab_strings() ],
+                dtype = np.int64)
+            pos_map   = np.array(
+                [ self.m_pos_vocab.id(p) for p in srtcb.pos_strings() ],
+                dtype = np.int64)
+
+            self._load_binary_side(srtcb, 0, vocab_map, pos_map,
+                                   self.m_segments_1)
+            self._load_binary_side(srtcb, 1, vocab_map, pos_map,
+                                   self.m_segments_2)
+        finally:
+            srtcb.close()
+
+
+    def _load_binary_side(self, srtcb, side, vocab_map, pos_map, 
+                          srt_segments):
+
+        ts_words = srt_segments.m_ts_words
+
+        seg_word_end   = srtcb.seg_word_end.astype(np.int64)
+        seg_word_begin = np.concatenate(([0], seg_word_end[:-1]))
+        word_seg       = np.repeat(np.arange(srtcb.num_segments),
+                                   seg_word_end - seg_word_begin)
+
+        word_ids = vocab_map[srtcb.word_id]
+        kept     = np.nonzero((word_ids >= 0) & 
+                              (srtcb.seg_side[word_seg] == side))[0]
+
+        # as with the text format, a segment without words is left out
+
+        (segs, seg_indices) = np.unique(word_seg[kept], return_inverse = True)
+        first = np.searchsorted(seg_indices, np.arange(len(segs)), "left")
+        last  = np.searchsorted(seg_indices, np.arange(len(segs)), "right") - 1
+
+        texts    = srtcb.text_strings()
+        base     = len(ts_words)
+        index    = srtcb.seg_index[segs].tolist()
+        begin_ms = srtcb.seg_begin_ms[segs].tolist()
+        end_ms   = srtcb.seg_end_ms[segs].tolist()
+
+        new_segments = []
+        for (i, k) in enumerate(segs.tolist()):
+            srt_segment = SrtSegment(self.m_mn, ts_words)
+            srt_segment.m_srt_index      = index[i]
+            srt_segment.m_begin_time_str = texts[3*k]
+            srt_segment.m_end_time_str   = texts[3*k + 1]
+            srt_segment.m_begin_time_ms  = begin_ms[i]
+            srt_segment.m_end_time_ms    = end_ms[i]
+            srt_segment.m_duration_ms    = end_ms[i] - begin_ms[i]
+            srt_segment.m_srt_string     = " ".join(texts[3*k + 2].split())
+            srt_segment.m_begin_index    = base + int(first[i])
+            srt_segment.m_end_index      = base + int(last[i])
+            new_segments.append(srt_segment)
+
+        ts_words.extend(srtcb.word_ts[kept],
+                        word_ids[kept],
+                        pos_map[srtcb.word_pos[kept]],
+                        srtcb.word_stop[kept],
+                        seg_indices,
+                        new_segments)
+        srt_segments.add_segments(new_segments)
+
+
+    def add(self, in_1, *args):
+
+        # in-memory counterpart of parse(). in_1 tells if the segment is
+        # of the first ('>') or the second ('<') file. see SrtSegment.set
+        # for the rest of the arguments.
+
+        if (in_1):
+            self.m_segments_1.add(*args)
+        else:
+            self.m_segments_2.add(*args)
+
+
     @property
     def ts_words_in_1(self):
         return self.m_ts_words_1
@@ -214,15 +621,7 @@ if __name__ == "__main__":
         g_module_name  = os.path.basename(__file__)
 
         parser = SrtCompareReader(g_module_name)
-
-        while True:
-            try:
-                line = input()
-                #eprint(line)
-                parser.parse(line)
-
-            except EOFError:
-                break
+        parser.read(sys.stdin.buffer)
 
         eprint("#---[words in 1]---")
         eprint("")
@@ -5,11 +5,15 @@
 import os
 import sys
 import traceback
-import pysrt
 import getopt
 import tempfile
 import re
-import spacy
+
+import srtdf_nlp as nlp_m
+import srtdf_token_cache as tc_m
+import srtdf_srt_compare_binary as scb_m
+import srtdf_srt_reader as sr_m
+import srtdf_instrument as in_m
 
 #+------------------+
 #| GLOBAL VARIABLES |
@@ -17,6 +21,7 @@ import spacy
 
 g_module_name = None
 g_def_lang_model = "en_core_web_sm"
+g_def_batch_size = 1000
 g_nlp = None
 
 #+----------------------+
@@ -36,6 +41,8 @@ NAME
 SYNOPSIS
 
     {g_module_name} [-i num_spaces] [-W] [-t time_mode] [-L] 
+       [-l language_model] [-M] [-P] [-b batch_size] [-n num_processes]
+       [-c cache_dir [-s cache_max_entries]] [-F format]
        srt/file/path1 srt/file/path2
 
 DESCRIPTION
@@ -63,7 +70,8 @@ OPTIONS
 
     -W
        suppress time-of-occurange words display. 
-       the -t, -l and -p options are ignored here.
+       the -t, -l, -M, -P, -b and -n options are ignored here and no
+       language model is loaded.
        this is optional. default is to display time and occurance
        of each word.
 
@@ -84,6 +92,54 @@ OPTIONS
        used during spacy tokenization.
        this is optional. default is \"{g_def_lang_model}\".
 
+    -M
+       minimal spacy pipeline. only the components needed to arrive
+       at the part of speech of words (tokenizer, tagger and attribute
+       ruler) are loaded. the output is the same as that of the full
+       pipeline.
+       this is optional. default is to load the full pipeline.
+
+    -P
+       suppress part of speech tagging. only the tokenizer of the
+       language model is loaded, punctuation is identified from the
+       token itself and the part of speech of every word is shown
+       as '{nlp_m.POS_UNKNOWN}'.
+       this is optional.
+
+    -b batch_size
+       the number of subtitle texts handed to spacy at a time.
+       all subtitle texts of both files are tokenized through a single
+       nlp.pipe() call before the output is generated.
+       this is optional. default is {g_def_batch_size}.
+
+    -n num_processes
+       the number of processes used by spacy for tokenization.
+       this is optional. default is 1.
+
+    -c cache_dir
+       the folder of a persistent cache of the tokens (word, part of
+       speech, is stop word) of subtitle texts. texts found in the
+       cache are not tokenized again; the language model is loaded 
+       only if some text is not found. entries are specific to the
+       language model (name and version), the -M/-P and the -L options.
+       hit and miss counts are printed on stderr with -d.
+       this is optional. default is not to use a cache.
+
+    -s cache_max_entries
+       the maximum number of texts kept in the cache. the least 
+       recently used ones are evicted first.
+       this is optional. default is {tc_m.g_def_max_entries}.
+
+    -F format
+       the format of the output. this must be one of
+       text   -> the text format described above.
+       binary -> a compact binary format carrying the same information
+                 (see srtdf_srt_compare_binary.py). srtdf_srt_lev.py
+                 reads either format. the text format can be got back 
+                 from it through
+                 python3 srtdf_srt_compare_binary.py file_path
+       this is optional. default is 'text'.
+
     -h
        this help.
        this is optional.
@@ -110,6 +166,13 @@ class Options(object):
         self._too_mode     = Options.TO_CC
         self._to_lower     = True
         self._lang_model   = g_def_lang_model
+        self._minimal_pipeline = False
+        self._suppress_pos = False
+        self._batch_size   = g_def_batch_size
+        self._n_process    = 1
+        self._cache_dir    = None
+        self._cache_max_entries = tc_m.g_def_max_entries
+        self._format       = "text"
         self._debug        = False
 
         self._srt_filepath_1 = None
@@ -171,6 +234,73 @@ class Options(object):
     def lang_model(self, v):
         self._lang_model = v
 
+    @property
+    def minimal_pipeline(self):
+        return self._minimal_pipeline
+
+    @minimal_pipeline.setter
+    def minimal_pipeline(self, b):
+        self._minimal_pipeline = b
+
+    @property
+    def suppress_pos(self):
+        return self._suppress_pos
+
+    @suppress_pos.setter
+    def suppress_pos(self, b):
+        self._suppress_pos = b
+
+    @property
+    def pipeline(self):
+        if (self._suppress_pos):
+            return nlp_m.PIPELINE_TOKENIZER
+        if (self._minimal_pipeline):
+            return nlp_m.PIPELINE_MINIMAL
+        return nlp_m.PIPELINE_FULL
+
+    @property
+    def batch_size(self):
+        return self._batch_size
+
+    @batch_size.setter
+    def batch_size(self, n):
+        self._batch_size = n
+
+    @property
+    def n_process(self):
+        return self._n_process
+
+    @n_process.setter
+    def n_process(self, n):
+        self._n_process = n
+
+    @property
+    def cache_dir(self):
+        return self._cache_dir
+
+    @cache_dir.setter
+    def cache_dir(self, v):
+        self._cache_dir = v
+
+    @property
+    def cache_max_entries(self):
+        return self._cache_max_entries
+
+    @cache_max_entries.setter
+    def cache_max_entries(self, n):
+        self._cache_max_entries = n
+
+    @property
+    def format(self):
+        return self._format
+
+    @format.setter
+    def format(self, v):
+        if (not v in ("text", "binary")):
+            err_str = "%s: invalid format %s" % (self._mn, v)
+            raise Exception (err_str)
+        self._format = v
+
     @property
     def debug(self):
         return self._debug
@@ -205,13 +335,20 @@ class Options(object):
     def parse_cmdline(self):
         opts, args = \
             getopt.getopt(sys.argv[1:], 
-                    "i:Wt:Ll:dh", 
+                    "i:Wt:Ll:MPb:n:c:s:F:dh", 
                           [
                            "indent-2-by=",
                            "suppress-words",
                            "too-mode=",
                            "suppress-to-lower",
-                           "lang-model",
+                           "lang-model=",
+                           "minimal-pipeline",
+                           "suppress-pos",
+                           "batch-size=",
+                           "num-processes=",
+                           "cache-dir=",
+                           "cache-max-entries=",
+                           "format=",
                            "debug",
                            "help"
                           ])
@@ -228,10 +365,22 @@ class Options(object):
                 options.too_mode = v
             elif o in ("-L", "--suppress-to-lower"):
                 options.to_lower = False
-            elif o in ("-S", "--suppress-spacy-tokenization"):
-                options.spacy_tokenize = False
-            elif o in ("-l", "--tokenization-lang"):
-                options.tokenize_lang = v
+            elif o in ("-l", "--lang-model"):
+                options.lang_model = v
+            elif o in ("-M", "--minimal-pipeline"):
+                options.minimal_pipeline = True
+            elif o in ("-P", "--suppress-pos"):
+                options.suppress_pos = True
+            elif o in ("-b", "--batch-size"):
+                options.batch_size = int(v)
+            elif o in ("-n", "--num-processes"):
+                options.n_process = int(v)
+            elif o in ("-c", "--cache-dir"):
+                options.cache_dir = v
+            elif o in ("-s", "--cache-max-entries"):
+                options.cache_max_entries = int(v)
+            elif o in ("-F", "--format"):
+                options.format = v
             elif o in ("-d", "--debug"):
                 options.debug = True
 
@@ -245,108 +394,281 @@ class Options(object):
 
     def __str__(self):
         ret = { 
-                "indent"         : options.indent_2_by,
-                "too"            : options.too,
-                "too-mode"       : options.too_mode,
-                "to-lower"       : options.to_lower,
-                "spacy-tokenize" : self._spacy_tokenize,
-                "tokenize-lang"  : self._tokenize_lang,
+                "indent"         : self.indent_2_by,
+                "too"            : self.too,
+                "too-mode"       : self.too_mode,
+                "to-lower"       : self.to_lower,
                 "lang-model"     : self._lang_model,
-                "debug"          : options.debug
+                "pipeline"       : self.pipeline,
+                "batch-size"     : self._batch_size,
+                "num-processes"  : self._n_process,
+                "cache-dir"      : self._cache_dir,
+                "cache-max-entries" : self._cache_max_entries,
+                "format"         : self._format,
+                "debug"          : self.debug
               }
         return str(ret)
 
 
-def SubRipTime_2_ms(srt_time):
-    return  (srt_time.hours    * 3600 + 
-             srt_time.minutes  * 60   +
-             srt_time.seconds) * 1000 + \
-             srt_time.milliseconds
+def srt_item_text(item):
+    return re.sub('\n', ' ', item.text)
+
+
+def merge_srt_items(items_in_1, items_in_2, options, lpad_str):
+
+    # returns the (item, prefix_str, lpad_str) tuples in the order in 
+    # which they are dumped. an item of the second file follows the item
+    # of the first file in whose time range it begins.
+
+    merged = []
+
+    num_items_in_1 = len(items_in_1)
+    num_items_in_2 = len(items_in_2)
+
+    j = 0
+
+    for i in range(num_items_in_1):
+
+        merged.append((items_in_1[i], options.prefix_1, ""))
+
+        e_1_ms = items_in_1[i].end_ms
+        #print ("e_1_ms", e_1_ms)
+
+        while (j < num_items_in_2):
+
+            b_2_ms = items_in_2[j].start_ms
+            #print ("b_2_ms", b_2_ms)
+
+            if (b_2_ms > e_1_ms):
+                break
+
+            merged.append((items_in_2[j], options.prefix_2, lpad_str))
+
+            j = j + 1
+
+    while (j < num_items_in_2):
+
+        merged.append((items_in_2[j], options.prefix_2, lpad_str))
+        j = j + 1
+
+    return merged
+
+
+def get_nlp(options):
+
+    # loads the language model on first use
+
+    global g_nlp
+
+    if (g_nlp == None):
+        with in_m.span("nlp.load"):
+            g_nlp = nlp_m.load_nlp(options.lang_model, options.pipeline,
+                                   options.debug)
+    return g_nlp
+
+
+def spacy_tokenize_texts(texts, options):
+
+    # tokenizes the texts in batches. nlp.pipe returns the docs in the
+    # order of the texts.
+
+    nlp  = get_nlp(options)
+
+    with in_m.span("nlp.pipe"):
+        docs = nlp.pipe(texts,
+                        batch_size = options.batch_size,
+                        n_process  = options.n_process)
+
+        tokens_l   = []
+        num_tokens = 0
+        for doc in docs:
+            tokens_l.append(nlp_m.doc_tokens(doc, options.pipeline))
+            num_tokens = num_tokens + len(doc)
 
+    in_m.count("nlp.docs", len(tokens_l))
+    in_m.count("nlp.tokens", num_tokens)
 
-def dump_srt_item(item, prefix_str, lpad_str, options):
+    return tokens_l
+
+
+def model_version(options):
+
+    # returns the version of the language model of options. the model is
+    # loaded only if the version cannot be told otherwise.
+
+    version = nlp_m.model_version(options.lang_model)
+    if (version == None):
+        version = nlp_m.model_version(options.lang_model, get_nlp(options))
+
+    return version
+
+
+def tokenize_texts(texts, options):
+
+    # returns the tokens ((text, pos, is_stop) tuples, punctuation left
+    # out) of each of the texts
+
+    if (options.cache_dir == None):
+        return spacy_tokenize_texts(texts, options)
+
+    version = model_version(options)
+
+    cache = tc_m.TokenCache(g_module_name, options.cache_dir, 
+                            options.lang_model, version, options.pipeline, 
+                            options.to_lower, options.cache_max_entries)
+
+    tokens_l = cache.lookup(texts)
+
+    missed = list(dict.fromkeys(
+                [ t for t, tokens in zip(texts, tokens_l) if tokens == None ]))
+
+    if (len(missed) > 0):
+        missed_tokens_l = spacy_tokenize_texts(missed, options)
+        cache.store(missed, missed_tokens_l)
+
+        missed_tokens = dict(zip(missed, missed_tokens_l))
+        tokens_l = [ missed_tokens[t] if tokens == None else tokens 
+                     for t, tokens in zip(texts, tokens_l) ]
+
+    if (options.debug):
+        eprint("%s:debug:token cache:%s" % (g_module_name, str(cache)))
+
+    in_m.count("token_cache.hits", cache.hits)
+    in_m.count("token_cache.misses", cache.misses)
+
+    cache.close()
+
+    return tokens_l
+
+
+def srt_item_words(item, tokens, options):
+
+    # tokens are the (text, pos, is_stop) tuples of the words in 
+    # srt_item_text(item).
+    # returns the (ts_ms, word, pos, is_stop) tuples of the words as they
+    # appear in the 'W' lines, where ts_ms is the time of occurance of
+    # the word (see -t).
+
+    range_start_ms = item.start_ms
+    range_end_ms   = item.end_ms
+    range_ms       = (range_end_ms - range_start_ms)
+
+    if (options.debug):
+        eprint(f"original:{srt_item_text(item)}")
+
+    """
+    else:
+    #https://www.geeksforgeeks.org/python-remove-punctuation-from-string/
+    #punc = '''!()-[]{};:'"\, <>./?@#$%^&*_~'''
+    #cw = re.sub(r'[^\w\s]','',w)
+    #cw = re.sub(r'[!\-;:",.?]','',w)
+
+        tokens = s.split()
+        for t in tokens:
+            t2 = re.sub(r'[^\w\s]','',t)
+            if (len(t2) > 0):
+                words.append(t2)
+    """
+
+    num_tokens = len(tokens)
+
+    if (options.debug):
+        eprint(f"num_tokens={num_tokens}")
+
+    if (num_tokens == 0):
+        return []
+       
+    if (options.too_mode == Options.TO_AV):
+        range_av_ms = (range_start_ms + range_end_ms) / 2
+    elif (options.too_mode == Options.TO_WC):
+        word_time_width_ms = range_ms / num_tokens
+    else: #TO_CC
+        total_chars = 0
+        for (text, pos, is_stop) in tokens:
+            total_chars = total_chars + len(text)
+        total_chars = total_chars + num_tokens # (num_tokens -> spaces)
+        char_time_width_ms = range_ms / total_chars
+
+    next_offset_ms = range_start_ms
+
+    words = []
+
+    for (text, pos, is_stop) in tokens:
+        cw = re.sub(r',','',text)       #remove ',' character.
+                                        #TODO: is this not a PUNCT ?
+        if (options.to_lower):
+            cw = cw.lower()
+
+        if (options.too_mode == Options.TO_AV):
+            words.append((int(range_av_ms), cw, pos, is_stop))
+        elif (options.too_mode == Options.TO_WC):
+            words.append((int(next_offset_ms), cw, pos, is_stop))
+            next_offset_ms  = next_offset_ms + word_time_width_ms
+        else: #TO_CC
+            words.append((int(next_offset_ms), 
+                          cw.encode ('ascii', 'ignore').decode('ascii'),
+                          pos.encode ('ascii', 'ignore').decode('ascii'),
+                          is_stop))
+            curr_word_len      = len(text) + 1
+                                 # ^^^ note its not cw. 1 for space
+            curr_word_width_ms = curr_word_len  * char_time_width_ms
+            next_offset_ms     = next_offset_ms + curr_word_width_ms
+
+    return words
+
+
+def dump_srt_item(item, tokens, prefix_str, lpad_str, options, 
+                  fp = sys.stdout):
+
+    # tokens are the (text, pos, is_stop) tuples of the words in 
+    # srt_item_text(item). it is None if options.too is False.
 
     s = str(item.index)
-    print("%sI %s%s" % (prefix_str, lpad_str, s))
+    print("%sI %s%s" % (prefix_str, lpad_str, s), file=fp)
 
-    s1 = str(item.start)
-    s2 = str(item.end)
-    print("%sT %s%s --> %s" % (prefix_str, lpad_str, s1, s2))
+    s1 = item.start_str
+    s2 = item.end_str
+    print("%sT %s%s --> %s" % (prefix_str, lpad_str, s1, s2), file=fp)
 
-    range_start_ms = SubRipTime_2_ms(item.start)
-    range_end_ms   = SubRipTime_2_ms(item.end)
+    range_start_ms = item.start_ms
+    range_end_ms   = item.end_ms
     range_ms       = (range_end_ms - range_start_ms)
-    print("%sR %s%d %d %d" % (prefix_str, lpad_str, range_start_ms, range_end_ms, range_ms))
+    print("%sR %s%d %d %d" % (prefix_str, lpad_str, range_start_ms, range_end_ms, range_ms), file=fp)
 
-    s = re.sub('\n', ' ', item.text)
-    print("%sS %s%s" % (prefix_str, lpad_str, s.encode ('ascii', 'ignore').decode('ascii')))
+    s = srt_item_text(item)
+    print("%sS %s%s" % (prefix_str, lpad_str, s.encode ('ascii', 'ignore').decode('ascii')), file=fp)
 
     if (options.too):
         #--- dump words ---
 
-        if (options.debug):
-            eprint(f"original:{s}")
-
-        doc = g_nlp(s)
-        tokens = []
-        for token in doc:
-            if (token.pos_ == "PUNCT"):
-                continue
-            tokens.append(token)
-            
-        """
-        else:
-	    #https://www.geeksforgeeks.org/python-remove-punctuation-from-string/
-	    #punc = '''!()-[]{};:'"\, <>./?@#$%^&*_~'''
-	    #cw = re.sub(r'[^\w\s]','',w)
-	    #cw = re.sub(r'[!\-;:",.?]','',w)
-
-            tokens = s.split()
-            for t in tokens:
-                t2 = re.sub(r'[^\w\s]','',t)
-                if (len(t2) > 0):
-                    words.append(t2)
-        """
-
-        num_tokens = len(tokens)
-   
-        if (options.debug):
-            eprint(f"num_tokens={num_tokens}")
-           
-        if (options.too_mode == Options.TO_AV):
-            range_av_ms = (range_start_ms + range_end_ms) / 2
-        elif (options.too_mode == Options.TO_WC):
-            word_time_width_ms = range_ms / num_tokens
-        else: #TO_CC
-            total_chars = 0
-            for token in tokens:
-                total_chars = total_chars + len(token.text)
-            total_chars = total_chars + num_tokens # (num_tokens -> spaces)
-            char_time_width_ms = range_ms / total_chars
-
-        next_offset_ms = range_start_ms
-
-        for token in tokens:
-            cw = re.sub(r',','',token.text) #remove ',' character.
-                                            #TODO: is this not a PUNCT ?
-            if (options.to_lower):
-                cw = cw.lower()
-            o = f"{cw} {token.pos_} {token.is_stop}"
-
-            if (options.too_mode == Options.TO_AV):
-                print("%sW %s%d %s" % (prefix_str, lpad_str, range_av_ms, o))
-            elif (options.too_mode == Options.TO_WC):
-                print("%sW %s%d %s" % (prefix_str, lpad_str, next_offset_ms, o))
-                next_offset_ms  = next_offset_ms + word_time_width_ms
-            else: #TO_CC
-                print("%sW %s%d %s" % (prefix_str, lpad_str, next_offset_ms, o.encode ('ascii', 'ignore').decode('ascii')))
-                curr_word_len      = len(token.text) + 1
-                                     # ^^^ note its not cw. 1 for space
-                curr_word_width_ms = curr_word_len  * char_time_width_ms
-                next_offset_ms     = next_offset_ms + curr_word_width_ms
-
-    print("%s" % (prefix_str))
+        for (ts_ms, word, pos, is_stop) in srt_item_words(item, tokens, options):
+            print("%sW %s%d %s %s %s" % (prefix_str, lpad_str, ts_ms, word, pos, is_stop), file=fp)
+
+    print("%s" % (prefix_str), file=fp)
     
+def dump_srt_items_binary(merged, tokens_l, options, fp):
+
+    # writes what dump_srt_item writes for each of the merged items in
+    # the binary format (see srtdf_srt_compare_binary.py) on fp
+
+    writer = scb_m.SrtCompareBinaryWriter(g_module_name, fp, 
+                                          options.indent_2_by)
+
+    for tokens, (item, prefix_str, item_lpad_str) in zip(tokens_l, merged):
+
+        if (options.too):
+            words = srt_item_words(item, tokens, options)
+        else:
+            words = []
+
+        writer.add(prefix_str == options.prefix_1,
+                   item.index, item.start_str, item.end_str,
+                   item.start_ms, item.end_ms,
+                   srt_item_text(item).encode('ascii', 'ignore').decode('ascii'),
+                   words)
+
+    writer.close()
+
 #+------+
 #| MAIN |
 #+------+
@@ -358,41 +680,36 @@ if __name__ == '__main__':
         options        = Options(g_module_name)
 
         options.parse_cmdline()
-        g_nlp = spacy.load(options.lang_model)
+        in_m.enable_from_env()
 
         lpad_str = ' ' * options.indent_2_by
 
-        items_in_1 = pysrt.open(options.srt_filepath_1)
-        items_in_2 = pysrt.open(options.srt_filepath_2)
-
-        num_items_in_1 = len(items_in_1)
-        num_items_in_2 = len(items_in_2)
-
-        j = 0
-
-        for i in range(num_items_in_1):
-
-            dump_srt_item(items_in_1[i], options.prefix_1, "", options)
+        items_in_1 = sr_m.read_srt_file(options.srt_filepath_1)
+        items_in_2 = sr_m.read_srt_file(options.srt_filepath_2)
 
-            e_1_ms = SubRipTime_2_ms(items_in_1[i].end)
-            #print ("e_1_ms", e_1_ms)
+        merged = merge_srt_items(items_in_1, items_in_2, options, lpad_str)
 
-            while (j < num_items_in_2):
+        #
+        # tokenize the texts of all items at once
+        #
 
-                b_2_ms = SubRipTime_2_ms(items_in_2[j].start)
-                #print ("b_2_ms", b_2_ms)
-
-                if (b_2_ms > e_1_ms):
-                    break
-
-                dump_srt_item(items_in_2[j], options.prefix_2, lpad_str, options)
-
-                j = j + 1
+        if (options.too):
+            tokens_l = tokenize_texts(
+                        [ srt_item_text(item) for (item, p, l) in merged ],
+                        options)
+        else:
+            tokens_l = [ None ] * len(merged)
 
-        while (j < num_items_in_2):
+        if (options.format == "binary"):
+            dump_srt_items_binary(merged, tokens_l, options, 
+                                  sys.stdout.buffer)
+            in_m.count_output_bytes(sys.stdout.buffer)
+        else:
+            for tokens, (item, prefix_str, item_lpad_str) in zip(tokens_l, merged):
+                dump_srt_item(item, tokens, prefix_str, item_lpad_str, options)
+            in_m.count_output_bytes(sys.stdout)
 
-            dump_srt_item(items_in_2[j], options.prefix_2, lpad_str, options)
-            j = j + 1
+        in_m.write_summary(g_module_name)
 
     except:
         traceback.print_exc()
@@ -5,13 +5,14 @@
 import os
 import sys
 import traceback
-import pysrt
 import getopt
 import tempfile
 import re
 
 import srtdf_levenshtein as lev_m
 import srtdf_srt_compare_reader as scr_m
+import srtdf_srt_metrics as sm_m
+import srtdf_instrument as in_m
 
 #+------------------+
 #| GLOBAL VARIABLES |
@@ -19,6 +20,8 @@ import srtdf_srt_compare_reader as scr_m
 
 g_module_name = None
 
+g_def_write_batch_size = 4096     # lines written at a time by LevRecordDumper
+
 #+-----------+
 #| FUNCTIONS |
 #+-----------+
@@ -35,12 +38,16 @@ NAME
 
 SYNOPSIS
 
-    %s [-h] 
+    %s [-l] [-C col_names] [-E engine] [-B band_ms] [-A [-j num_jobs]]
+       [-M max_matrix_cells] [-i input_filepath] [-o csv_filepath]
+       [-W weight_table] ... [-d] [-h]
 
 DESCRIPTION
 
     This filter operates on the output of the
     'python3 sstt_x_tabulate_srt.py -c tl2' command line via stdin.
+    The input may be in the text or in the binary format (see -F in
+    srtdf_srt_compare_writer.py).
 
     The output on stdout is presented in the format:
 
@@ -54,10 +61,13 @@ DESCRIPTION
     .......,.........,......,.....,.......,.......    | specified
     .......,.........,......,.....,.......,.......    |
     #--metrics--                                      |
-    min timeDiffMs              TODO                  |
-    max timeDiffMs              TODO                  |
-    av  timeDiffMs              TODO                  |
-    std standardDeviation       TODO                  |
+    min timeDiffMs              .....                 |
+    max timeDiffMs              .....                 |
+    av  timeDiffMs              .....                 |
+    std standardDeviation       .....                 |
+    srtSimilarity.words         .....                 |
+    srtSimilarity.nonstop       .....                 |
+    srtSimilarity.pos           .....                 |
                                                    ---+
 
     The format in the 'details' section is as follows:
@@ -73,6 +83,13 @@ DESCRIPTION
         'I' => insert.
     TS_DIFF represents diff(FROM_TS, TO_TS)
 
+    The 'metrics' section holds the metrics of docs/srt_distance_metric.md
+    (see srtdf_srt_metrics.py, which computes them from a srtlev.csv):
+    the minimum, maximum and average TS_DIFF of the '=' and 'R' records,
+    the standard deviation of TO_TS - FROM_TS over the same records 
+    (TimeDeviation) and the SrtSimilarity for each weight table (see 
+    -W). a value is 'NA' if there is no record to compute it over.
+
 OPTIONS
 
     -d
@@ -83,6 +100,81 @@ OPTIONS
        lengthy output consisting of details.
        this is optional.
 
+    -E engine
+       the levenshtein engine to be used. this must be one of
+       python    -> the reference implementation (a python double loop).
+       numpy     -> an implementation that evaluates one anti-diagonal 
+                    of the cost matrix at a time using numpy. words are
+                    interned to integer ids before comparison.
+       hirschberg
+                 -> a divide and conquer implementation that keeps only
+                    a few rows of the cost matrix in memory.
+       banded    -> an implementation that considers only the pairs of
+                    words whose timestamps are at most -B milliseconds
+                    apart. selected when -B is specified.
+       bitparallel 
+                 -> a bit-parallel (Myers/Hyyro) implementation that 
+                    computes only the distance. cannot be used with -l.
+       auto      -> bitparallel if -l is not specified. otherwise numpy,
+                    or hirschberg if the number of cells of the matrix
+                    exceeds the -M value.
+       all engines except banded produce the same distance. python, 
+       numpy and hirschberg produce the same details.
+       this is optional. default is 'auto'.
+
+    -B band_ms
+       restricts the alignment to words of the two files whose
+       timestamps are at most band_ms milliseconds apart (for example
+       10000). this reduces the work from quadratic to about linear
+       in the number of words. the alignment does not have to run
+       along the edge of the band for the band to change it. a 
+       warning is printed on stderr, with the most by which the 
+       distance may exceed the smallest one, unless no path leaving
+       the band could give a smaller distance.
+       this is optional. default is to consider all pairs of words.
+
+    -A
+       anchored alignment. the runs of words that are common to both
+       files (found around words that occur exactly once in each file)
+       are matched first and only the gaps between them are aligned.
+       the anchors are taken as given, so the distance can be larger
+       than the optimal one. they are chosen so that the gaps left 
+       between them are balanced: the distance is at most the sum,
+       over the gaps, of the larger of their two lengths. cannot be
+       used with -E or -B.
+       this is optional.
+
+    -j num_jobs
+       the number of processes used to align the gaps when -A is
+       specified.
+       this is optional. default is 1.
+
+    -M max_matrix_cells
+       the number of cells (number of words in the first file times
+       the number of words in the second file) above which the 'auto'
+       engine (and the alignment of a gap with -A) switches from numpy
+       to hirschberg.
+       this is optional. default is 50000000.
+
+    -i input_filepath
+       read the input from input_filepath instead of stdin. an input
+       in the binary format is memory-mapped.
+       this is optional.
+
+    -o csv_filepath
+       also write the details (the lines between '#--details--' and
+       '#--metrics--' other than the '>' and '<' lines) on csv_filepath,
+       which then is what 'srtdf_csvfy_srt_lev.sh' would make of the 
+       output. used only if -l is specified.
+       this is optional.
+
+    -W weight_table
+       the name of a built-in weight table (words, nonstop, pos) or the
+       path of a weight table file for SrtSimilarity in the 'metrics'
+       section. see srtdf_srt_metrics.py. may be specified more than 
+       once.
+       this is optional. default is words, nonstop and pos.
+
     -C "col1_name,col2_name,..."
        a string specifying the column header names.
        used if (-v value) >= 1.
@@ -99,6 +191,16 @@ OPTIONS
 
 def parse_input(srt_parser, options):
 
+    if (options.input_filepath != None):
+        srt_parser.read_file(options.input_filepath)
+        return
+
+    if (not options.debug):
+        srt_parser.read(sys.stdin.buffer)
+        return
+
+    # line by line, so that each line can be shown
+
     line_num = 0
 
 
@@ -117,6 +219,86 @@ def parse_input(srt_parser, options):
             break
 
 
+def new_levenshtein(options, words_1, words_2):
+
+    # words_1 and words_2 are usually TimestampedWords sharing a 
+    # vocabulary. the engines then compare their word ids and read their
+    # timestamps column directly instead of going through key functions.
+
+    if (getattr(words_1, "vocab", None) != None and 
+        getattr(words_1, "vocab", None) is getattr(words_2, "vocab", None)):
+        key_fnx = None
+        ts_fnx  = None
+    else:
+        key_fnx = lambda e : e[1]
+        ts_fnx  = lambda e : e[0]
+
+    engine = options.engine
+    if (options.anchored):
+        if (engine != "auto" or options.band_ms != None):
+            err_str = "%s: -A cannot be used with -E or -B" % (g_module_name)
+            raise Exception (err_str)
+        if (options.debug):
+            _eprint("%s:debug:using anchored alignment" % (g_module_name))
+        return lev_m.AnchoredLevenshtein(
+                g_module_name, words_1, words_2, key_fnx,
+                options.num_jobs, options.max_matrix_cells)
+
+    if (options.band_ms != None):
+        if (not engine in ("auto", "banded")):
+            err_str = "%s: the %s engine cannot be used with -B" % (g_module_name, engine)
+            raise Exception (err_str)
+        engine = "banded"
+    elif (engine == "banded"):
+        err_str = "%s: the banded engine requires -B" % (g_module_name)
+        raise Exception (err_str)
+
+    if (engine == "auto"):
+        if (not options.lengthy):
+            engine = "bitparallel"
+        elif (len(words_1) * len(words_2) > options.max_matrix_cells):
+            engine = "hirschberg"
+        else:
+            engine = "numpy"
+
+    if (options.debug):
+        _eprint("%s:debug:using the %s engine" % (g_module_name, engine))
+
+    if (options.lengthy and engine == "bitparallel"):
+        err_str = "%s: the bitparallel engine cannot be used with -l" % (g_module_name)
+        raise Exception (err_str)
+
+    if (engine == "python"):
+        return lev_m.Levenshtein(
+                g_module_name, list(words_1), list(words_2),
+                lambda e1, e2 : e1[1] == e2[1])
+    elif (engine == "numpy"):
+        return lev_m.NumpyLevenshtein(
+                g_module_name, words_1, words_2, key_fnx)
+    elif (engine == "hirschberg"):
+        return lev_m.HirschbergLevenshtein(
+                g_module_name, words_1, words_2, key_fnx)
+    elif (engine == "banded"):
+        return lev_m.BandedLevenshtein(
+                g_module_name, words_1, words_2, 
+                key_fnx, ts_fnx, options.band_ms)
+    else:
+        return lev_m.BitParallelLevenshtein(
+                g_module_name, words_1, words_2, key_fnx)
+
+
+def lev_distance(lev, words_1, words_2, verbose):
+
+    # returns lev.distance(verbose), counting the words and timing the
+    # alignment (see srtdf_instrument.py)
+
+    in_m.count("lev.words_1", len(words_1))
+    in_m.count("lev.words_2", len(words_2))
+
+    with in_m.span("lev.distance"):
+        return lev.distance(verbose)
+
+
 #+---------+
 #| CLASSES |
 #+---------+
@@ -130,6 +312,14 @@ class Options(object):
         self.m_dump_input    = False
         self.m_def_col_names = "FROM_TS,FROM_WORD,FROM_POS,FROM_ISSTOP,LEV_OP,TO_TS,TO_WORD,TO_POS,TO_ISSTOP,TS_DIFF"
         self.m_col_names     = self.m_def_col_names
+        self.m_engine        = "auto"
+        self.m_max_matrix_cells = 50000000
+        self.m_band_ms       = None
+        self.m_anchored      = False
+        self.m_num_jobs      = 1
+        self.m_input_filepath = None
+        self.m_csv_filepath   = None
+        self.m_weight_tables  = []
 
     @property
     def debug(self):
@@ -159,13 +349,95 @@ class Options(object):
             raise Exception (err_str)
         self.m_col_names = str
 
+    @property
+    def engine(self):
+        return self.m_engine
+
+    @engine.setter
+    def engine(self, v):
+        if (not v in ("auto", "python", "numpy", "hirschberg", "banded", 
+                      "bitparallel")):
+            err_str = "%s: invalid engine %s" % (self.m_mn, v)
+            raise Exception (err_str)
+        self.m_engine = v
+
+    @property
+    def max_matrix_cells(self):
+        return self.m_max_matrix_cells
+
+    @max_matrix_cells.setter
+    def max_matrix_cells(self, v):
+        self.m_max_matrix_cells = v
+
+    @property
+    def band_ms(self):
+        return self.m_band_ms
+
+    @band_ms.setter
+    def band_ms(self, v):
+        self.m_band_ms = v
+
+    @property
+    def anchored(self):
+        return self.m_anchored
+
+    @anchored.setter
+    def anchored(self, v):
+        self.m_anchored = v
+
+    @property
+    def num_jobs(self):
+        return self.m_num_jobs
+
+    @num_jobs.setter
+    def num_jobs(self, v):
+        self.m_num_jobs = v
+
+    @property
+    def input_filepath(self):
+        return self.m_input_filepath
+
+    @input_filepath.setter
+    def input_filepath(self, v):
+        self.m_input_filepath = v
+
+    @property
+    def csv_filepath(self):
+        return self.m_csv_filepath
+
+    @csv_filepath.setter
+    def csv_filepath(self, v):
+        self.m_csv_filepath = v
+
+    @property
+    def weight_tables(self):
+        # names or file paths of weight tables. [] for the default ones
+        return self.m_weight_tables
+
+    @weight_tables.setter
+    def weight_tables(self, v):
+        self.m_weight_tables = v
+
+    def new_weight_tables(self):
+        if (len(self.m_weight_tables) == 0):
+            return sm_m.default_weight_tables()
+        return [ sm_m.new_weight_table(v) for v in self.m_weight_tables ]
+
     def parse_cmdline(self):
         opts, args = \
             getopt.getopt(sys.argv[1:], 
-                    "lC:dh", 
+                    "lC:E:B:Aj:M:i:o:W:dh", 
                     [
                       "lengthy",
                       "col-names=",
+                      "engine=",
+                      "band-ms=",
+                      "anchored",
+                      "num-jobs=",
+                      "max-matrix-cells=",
+                      "input-filepath=",
+                      "csv-filepath=",
+                      "weight-table=",
                       "debug",
                       "help"
                     ])
@@ -178,15 +450,41 @@ class Options(object):
                 options.lengthy = True
             elif o in ("-C", "--col-names"):
                 options.col_names = v
+            elif o in ("-E", "--engine"):
+                options.engine = v
+            elif o in ("-B", "--band-ms"):
+                options.band_ms = int(v)
+            elif o in ("-A", "--anchored"):
+                options.anchored = True
+            elif o in ("-j", "--num-jobs"):
+                options.num_jobs = int(v)
+            elif o in ("-M", "--max-matrix-cells"):
+                options.max_matrix_cells = int(v)
+            elif o in ("-i", "--input-filepath"):
+                options.input_filepath = v
+            elif o in ("-o", "--csv-filepath"):
+                options.csv_filepath = v
+            elif o in ("-W", "--weight-table"):
+                options.weight_tables.append(v)
             elif o in ("-d", "--debug"):
                 options.debug = True
 
+        self.new_weight_tables()    # checks the -W values
+
     #https://dbader.org/blog/python-repr-vs-str
 
     def __str__(self):
         ret = { 
                 "--lengthy"   : self.m_lengthy,
                 "--col-names" : self.m_col_names,
+                "--engine"    : self.m_engine,
+                "--band-ms"   : self.m_band_ms,
+                "--anchored"  : self.m_anchored,
+                "--num-jobs"  : self.m_num_jobs,
+                "--max-matrix-cells" : self.m_max_matrix_cells,
+                "--input-filepath" : self.m_input_filepath,
+                "--csv-filepath"   : self.m_csv_filepath,
+                "--weight-table"   : self.m_weight_tables,
                 "--debug"     : self.m_debug
               }
         return str(ret)
@@ -194,27 +492,55 @@ class Options(object):
 
 class SrtSegmentInfoDumper(object):
 
-    def __init__(self, module_name, prefix_str, num_indent_spaces):
+    def __init__(self, module_name, prefix_str, num_indent_spaces,
+                 fp = sys.stdout):
 
         self.m_mn = module_name
+        self.m_fp = fp
         self.m_prev_index = -1
         self.m_prefix_str = prefix_str
         self.m_indent_str = ' ' * num_indent_spaces
 
-    def dump(self, ssi):  # ssi => srt_segment_info
+    def format(self, ssi):  # ssi => srt_segment_info
+
+        # returns the lines of the segment, or None if it is the segment
+        # of the previous call
 
-        if (ssi.index != self.m_prev_index):
-            print(ssi.to_diff_format_string(self.m_prefix_str, self.m_indent_str))
-            self.m_prev_index = ssi.index
+        if (ssi.index == self.m_prev_index):
+            return None
+        self.m_prev_index = ssi.index
+        return ssi.to_diff_format_string(self.m_prefix_str, self.m_indent_str)
+
+    def dump(self, ssi):
+
+        lines = self.format(ssi)
+        if (lines != None):
+            print(lines, file=self.m_fp)
 
 
 class LevRecordDumper(object):
 
-    def __init__(self, module_name, col_names):
+    def __init__(self, module_name, col_names, fp = sys.stdout,
+                 dump_segments = True, csv_fp = None, 
+                 batch_size = g_def_write_batch_size):
+
+        # the records are written on fp, along with the '>' and '<' lines
+        # of their segments unless dump_segments is False (which makes 
+        # the output a plain csv). if csv_fp is not None the plain csv
+        # is also written on it. 
+        #
+        # the lines are written batch_size at a time. flush() must be 
+        # called after the last record.
 
         self.m_mn = module_name
-        self.m_ssid_1 = SrtSegmentInfoDumper(module_name, ">", 0)
-        self.m_ssid_2 = SrtSegmentInfoDumper(module_name, "<", 15)
+        self.m_fp = fp
+        self.m_csv_fp = csv_fp
+        self.m_dump_segments = dump_segments
+        self.m_batch_size = batch_size
+        self.m_lines = []
+        self.m_csv_lines = [] if csv_fp != None else None
+        self.m_ssid_1 = SrtSegmentInfoDumper(module_name, ">", 0, fp)
+        self.m_ssid_2 = SrtSegmentInfoDumper(module_name, "<", 15, fp)
         self.m_dump_op_fnxs = \
                 {
                     '=' : LevRecordDumper.dump_match_or_replace_record,
@@ -223,7 +549,7 @@ class LevRecordDumper(object):
                     'I' : LevRecordDumper.dump_insert_record
                 }
 
-        print(col_names)
+        self._add_record(col_names)
 
 
     def dump(self, op_rec):
@@ -244,6 +570,35 @@ class LevRecordDumper(object):
         op = op_rec[0]
         (self.m_dump_op_fnxs[op])(self, op_rec)
 
+        if (len(self.m_lines) >= self.m_batch_size):
+            self.flush()
+
+
+    def flush(self):
+
+        if (self.m_lines):
+            self.m_fp.write("\n".join(self.m_lines) + "\n")
+            self.m_lines = []
+
+        if (self.m_csv_lines):
+            self.m_csv_fp.write("\n".join(self.m_csv_lines) + "\n")
+            self.m_csv_lines = []
+
+
+    def _add_segment(self, ssid, ssi):
+
+        if (self.m_dump_segments):
+            lines = ssid.format(ssi)
+            if (lines != None):
+                self.m_lines.append(lines)
+
+
+    def _add_record(self, record):
+
+        self.m_lines.append(record)
+        if (self.m_csv_lines != None):
+            self.m_csv_lines.append(record)
+
 
     def dump_match_or_replace_record(self, op_rec):
 
@@ -265,13 +620,13 @@ class LevRecordDumper(object):
 
         ts_diff = abs(ts_in_1 - ts_in_2)
 
-        self.m_ssid_1.dump(ssi_in_1)
-        self.m_ssid_2.dump(ssi_in_2)
+        self._add_segment(self.m_ssid_1, ssi_in_1)
+        self._add_segment(self.m_ssid_2, ssi_in_2)
 
-        print(f"{ts_in_1},{word_in_1},{pos_in_1},{istop_in_1},"
-              f"{op},"
-              f"{ts_in_2},{word_in_2},{pos_in_2},{istop_in_2},"
-              f"{ts_diff}")
+        self._add_record(f"{ts_in_1},{word_in_1},{pos_in_1},{istop_in_1},"
+                         f"{op},"
+                         f"{ts_in_2},{word_in_2},{pos_in_2},{istop_in_2},"
+                         f"{ts_diff}")
 
 
     def dump_delete_record(self, op_rec):
@@ -285,11 +640,11 @@ class LevRecordDumper(object):
         istop_in_1 = item_in_1[3]
         ssi_in_1   = item_in_1[4]
 
-        self.m_ssid_1.dump(ssi_in_1)
+        self._add_segment(self.m_ssid_1, ssi_in_1)
 
-        print(f"{ts_in_1},{word_in_1},{pos_in_1},{istop_in_1},"
-              f"{op},"
-              f",,,,")
+        self._add_record(f"{ts_in_1},{word_in_1},{pos_in_1},{istop_in_1},"
+                         f"{op},"
+                         f",,,,")
 
 
     def dump_insert_record(self, op_rec):
@@ -303,11 +658,11 @@ class LevRecordDumper(object):
         istop_in_2 = item_in_2[3]
         ssi_in_2   = item_in_2[4]
 
-        self.m_ssid_2.dump(ssi_in_2)
+        self._add_segment(self.m_ssid_2, ssi_in_2)
 
-        print(f",,,,"
-              f"{op},"
-              f"{ts_in_2},{word_in_2},{pos_in_2},{istop_in_2},")
+        self._add_record(f",,,,"
+                         f"{op},"
+                         f"{ts_in_2},{word_in_2},{pos_in_2},{istop_in_2},")
 
 
 #+------+
@@ -318,6 +673,7 @@ if __name__ == '__main__':
 
     try:
         g_module_name  = os.path.basename(__file__)
+        sm_m.g_module_name = g_module_name
 
         #
         # collect command line options
@@ -325,6 +681,7 @@ if __name__ == '__main__':
 
         options = Options(g_module_name)
         options.parse_cmdline()
+        in_m.enable_from_env()
         if (options.debug):
             _eprint("%s:debug:options:%s" %
                     (g_module_name, str(options)))
@@ -340,7 +697,8 @@ if __name__ == '__main__':
                      "starting to read lines from stdin"))
 
         srt_parser = scr_m.SrtCompareReader(g_module_name)
-        parse_input(srt_parser, options)
+        with in_m.span("srtcomp.parse"):
+            parse_input(srt_parser, options)
 
         if (options.debug):
             _eprint("%s:debug:%s" %
@@ -356,14 +714,18 @@ if __name__ == '__main__':
                     (g_module_name, 
                      "starting to calculate Levenshtein distance"))
 
-        lev = lev_m.Levenshtein(
-                g_module_name, 
-                srt_parser.ts_words_in_1.words,
-                srt_parser.ts_words_in_2.words,
-                lambda e1, e2 : e1[1] == e2[1])
-        lev_dist = lev.distance(options.debug)
+        words_1 = srt_parser.ts_words_in_1.words
+        words_2 = srt_parser.ts_words_in_2.words
+
+        lev = new_levenshtein(options, words_1, words_2)
+        lev_dist = lev_distance(lev, words_1, words_2, options.debug)
         print("%d" % lev_dist)
 
+        if (options.band_ms != None and lev.band_excess > 0):
+            _eprint("%s:warning:the %d ms band may have constrained the alignment. the distance may exceed the smallest one by up to %d (the path touches the edge of the band at %d places). a larger -B value may reduce it" %
+                    (g_module_name, options.band_ms, lev.band_excess,
+                     lev.band_edge_hits))
+
         if (options.debug):
             _eprint("%s:debug:%s" %
                     (g_module_name, 
@@ -375,12 +737,32 @@ if __name__ == '__main__':
 
         if (options.lengthy):
 
-            print("#--details--")
-            lev_rd = LevRecordDumper(g_module_name, options.col_names)
-            for op_rec in lev.walk():
-                lev_rd.dump(op_rec)
+            csv_fp = None
+            if (options.csv_filepath != None):
+                csv_fp = open(options.csv_filepath, "w")
+
+            weight_tables = options.new_weight_tables()
+
+            with in_m.span("lev.details"):
+                print("#--details--")
+                lev_rd = LevRecordDumper(g_module_name, options.col_names,
+                                         sys.stdout, True, csv_fp)
+                metric_cols = sm_m.MetricColumns()
+                for op_rec in lev.walk():
+                    lev_rd.dump(op_rec)
+                    metric_cols.add(op_rec)
+                lev_rd.flush()
+
+                print("#--metrics--")
+                print("\n".join(sm_m.metrics_section_lines(
+                        sm_m.SrtMetrics(metric_cols, weight_tables))))
+
+            if (csv_fp != None):
+                in_m.count_output_bytes(csv_fp)
+                csv_fp.close()
 
-            print("#--metrics--")
+        in_m.count_output_bytes(sys.stdout)
+        in_m.write_summary(g_module_name)
 
     except:
         traceback.print_exc()
@@ -0,0 +1,607 @@
+#+---------+
+#| IMPORTS |
+#+---------+
+
+import os
+import sys
+import traceback
+import getopt
+import numpy as np
+
+#+------------------+
+#| GLOBAL VARIABLES |
+#+------------------+
+
+g_module_name = None
+
+# the weight tables of the MaxScore strategies of
+# docs/srt_distance_metric.md. KEY is a part of speech (as in the POS
+# columns), 'STOP' for the stop words (whatever their part of speech) or
+# '*' for the words no other key applies to.
+
+g_def_weight_tables = {
+"words" : """
+KEY,WEIGHT
+*,1
+""",
+"nonstop" : """
+KEY,WEIGHT
+STOP,0
+*,1
+""",
+"pos" : """
+KEY,WEIGHT
+NOUN,2
+PROPN,2
+VERB,2
+ADJ,2
+ADV,2
+DET,0
+CCONJ,0
+SCONJ,0
+ADP,0
+PART,0
+PUNCT,0
+*,1
+"""
+}
+
+g_def_weight_table_names = [ "words", "nonstop", "pos" ]
+
+g_aggregate_name = "*"      # the FILE of the metrics of all the files
+
+g_header      = "NAME,VALUE,NRECORDS"
+g_file_header = "FILE,NAME,VALUE,NRECORDS"
+
+# the columns of a srtlev.csv record
+
+COL_ORG_TS     = 0
+COL_ORG_POS    = 2
+COL_ORG_ISSTOP = 3
+COL_LEV_OP     = 4
+COL_TRAN_TS    = 5
+
+OP_MATCH   = ord('=')
+OP_REPLACE = ord('R')
+OP_DELETE  = ord('D')
+OP_INSERT  = ord('I')
+
+#+-----------+
+#| FUNCTIONS |
+#+-----------+
+
+def _eprint(*args, **kwargs):
+    print(*args, file=sys.stderr, flush=True, **kwargs)
+    #sys.stderr.flush()
+
+def usage():
+    format_str = """
+NAME
+
+    %s - Computes the srt distance metrics of srtlev.csv files.
+
+SYNOPSIS
+
+    %s [-w weight_table] ... [-s] [-h] [srtlev_filepath ...]
+
+DESCRIPTION
+
+    Computes the metrics of docs/srt_distance_metric.md from the
+    levenshtein details in csv format (srtlev.csv, as generated by the
+    srt_diff.sh script), without aligning the srt files again. If no
+    srtlev_filepath is specified, stdin is used. They are the metrics
+    that srtdf_srt_lev.py -l writes in its '#--metrics--' section.
+
+    minTimeDiffMs, maxTimeDiffMs, avTimeDiffMs
+        of the TS_DIFF column (|TRAN_TS - ORG_TS|) of the '=' and 'R'
+        records.
+
+    timeDeviation
+        the standard deviation of TRAN_TS - ORG_TS over the same
+        records.
+
+    srtSimilarity.{weight_table}
+        sum(GivenScore) / sum(MaxScore) over the records of the words of
+        the original file ('=', 'R' and 'D'). the MaxScore of a word is
+        its weight in the weight table. its GivenScore is the MaxScore
+        for '=' and 0 otherwise.
+
+    NRECORDS is the number of records a metric is computed over. The
+    VALUE is 'NA' if there are none.
+
+    A weight table must be as follows
+    KEY,WEIGHT
+    ...,......
+    where KEY is a part of speech (as in the ORG_POS column), 'STOP'
+    for the stop words (ORG_ISSTOP is True) or '*' for the words no other
+    key applies to (0 if there is no '*'). The built-in tables are the
+    MaxScore strategies of docs/srt_distance_metric.md:
+%s
+    Note that the part of speech of every word is '?' if the srt files
+    were compared without it (-P).
+
+    The output for a single srtlev_filepath (or stdin) is
+
+    NAME,VALUE,NRECORDS
+    ....,.....,........
+
+    The output for more than one srtlev_filepath is
+
+    FILE,NAME,VALUE,NRECORDS
+    ....,....,.....,........
+
+    with the rows of each file in the order of the arguments, followed
+    by those of the records of all the files, the FILE of which is '%s'.
+
+OPTIONS
+
+    -w  weight_table
+        the name of a built-in weight table or the path of a weight
+        table file. may be specified more than once.
+        this is optional. default is %s.
+
+    -s
+        summary. only the metrics of all the files are output, in the
+        format of a single file.
+        this is optional.
+
+    -h
+        Displays this help and quits.
+        This is optional.
+"""
+    tables_str = "\n".join(
+        [ "\n    %s:%s" % (name, "\n".join([ "    " + line for line in
+                            g_def_weight_tables[name].split("\n") ]))
+          for name in g_def_weight_table_names ])
+
+    usage_str = format_str % (g_module_name, g_module_name, tables_str,
+                              g_aggregate_name,
+                              ",".join(g_def_weight_table_names))
+    _eprint(usage_str)
+
+
+def new_weight_table(name_or_filepath):
+
+    # returns the built-in weight table of that name, or the weight
+    # table read from that file
+
+    if (name_or_filepath in g_def_weight_tables):
+        return WeightTable(g_module_name, name_or_filepath,
+                           g_def_weight_tables[name_or_filepath])
+
+    if (not os.path.isfile(name_or_filepath)):
+        err_str = "%s: no weight table %s" % (g_module_name, name_or_filepath)
+        raise Exception (err_str)
+
+    name = os.path.splitext(os.path.basename(name_or_filepath))[0]
+    with open(name_or_filepath) as f:
+        return WeightTable(g_module_name, name, f.read(), name_or_filepath)
+
+
+def default_weight_tables():
+    return [ new_weight_table(name) for name in g_def_weight_table_names ]
+
+
+def read_metric_columns(lines):
+
+    # returns the MetricColumns of the lines of a srtlev.csv. the header
+    # line, blank lines and the lines beginning with '#' are left out.
+
+    cols = MetricColumns()
+
+    header_seen = False
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if (line == "" or line.startswith("#")):
+            continue
+        if (not header_seen):
+            header_seen = True
+            continue
+
+        fields = line.split(",")
+        cols.add_fields(fields[COL_LEV_OP], fields[COL_ORG_TS],
+                        fields[COL_ORG_POS], fields[COL_ORG_ISSTOP] == "True",
+                        fields[COL_TRAN_TS])
+
+    return cols
+
+
+def read_metric_columns_file(filepath):
+
+    # the MetricColumns of a srtlev.csv file, or of stdin if filepath
+    # is None
+
+    if (filepath == None):
+        return read_metric_columns(sys.stdin)
+
+    with open(filepath) as f:
+        return read_metric_columns(f)
+
+
+def walk_metric_columns(op_recs):
+
+    # returns the MetricColumns of the records of a levenshtein walk
+    # (see LevRecordDumper.dump in srtdf_srt_lev.py)
+
+    cols = MetricColumns()
+    for op_rec in op_recs:
+        cols.add(op_rec)
+    return cols
+
+
+def _value_str(v, fmt):
+    return "NA" if v == None else fmt % (v)
+
+
+def metrics_section_lines(metrics):
+
+    # the lines of the '#--metrics--' section of srtdf_srt_lev.py
+
+    lines = [
+      "min timeDiffMs              %s" % _value_str(metrics.min_ts_diff, "%d"),
+      "max timeDiffMs              %s" % _value_str(metrics.max_ts_diff, "%d"),
+      "av  timeDiffMs              %s" % _value_str(metrics.av_ts_diff, "%.2f"),
+      "std standardDeviation       %s" % _value_str(metrics.time_deviation, "%.2f")
+    ]
+    for (name, v) in metrics.similarities:
+        lines.append("%-27s %s" % ("srtSimilarity." + name,
+                                   _value_str(v, "%.4f")))
+    return lines
+
+#+---------+
+#| CLASSES |
+#+---------+
+
+class WeightTable(object):
+
+    # the MaxScore of the words of the original file, by part of speech
+
+    def __init__(self, module_name, name, spec_str, filepath = None):
+
+        self.m_mn          = module_name
+        self.m_name        = name
+        self.m_weights     = {}
+        self.m_stop_weight = None
+        self.m_def_weight  = 0.0
+
+        if (filepath == None):
+            filepath = "weight table " + name
+
+        header_seen = False
+        for line_num, line in enumerate(spec_str.split("\n"), 1):
+            if (line.strip() == ""):
+                continue
+            if (not header_seen):
+                header_seen = True
+                continue
+
+            tokens = line.split(",")
+            if (len(tokens) != 2):
+                err_str = "%s: %d tokens found at line %d in %s" % \
+                            (self.m_mn, len(tokens), line_num, filepath)
+                raise Exception (err_str)
+
+            key = tokens[0].strip()
+            try:
+                weight = float(tokens[1])
+            except ValueError:
+                err_str = "%s: invalid weight at line %d in %s" % \
+                            (self.m_mn, line_num, filepath)
+                raise Exception (err_str)
+
+            if (key == "*"):
+                self.m_def_weight = weight
+            elif (key == "STOP"):
+                self.m_stop_weight = weight
+            else:
+                self.m_weights[key] = weight
+
+    @property
+    def name(self):
+        return self.m_name
+
+    def weights(self, pos_names, pos_codes, stop_flags):
+
+        # returns the weight of each word. pos_names[pos_codes[k]] is
+        # the part of speech of word k.
+
+        pos_weights = np.array([ self.m_weights.get(p, self.m_def_weight)
+                                 for p in pos_names ] + [ 0.0 ],
+                               dtype = np.float64)
+        w = pos_weights[pos_codes]
+        if (self.m_stop_weight != None):
+            w = np.where(stop_flags, self.m_stop_weight, w)
+        return w
+
+
+class MetricColumns(object):
+
+    # the columns of the records of a levenshtein walk that the metrics
+    # are computed from: the operation, the timestamps of both words and
+    # the part of speech and stop flag of the word of the original file.
+    # they are gathered in lists and turned into numpy arrays once.
+
+    def __init__(self):
+        self.m_ops        = bytearray()
+        self.m_ts_1       = []
+        self.m_ts_2       = []
+        self.m_pos_ids    = {}      # part of speech -> code
+        self.m_pos_codes  = []
+        self.m_stop_flags = bytearray()
+        self.m_arrays     = None
+
+    def _pos_code(self, pos):
+        return self.m_pos_ids.setdefault(pos, len(self.m_pos_ids))
+
+    def add(self, op_rec):
+
+        # op_rec is (op, item_in_1|None, item_in_2|None) where an item is
+        # (timestampms, word, pos, isstop, srtsegment)
+
+        (op, item_in_1, item_in_2) = op_rec[:3]
+
+        self.m_ops.append(ord(op))
+        if (item_in_1 != None):
+            self.m_ts_1.append(item_in_1[0])
+            self.m_pos_codes.append(self._pos_code(item_in_1[2]))
+            self.m_stop_flags.append(1 if item_in_1[3] else 0)
+        else:
+            self.m_ts_1.append(0)
+            self.m_pos_codes.append(-1)
+            self.m_stop_flags.append(0)
+        self.m_ts_2.append(item_in_2[0] if item_in_2 != None else 0)
+        self.m_arrays = None
+
+    def add_fields(self, op, ts_1, pos_1, is_stop_1, ts_2):
+
+        # the same as add, for the fields of a srtlev.csv record
+
+        self.m_ops.append(ord(op))
+        self.m_ts_1.append(int(ts_1) if ts_1 != "" else 0)
+        self.m_pos_codes.append(self._pos_code(pos_1) if ts_1 != "" else -1)
+        self.m_stop_flags.append(1 if is_stop_1 else 0)
+        self.m_ts_2.append(int(ts_2) if ts_2 != "" else 0)
+        self.m_arrays = None
+
+    def extend(self, other):
+
+        # appends the records of other
+
+        for (op, ts_1, code, stop, ts_2) in zip(other.m_ops, other.m_ts_1,
+                other.m_pos_codes, other.m_stop_flags, other.m_ts_2):
+            pos = other.pos_names[code] if code >= 0 else None
+            self.m_ops.append(op)
+            self.m_ts_1.append(ts_1)
+            self.m_pos_codes.append(self._pos_code(pos) if code >= 0 else -1)
+            self.m_stop_flags.append(stop)
+            self.m_ts_2.append(ts_2)
+        self.m_arrays = None
+
+    @property
+    def pos_names(self):
+        names = [ None ] * len(self.m_pos_ids)
+        for (pos, code) in self.m_pos_ids.items():
+            names[code] = pos
+        return names
+
+    def arrays(self):
+
+        # returns (ops, ts_1, ts_2, pos_codes, stop_flags) numpy arrays.
+        # the pos code of the records with no word of the original file
+        # is -1 (the last weight of WeightTable.weights).
+
+        if (self.m_arrays == None):
+            self.m_arrays = (
+                np.frombuffer(bytes(self.m_ops), dtype = np.uint8),
+                np.array(self.m_ts_1, dtype = np.int64),
+                np.array(self.m_ts_2, dtype = np.int64),
+                np.array(self.m_pos_codes, dtype = np.int64),
+                np.frombuffer(bytes(self.m_stop_flags),
+                              dtype = np.uint8).astype(bool))
+        return self.m_arrays
+
+    def __len__(self):
+        return len(self.m_ops)
+
+
+class SrtMetrics(object):
+
+    # the metrics of docs/srt_distance_metric.md (see usage) of a
+    # MetricColumns, for each of the weight tables
+
+    def __init__(self, cols, weight_tables):
+
+        (ops, ts_1, ts_2, pos_codes, stop_flags) = cols.arrays()
+
+        # time metrics, over the records of two words
+
+        paired  = (ops == OP_MATCH) | (ops == OP_REPLACE)
+        diffs   = (ts_2 - ts_1)[paired]
+
+        self.m_num_paired = len(diffs)
+        if (self.m_num_paired > 0):
+            abs_diffs = np.abs(diffs)
+            self.m_min_ts_diff    = int(abs_diffs.min())
+            self.m_max_ts_diff    = int(abs_diffs.max())
+            self.m_av_ts_diff     = float(abs_diffs.mean())
+            self.m_time_deviation = float(diffs.std())
+        else:
+            self.m_min_ts_diff    = None
+            self.m_max_ts_diff    = None
+            self.m_av_ts_diff     = None
+            self.m_time_deviation = None
+
+        # similarity, over the records of a word of the original file
+
+        in_org  = paired | (ops == OP_DELETE)
+        matched = (ops == OP_MATCH)[in_org]
+        codes   = pos_codes[in_org]
+        stops   = stop_flags[in_org]
+
+        self.m_num_org      = int(np.count_nonzero(in_org))
+        self.m_similarities = []
+        for table in weight_tables:
+            max_scores = table.weights(cols.pos_names, codes, stops)
+            max_total  = float(max_scores.sum())
+            given      = float(max_scores[matched].sum())
+            self.m_similarities.append(
+                (table.name, given / max_total if max_total > 0 else None))
+
+    @property
+    def min_ts_diff(self):
+        return self.m_min_ts_diff
+
+    @property
+    def max_ts_diff(self):
+        return self.m_max_ts_diff
+
+    @property
+    def av_ts_diff(self):
+        return self.m_av_ts_diff
+
+    @property
+    def time_deviation(self):
+        return self.m_time_deviation
+
+    @property
+    def similarities(self):
+        # (weight table name, SrtSimilarity) pairs
+        return self.m_similarities
+
+    def to_csv_lines(self, filename = None):
+
+        # the rows of the metrics (see g_header). the FILE column (see
+        # g_file_header) is added if filename is not None.
+
+        rows = [
+          "minTimeDiffMs,%s,%d" % (_value_str(self.m_min_ts_diff, "%d"),
+                                   self.m_num_paired),
+          "maxTimeDiffMs,%s,%d" % (_value_str(self.m_max_ts_diff, "%d"),
+                                   self.m_num_paired),
+          "avTimeDiffMs,%s,%d"  % (_value_str(self.m_av_ts_diff, "%.2f"),
+                                   self.m_num_paired),
+          "timeDeviation,%s,%d" % (_value_str(self.m_time_deviation, "%.2f"),
+                                   self.m_num_paired)
+        ]
+        for (name, v) in self.m_similarities:
+            rows.append("srtSimilarity.%s,%s,%d" %
+                        (name, _value_str(v, "%.4f"), self.m_num_org))
+
+        if (filename != None):
+            rows = [ "%s,%s" % (filename, row) for row in rows ]
+
+        return rows
+
+    def to_csv_string(self):
+        return "\n".join([ g_header ] + self.to_csv_lines()) + "\n"
+
+
+class Options(object):
+    def __init__(self, module_name):
+        self.m_mn               = module_name
+        self.m_weight_tables    = []
+        self.m_summary          = False
+        self.m_srtlev_filepaths = []
+
+    @property
+    def weight_tables(self):
+        # names or file paths, in the order of the -w options
+        return self.m_weight_tables
+
+    @property
+    def summary(self):
+        return self.m_summary
+
+    @summary.setter
+    def summary(self, v):
+        self.m_summary = v
+
+    @property
+    def srtlev_filepaths(self):
+        return self.m_srtlev_filepaths
+
+    def parse_cmdline(self):
+        opts, args = \
+            getopt.getopt(sys.argv[1:],
+                    "w:sh",
+                    [
+                      "weight-table=",
+                      "summary",
+                      "help"
+                    ])
+
+        for o, v in opts:
+            if o in ("-h", "--help"):
+                usage()
+                sys.exit(0)
+            elif o in ("-w", "--weight-table"):
+                self.m_weight_tables.append(v)
+            elif o in ("-s", "--summary"):
+                self.summary = True
+
+        for filepath in args:
+            if (not os.path.isfile(filepath)):
+                err_str = "%s: %s not present" % (self.m_mn, filepath)
+                raise Exception (err_str)
+            self.m_srtlev_filepaths.append(filepath)
+
+    #https://dbader.org/blog/python-repr-vs-str
+
+    def __str__(self):
+        ret = {
+                "--weight-table" : self.m_weight_tables,
+                "--summary"      : self.m_summary,
+                "args"           : self.m_srtlev_filepaths
+              }
+        return str(ret)
+
+#+------+
+#| MAIN |
+#+------+
+
+if __name__ == '__main__':
+
+    try:
+        g_module_name  = os.path.basename(__file__)
+
+        options = Options(g_module_name)
+        options.parse_cmdline()
+
+        if (len(options.weight_tables) > 0):
+            weight_tables = [ new_weight_table(v)
+                              for v in options.weight_tables ]
+        else:
+            weight_tables = default_weight_tables()
+
+        filepaths = options.srtlev_filepaths
+        if (len(filepaths) == 0):
+            filepaths = [ None ]        # stdin
+
+        cols_total = MetricColumns()
+        out_lines  = []
+
+        for filepath in filepaths:
+            cols = read_metric_columns_file(filepath)
+
+            if (len(filepaths) > 1):
+                cols_total.extend(cols)
+                if (not options.summary):
+                    out_lines.extend(SrtMetrics(cols, weight_tables).
+                                        to_csv_lines(filepath))
+            else:
+                cols_total = cols
+
+        metrics_total = SrtMetrics(cols_total, weight_tables)
+
+        if (len(filepaths) > 1 and not options.summary):
+            out_lines.extend(metrics_total.to_csv_lines(g_aggregate_name))
+            sys.stdout.write("\n".join([ g_file_header ] + out_lines) +
+                             "\n")
+        else:
+            sys.stdout.write(metrics_total.to_csv_string())
+
+    except:
+        traceback.print_exc()
+        sys.exit(1)
+
+    sys.exit(0)
@@ -0,0 +1,511 @@
+#+---------+
+#| IMPORTS |
+#+---------+
+
+import os
+import sys
+import traceback
+import getopt
+import re
+
+import srtdf_srt_reader as sr_m
+import srtdf_instrument as in_m
+
+#+------------------+
+#| GLOBAL VARIABLES |
+#+------------------+
+
+g_module_name = None
+
+g_def_wpm          = 150
+g_def_tolerance_ms = 1000
+
+# states of infer_end_times(). see srtdf_infer_endtime.sh
+
+EOS_SEEN        = 1     # EOS => END OF SEGMENT (index + time range + phrase(s))
+INDEX_SEEN      = 2
+TIME_RANGE_SEEN = 3
+
+g_index_re    = re.compile(r"[0-9]+")
+g_time_re     = re.compile(r"[0-9][0-9]:[0-9][0-9]:[0-9][0-9](,[0-9][0-9][0-9])?")
+g_empty_re    = re.compile(r"[ \t]*")
+g_words_re    = re.compile(r"[ \t]+")
+g_number_re   = re.compile(r"[ \t]*([-+]?[0-9]+)")
+g_hour_re     = re.compile(r"^0*([0-9][0-9]):")
+g_end_hour_re = re.compile(r"--> 0*([0-9][0-9]):")
+
+g_debug_header = "INDEX,TR_GOOD,NUM_PHRASE_LINES,NUM_PHRASE_WORDS,WPM,DURATION_MS,BEGIN_TIME,BEGIN_TIME_MS,COMP_END_TIME,COMP_END_TIME_MS,END_TIME,END_TIME_MS,TOLERANCE,END_TRUNCATED"
+
+#+-----------+
+#| FUNCTIONS |
+#+-----------+
+
+def _eprint(*args, **kwargs):
+    print(*args, file=sys.stderr, flush=True, **kwargs)
+    #sys.stderr.flush()
+
+def usage():
+    format_str = """
+NAME
+
+    %s - Normalizes a srt file and infers the end time of each entry
+
+SYNOPSIS
+
+    %s [-N] [-w words_per_minute] [-t tolerance_ms] [-d] [-h]
+       [srt_filepath]
+
+DESCRIPTION
+
+    Does what
+
+        srtdf_utf8_base.sh srt_filepath | srtdf_infer_endtime.sh
+
+    does, in a single pass over srt_filepath (or stdin, if srt_filepath
+    is not specified). No more than one entry is held in memory at a
+    time. The output srt is presented on stdout.
+
+    The normalization is that of srtdf_utf8_base.sh
+    (a) removes UTF-8 BOM at the beginning (only)
+    (b) removes '\\r' characters
+    (c) removes lines starting with '#'
+    (d) converts lines timing value from
+        0000000:00:00,920 to 00:00:00,920
+
+    The end time of an entry that does not have one is extrapolated
+    from its begin time and number of words, and truncated to the begin
+    time of the next entry. See srtdf_infer_endtime.sh for the details
+    of extrapolation and tolerance.
+
+OPTIONS
+
+    -N
+       normalize only. the end times are left as they are.
+       this is optional.
+
+    -w words_per_minute
+       this is optional. default is %d.
+
+    -t tolerance_ms
+       this is optional. default is %d.
+
+    -d
+       debug output on stderr. this is the csv output of the -d option
+       of srtdf_infer_endtime.sh.
+       this is optional.
+
+    -h
+       this help.
+       this is optional.
+"""
+    usage_str = format_str % (g_module_name, g_module_name,
+                              g_def_wpm, g_def_tolerance_ms)
+    _eprint(usage_str)
+
+
+def open_srt_file(filepath):
+
+    # opens a srt file for normalize_lines(). only '\n' ends a line so
+    # that a stray '\r' is removed rather than taken for a line end.
+
+    return open(filepath, encoding = "utf-8", errors = "surrogateescape",
+                newline = "\n")
+
+
+def normalize_lines(lines):
+
+    # yields the lines (without '\n') as srtdf_utf8_base.sh outputs them
+
+    first = True
+
+    for line in lines:
+        line = line.rstrip("\n").replace("\r", "")
+
+        if (first):
+            first = False
+            if (line.startswith("\ufeff")):
+                line = line[1:]
+
+        if (line.startswith("#")):
+            continue
+
+        line = g_hour_re.sub(r"\1:", line, 1)
+        line = g_end_hour_re.sub(r"--> \1:", line, 1)
+
+        yield line
+
+
+def srt_time_2_ms(t):
+
+    # as awk would make of it. the fields that are not numbers are 0.
+
+    ms = 0
+    fields = re.split(r"[:,]", t) if t != "" else []
+
+    for i, v in enumerate(fields[:3]):
+        m = g_number_re.match(v)
+        if (m != None):
+            ms = ms + int(m.group(1)) * (3600, 60, 1)[i] * 1000
+
+    if (len(fields) == 4):
+        m = g_number_re.match(fields[3])
+        if (m != None):
+            ms = ms + int(m.group(1))
+
+    return ms
+
+
+def ms_2_srt_time(ms):
+
+    (t, ms) = divmod(ms, 1000)
+    (h, t)  = divmod(t, 3600)
+    (m, s)  = divmod(t, 60)
+
+    return "%02d:%02d:%02d,%03d" % (h, m, s, ms)
+
+
+def infer_end_times(lines, wpm = g_def_wpm, tolerance_ms = g_def_tolerance_ms,
+                    debug_fp = None):
+
+    # yields the SrtEntry objects of the normalized lines with their end
+    # times inferred (see srtdf_infer_endtime.sh). an entry is yielded
+    # once the begin time of the next one is known, which is all the
+    # lookahead needed.
+
+    state = EOS_SEEN
+    curr  = None
+    prev  = None
+
+    if (debug_fp != None):
+        print(g_debug_header, file=debug_fp)
+
+    for line_num, line in enumerate(lines, 1):
+
+        if (state == EOS_SEEN):
+
+            if (g_empty_re.fullmatch(line)):
+                continue
+
+            prev = curr
+
+            if (not g_index_re.fullmatch(line)):
+                err_str = "%s: at line %d : expecting index" % \
+                            (g_module_name, line_num)
+                raise Exception (err_str)
+
+            curr  = SrtEntry(int(line))
+            state = INDEX_SEEN
+
+        elif (state == INDEX_SEEN):
+
+            fields = line.split()
+            begin_time_str = fields[0] if len(fields) > 0 else ""
+            end_time_str   = fields[2] if len(fields) > 2 else ""
+
+            if (not g_time_re.fullmatch(begin_time_str)):
+                err_str = "%s: at line %d : invalid begin time" % \
+                            (g_module_name, line_num)
+                raise Exception (err_str)
+
+            curr.set_time_range(begin_time_str, end_time_str)
+
+            if (prev != None and prev.index > 0):
+                prev.infer_end_time(curr, tolerance_ms, line_num)
+                if (debug_fp != None):
+                    print(prev.debug_info(wpm, tolerance_ms), file=debug_fp)
+                yield prev
+
+            state = TIME_RANGE_SEEN
+
+        else:
+
+            if (not g_empty_re.fullmatch(line)):
+                curr.add_phrase_line(line)
+                continue
+
+            # we have seen a blank line here and thus
+            # we have arrived at the end of a segment
+
+            if (not curr.time_range_good):
+                curr.extrapolate_end_time(wpm)
+
+            state = EOS_SEEN
+
+    if (curr != None and curr.index > 0):
+        if (not curr.time_range_good):
+            curr.extrapolate_end_time(wpm)
+        curr.end_at_comp_end_time()
+        if (debug_fp != None):
+            print(curr.debug_info(wpm, tolerance_ms), file=debug_fp)
+        yield curr
+
+
+def read_srt_entries(lines, wpm = g_def_wpm, tolerance_ms = g_def_tolerance_ms,
+                     debug_fp = None):
+
+    # normalizes the lines of a srt file and infers the end times of its
+    # entries. yields SrtEntry objects.
+
+    return infer_end_times(normalize_lines(lines), wpm, tolerance_ms,
+                           debug_fp)
+
+
+def load_srt_items(filepath, wpm = None, tolerance_ms = None):
+
+    # returns the srt items (see srtdf_srt_reader.py) of the srt file,
+    # normalized and with the end times inferred. wpm and tolerance_ms
+    # are the defaults if None.
+
+    if (wpm == None):
+        wpm = g_def_wpm
+    if (tolerance_ms == None):
+        tolerance_ms = g_def_tolerance_ms
+
+    with in_m.span("srt.prepare"), open_srt_file(filepath) as f:
+        items = [ entry.to_srt_item() for entry in
+                  read_srt_entries(f, wpm, tolerance_ms) ]
+
+        in_m.count("srt.files")
+        in_m.count("srt.bytes_read", os.fstat(f.fileno()).st_size)
+        in_m.count("srt.cues", len(items))
+        return items
+
+#+---------+
+#| CLASSES |
+#+---------+
+
+class SrtEntry(object):
+
+    # an entry of a srt file (index, time range and phrase lines) along
+    # with what is needed to infer its end time
+
+    def __init__(self, index):
+        self.m_index             = index
+        self.m_time_range_good   = 0
+        self.m_begin_time_str    = ""
+        self.m_begin_time_ms     = 0
+        self.m_comp_end_time_str = ""
+        self.m_comp_end_time_ms  = 0
+        self.m_end_time_str      = ""
+        self.m_end_time_ms       = 0
+        self.m_end_truncated     = 0
+        self.m_phrase_lines      = []
+        self.m_phrase_word_count = 0
+        self.m_duration_ms       = 0
+
+    @property
+    def index(self):
+        return self.m_index
+
+    @property
+    def time_range_good(self):
+        return self.m_time_range_good
+
+    def set_time_range(self, begin_time_str, end_time_str):
+
+        if (g_time_re.fullmatch(end_time_str)):
+            self.m_time_range_good = 1
+
+        self.m_begin_time_str    = begin_time_str
+        self.m_begin_time_ms     = srt_time_2_ms(begin_time_str)
+        self.m_end_time_str      = end_time_str
+        self.m_end_time_ms       = srt_time_2_ms(end_time_str)
+        self.m_comp_end_time_str = self.m_end_time_str
+        self.m_comp_end_time_ms  = self.m_end_time_ms
+
+    def add_phrase_line(self, line):
+
+        # the words are counted as srtdf_infer_endtime.sh counts them,
+        # which includes an empty word for leading or trailing blanks
+
+        self.m_phrase_lines.append(line)
+        self.m_phrase_word_count = self.m_phrase_word_count + \
+                                 len(g_words_re.split(line))
+
+    def extrapolate_end_time(self, wpm):
+
+        minutes = self.m_phrase_word_count / wpm
+        self.m_duration_ms       = int((minutes * 60) * 1000)
+        self.m_comp_end_time_ms  = self.m_begin_time_ms + self.m_duration_ms
+        self.m_comp_end_time_str = ms_2_srt_time(self.m_comp_end_time_ms)
+
+    def infer_end_time(self, next_entry, tolerance_ms, line_num):
+
+        # the end time is truncated to the begin time of the next entry,
+        # provided it is not after it by more than tolerance_ms
+
+        time_diff_ms = self.m_comp_end_time_ms - next_entry.m_begin_time_ms
+
+        if (time_diff_ms > tolerance_ms):
+            err_str = ("%s: at line %d : prev end time %s for segment %d "
+                       "exceeds curr begin time %s for segment %d "
+                       "by more than %d ms, try with higher wpm") % \
+                        (g_module_name, line_num, self.m_comp_end_time_str,
+                         self.m_index, next_entry.m_begin_time_str,
+                         next_entry.m_index, tolerance_ms)
+            raise Exception (err_str)
+
+        if (time_diff_ms > 0):
+            self.m_end_time_str  = next_entry.m_begin_time_str
+            self.m_end_time_ms   = next_entry.m_begin_time_ms
+            self.m_end_truncated = 1
+        else:
+            self.m_end_time_str  = self.m_comp_end_time_str
+            self.m_end_time_ms   = self.m_comp_end_time_ms
+
+    def end_at_comp_end_time(self):
+        self.m_end_time_str = self.m_comp_end_time_str
+        self.m_end_time_ms  = self.m_comp_end_time_ms
+
+    def debug_info(self, wpm, tolerance_ms):
+        return "%d,%d,%d,%d,%s,%d,%s,%d,%s,%d,%s,%d,%s,%d" % \
+                (self.m_index, self.m_time_range_good, len(self.m_phrase_lines),
+                 self.m_phrase_word_count, wpm, self.m_duration_ms,
+                 self.m_begin_time_str.replace(",", ".", 1),
+                 self.m_begin_time_ms,
+                 self.m_comp_end_time_str.replace(",", ".", 1),
+                 self.m_comp_end_time_ms,
+                 self.m_end_time_str.replace(",", ".", 1),
+                 self.m_end_time_ms, tolerance_ms, self.m_end_truncated)
+
+    def to_srt_string(self):
+        return "%d\n%s --> %s\n%s" % \
+                (self.m_index, self.m_begin_time_str, self.m_end_time_str,
+                 "".join([ line + "\n" for line in self.m_phrase_lines ]))
+
+    def to_srt_item(self):
+        return sr_m.SrtCue(self.m_index, self.m_begin_time_ms,
+                           self.m_end_time_ms,
+                           "\n".join([ line.rstrip() for line in
+                                       self.m_phrase_lines ]))
+
+
+class Options(object):
+    def __init__(self, module_name):
+        self.m_mn             = module_name
+        self.m_normalize_only = False
+        self.m_wpm            = g_def_wpm
+        self.m_tolerance_ms   = g_def_tolerance_ms
+        self.m_debug          = False
+        self.m_srt_filepath   = None
+
+    @property
+    def normalize_only(self):
+        return self.m_normalize_only
+
+    @normalize_only.setter
+    def normalize_only(self, v):
+        self.m_normalize_only = v
+
+    @property
+    def wpm(self):
+        return self.m_wpm
+
+    @wpm.setter
+    def wpm(self, v):
+        if (v <= 0):
+            err_str = "%s: invalid wpm %d" % (self.m_mn, v)
+            raise Exception (err_str)
+        self.m_wpm = v
+
+    @property
+    def tolerance_ms(self):
+        return self.m_tolerance_ms
+
+    @tolerance_ms.setter
+    def tolerance_ms(self, v):
+        self.m_tolerance_ms = v
+
+    @property
+    def debug(self):
+        return self.m_debug
+
+    @debug.setter
+    def debug(self, v):
+        self.m_debug = v
+
+    @property
+    def srt_filepath(self):
+        return self.m_srt_filepath
+
+    def parse_cmdline(self):
+        opts, args = \
+            getopt.getopt(sys.argv[1:],
+                    "Nw:t:dh",
+                    [
+                      "normalize-only",
+                      "wpm=",
+                      "tolerance=",
+                      "debug",
+                      "help"
+                    ])
+
+        for o, v in opts:
+            if o in ("-h", "--help"):
+                usage()
+                sys.exit(0)
+            elif o in ("-N", "--normalize-only"):
+                self.normalize_only = True
+            elif o in ("-w", "--wpm"):
+                self.wpm = int(v)
+            elif o in ("-t", "--tolerance"):
+                self.tolerance_ms = int(v)
+            elif o in ("-d", "--debug"):
+                self.debug = True
+
+        if (len(args) > 0):
+            if (not os.path.isfile(args[0])):
+                err_str = "%s: %s not present" % (self.m_mn, args[0])
+                raise Exception (err_str)
+            self.m_srt_filepath = args[0]
+
+    #https://dbader.org/blog/python-repr-vs-str
+
+    def __str__(self):
+        ret = {
+                "--normalize-only" : self.m_normalize_only,
+                "--wpm"            : self.m_wpm,
+                "--tolerance"      : self.m_tolerance_ms,
+                "--debug"          : self.m_debug,
+                "args"             : self.m_srt_filepath
+              }
+        return str(ret)
+
+#+------+
+#| MAIN |
+#+------+
+
+if __name__ == '__main__':
+
+    try:
+        g_module_name  = os.path.basename(__file__)
+
+        options = Options(g_module_name)
+        options.parse_cmdline()
+
+        if (options.srt_filepath != None):
+            in_fp = open_srt_file(options.srt_filepath)
+        else:
+            in_fp = open(sys.stdin.fileno(), encoding = "utf-8",
+                         errors = "surrogateescape", newline = "\n",
+                         closefd = False)
+
+        out_fp = open(sys.stdout.fileno(), "w", encoding = "utf-8",
+                      errors = "surrogateescape", closefd = False)
+
+        with in_fp, out_fp:
+            if (options.normalize_only):
+                for line in normalize_lines(in_fp):
+                    out_fp.write(line + "\n")
+            else:
+                debug_fp = sys.stderr if options.debug else None
+                for entry in read_srt_entries(in_fp, options.wpm,
+                                              options.tolerance_ms,
+                                              debug_fp):
+                    out_fp.write(entry.to_srt_string() + "\n")
+
+    except:
+        traceback.print_exc()
+        sys.exit(1)
+
+    sys.exit(0)
@@ -0,0 +1,327 @@
+#+---------+
+#| IMPORTS |
+#+---------+
+
+import os
+import sys
+import traceback
+import getopt
+import mmap
+import re
+
+import srtdf_instrument as in_m
+
+#+------------------+
+#| GLOBAL VARIABLES |
+#+------------------+
+
+g_module_name = None
+
+g_utf8_bom = b"\xef\xbb\xbf"
+
+g_def_mmap_min_size = 1 << 20   # files at least this big are memory-mapped
+
+g_block_re     = re.compile(rb"(?:[^\r\n]*\S[^\r\n]*(?:\r\n|\r|\n|\Z))+")
+g_time_re      = re.compile(rb"(\d+)[:.,](\d+)[:.,](\d+)[:.,](\d+)")
+g_range_re     = re.compile(rb"\s*(\d+)[:.,](\d+)[:.,](\d+)[:.,](\d+)\s*-->\s*"
+                            rb"(\d+)[:.,](\d+)[:.,](\d+)[:.,](\d+)(?:\s.*)?")
+g_time_sep_re  = re.compile(rb"[:.,]")
+g_integer_re   = re.compile(rb"\d+")
+
+g_time_separator = b"-->"
+
+#+-----------+
+#| FUNCTIONS |
+#+-----------+
+
+def _eprint(*args, **kwargs):
+    print(*args, file=sys.stderr, flush=True, **kwargs)
+    #sys.stderr.flush()
+
+def usage():
+    format_str = """
+NAME
+
+    %s - Reads srt files without pysrt
+
+SYNOPSIS
+
+    %s [-C] [-h] srt_filepath
+
+DESCRIPTION
+
+    Parses srt_filepath the way pysrt.open() does and dumps one line per
+    entry on stdout
+
+    INDEX,START_MS,END_MS,TEXT
+
+    where the new lines of TEXT are shown as '|'. It is meant for checking
+    the reader that srtdf_srt_compare_writer.py and srtdf_pipeline.py use.
+
+    The file is read once. Files of %d bytes or more are memory-mapped and
+    only the text of each entry is decoded. What srtdf_utf8_base.sh fixes
+    up is tolerated as it is: a UTF-8 BOM, '\\r' characters and time
+    values with long hour fields (0000000:00:00,920). Lines starting with
+    '#' are dropped with -C. Entries whose time range cannot be parsed are
+    skipped, as pysrt skips them. An empty time is 0, so an entry whose
+    time line is a bare '-->' is kept as 0 --> 0, as pysrt keeps it.
+
+OPTIONS
+
+    -C
+       drop the lines starting with '#' (comments).
+       this is optional.
+
+    -h
+       this help.
+       this is optional.
+"""
+    usage_str = format_str % (g_module_name, g_module_name,
+                              g_def_mmap_min_size)
+    _eprint(usage_str)
+
+
+def ms_2_srt_time(ms):
+
+    # as str() of a pysrt.SubRipTime: HH:MM:SS,mmm, negative times as 0
+
+    if (ms < 0):
+        ms = 0
+
+    (t, ms) = divmod(ms, 1000)
+    (h, t)  = divmod(t, 3600)
+    (m, s)  = divmod(t, 60)
+
+    return "%02d:%02d:%02d,%03d" % (h, m, s, ms)
+
+
+def _parse_int(digits):
+
+    # as pysrt.SubRipTime.parse_int: the leading digits, 0 if none
+
+    try:
+        return int(digits)
+    except ValueError:
+        m = g_integer_re.match(digits)
+        if (m != None):
+            return int(m.group())
+        return 0
+
+
+def parse_srt_time(time_bytes):
+
+    # returns the milliseconds of a HH:MM:SS,mmm time value (any of ':',
+    # '.' and ',' may separate the fields, which may be of any length),
+    # None if it does not have four fields
+
+    m = g_time_re.fullmatch(time_bytes)
+    if (m != None):
+        (h, mi, s, ms) = m.groups()
+        return ((int(h) * 60 + int(mi)) * 60 + int(s)) * 1000 + int(ms)
+
+    fields = g_time_sep_re.split(time_bytes)
+    if (len(fields) != 4):
+        return None
+
+    (h, mi, s, ms) = [ _parse_int(f) for f in fields ]
+    return ((h * 60 + mi) * 60 + s) * 1000 + ms
+
+
+def _block_2_cue(lines):
+
+    # returns the SrtCue of the lines of an entry (as pysrt's
+    # SubRipItem.from_lines), None if they do not make one
+
+    if (len(lines) < 2):
+        return None
+
+    index = None
+    if (g_time_separator not in lines[0]):
+        index = lines[0].rstrip()
+        lines = lines[1:]
+        try:
+            index = int(index)
+        except ValueError:
+            index = index.decode("utf-8")
+
+    if (lines[0].count(g_time_separator) != 1):
+        return None
+
+    m = g_range_re.fullmatch(lines[0])
+    if (m != None):
+        (h, mi, s, ms, e_h, e_mi, e_s, e_ms) = [ int(v) for v in m.groups() ]
+        start_ms = ((h * 60 + mi) * 60 + s) * 1000 + ms
+        end_ms   = ((e_h * 60 + e_mi) * 60 + e_s) * 1000 + e_ms
+    else:
+        # an empty time is 0, as pysrt has it (a bare '-->' is 0 --> 0)
+        (start, end) = lines[0].split(g_time_separator)
+        start    = start.strip()
+        end      = end.lstrip().split(b" ", 1)[0].strip()
+        start_ms = parse_srt_time(start) if start else 0
+        end_ms   = parse_srt_time(end) if end else 0
+        if (start_ms == None or end_ms == None):
+            return None
+
+    text = "\n".join([ line.decode("utf-8").rstrip() for line in lines[1:] ])
+
+    return SrtCue(index, start_ms, end_ms, text)
+
+
+def parse_srt_bytes(buf, strip_comments = False):
+
+    # yields the SrtCue objects of the contents of a srt file. buf may be
+    # anything re can scan (bytes, a mmap). an entry is a run of lines
+    # that are not blank, as pysrt has it.
+
+    pos = len(g_utf8_bom) if buf[:len(g_utf8_bom)] == g_utf8_bom else 0
+
+    for m in g_block_re.finditer(buf, pos):
+        lines = m.group().splitlines()
+
+        if (strip_comments):
+            lines = [ line for line in lines if line[:1] != b"#" ]
+
+        cue = _block_2_cue(lines)
+        if (cue != None):
+            yield cue
+
+
+def parse_srt_string(text, strip_comments = False):
+
+    # returns the SrtCue objects of the contents of a srt file in a str
+
+    return list(parse_srt_bytes(text.encode("utf-8"), strip_comments))
+
+
+def read_srt_file(filepath, strip_comments = False,
+                  mmap_min_size = g_def_mmap_min_size):
+
+    # returns the SrtCue objects of a srt file. the file is memory-mapped
+    # if it is at least mmap_min_size bytes big.
+
+    with in_m.span("srt.read"), open(filepath, "rb") as f:
+
+        size = os.fstat(f.fileno()).st_size
+        in_m.count("srt.files")
+        in_m.count("srt.bytes_read", size)
+
+        if (size < mmap_min_size):
+            cues = list(parse_srt_bytes(f.read(), strip_comments))
+        else:
+            buf = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+            try:
+                cues = list(parse_srt_bytes(buf, strip_comments))
+            finally:
+                buf.close()
+
+        in_m.count("srt.cues", len(cues))
+        return cues
+
+#+---------+
+#| CLASSES |
+#+---------+
+
+class SrtCue(object):
+
+    # an entry of a srt file. start_ms and end_ms are milliseconds and
+    # text is the lines of the entry joined with '\n'.
+
+    __slots__ = ("index", "start_ms", "end_ms", "text")
+
+    def __init__(self, index, start_ms, end_ms, text):
+        self.index    = index
+        self.start_ms = start_ms
+        self.end_ms   = end_ms
+        self.text     = text
+
+    @property
+    def start_str(self):
+        return ms_2_srt_time(self.start_ms)
+
+    @property
+    def end_str(self):
+        return ms_2_srt_time(self.end_ms)
+
+    def __str__(self):
+        return "%s\n%s --> %s\n%s\n" % (self.index, self.start_str,
+                                        self.end_str, self.text)
+
+
+class Options(object):
+    def __init__(self, module_name):
+        self.m_mn             = module_name
+        self.m_strip_comments = False
+        self.m_srt_filepath   = None
+
+    @property
+    def strip_comments(self):
+        return self.m_strip_comments
+
+    @strip_comments.setter
+    def strip_comments(self, v):
+        self.m_strip_comments = v
+
+    @property
+    def srt_filepath(self):
+        return self.m_srt_filepath
+
+    @srt_filepath.setter
+    def srt_filepath(self, v):
+        if (not os.path.isfile(v)):
+            err_str = "%s: %s not present" % (self.m_mn, v)
+            raise Exception (err_str)
+        self.m_srt_filepath = v
+
+    def parse_cmdline(self):
+        opts, args = \
+            getopt.getopt(sys.argv[1:],
+                    "Ch",
+                    [
+                      "strip-comments",
+                      "help"
+                    ])
+
+        for o, v in opts:
+            if o in ("-h", "--help"):
+                usage()
+                sys.exit(0)
+            elif o in ("-C", "--strip-comments"):
+                self.strip_comments = True
+
+        if (len(args) != 1):
+            err_str = "%s: srt_filepath not specified" % (self.m_mn)
+            raise Exception (err_str)
+
+        self.srt_filepath = args[0]
+
+    #https://dbader.org/blog/python-repr-vs-str
+
+    def __str__(self):
+        ret = {
+                "--strip-comments" : self.m_strip_comments,
+                "args"             : [ self.m_srt_filepath ]
+              }
+        return str(ret)
+
+#+------+
+#| MAIN |
+#+------+
+
+if __name__ == '__main__':
+
+    try:
+        g_module_name  = os.path.basename(__file__)
+
+        options = Options(g_module_name)
+        options.parse_cmdline()
+
+        for cue in read_srt_file(options.srt_filepath,
+                                 options.strip_comments):
+            print("%s,%d,%d,%s" % (cue.index, cue.start_ms, cue.end_ms,
+                                   cue.text.replace("\n", "|")))
+
+    except:
+        traceback.print_exc()
+        sys.exit(1)
+
+    sys.exit(0)
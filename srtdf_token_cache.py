@@ -0,0 +1,148 @@
+
+#+---------+
+#| IMPORTS |
+#+---------+
+
+import os
+import sys
+import json
+import hashlib
+import sqlite3
+
+#+------------------+
+#| GLOBAL VARIABLES |
+#+------------------+
+
+g_cache_filename     = "srtdf_token_cache.sqlite3"
+g_def_max_entries    = 1000000
+
+#+-----------+
+#| FUNCTIONS |
+#+-----------+
+
+def _eprint(*args, **kwargs):
+    print(*args, file=sys.stderr, flush=True, **kwargs)
+    #sys.stderr.flush()
+
+#+---------+
+#| CLASSES |
+#+---------+
+
+class TokenCache(object):
+
+    # A persistent cache of the tokens of subtitle texts, stored in a
+    # sqlite database in cache_dir.
+    #
+    # The tokens of a text are a list of (text, pos, is_stop) tuples.
+    # Entries are keyed by a hash of the model name and version, the
+    # pipeline (see srtdf_nlp), the to-lower flag and the text, so that a
+    # change of any of them never returns stale tokens.
+    #
+    # Every lookup that hits stamps the entry. When the cache is closed,
+    # the least recently used entries beyond max_entries are evicted.
+
+    def __init__(self, module_name, cache_dir, model_name, model_version,
+                 pipeline, to_lower, max_entries = g_def_max_entries):
+
+        self.m_mn          = module_name
+        self.m_prefix      = "%s\0%s\0%s\0%s\0" % \
+                                (model_name, model_version, pipeline, to_lower)
+        self.m_max_entries = max_entries
+        self.m_hits        = 0
+        self.m_misses      = 0
+        self.m_stores      = 0
+
+        os.makedirs(cache_dir, exist_ok = True)
+        self.m_filepath = os.path.join(cache_dir, g_cache_filename)
+
+        self.m_conn = sqlite3.connect(self.m_filepath, timeout = 60)
+        self.m_conn.execute("""
+            CREATE TABLE IF NOT EXISTS tokens (
+                key       TEXT PRIMARY KEY,
+                tokens    TEXT NOT NULL,
+                last_used INTEGER NOT NULL
+            )""")
+        self.m_conn.execute("""
+            CREATE INDEX IF NOT EXISTS tokens_last_used
+                ON tokens (last_used)""")
+
+        row = self.m_conn.execute(
+                "SELECT COALESCE(MAX(last_used), 0) FROM tokens").fetchone()
+        self.m_clock = row[0]
+
+
+    def _key(self, text):
+        return hashlib.sha256(
+                (self.m_prefix + text).encode("utf-8")).hexdigest()
+
+
+    def lookup(self, texts):
+
+        # returns a list with the tokens of each text, None for misses
+
+        result = []
+        used   = []
+
+        for text in texts:
+            key = self._key(text)
+            row = self.m_conn.execute(
+                    "SELECT tokens FROM tokens WHERE key = ?",
+                    (key,)).fetchone()
+            if (row == None):
+                self.m_misses = self.m_misses + 1
+                result.append(None)
+            else:
+                self.m_hits = self.m_hits + 1
+                self.m_clock = self.m_clock + 1
+                used.append((self.m_clock, key))
+                result.append([ tuple(t) for t in json.loads(row[0]) ])
+
+        with self.m_conn:
+            self.m_conn.executemany(
+                    "UPDATE tokens SET last_used = ? WHERE key = ?", used)
+
+        return result
+
+
+    def store(self, texts, tokens_l):
+
+        rows = []
+        for text, tokens in zip(texts, tokens_l):
+            self.m_clock = self.m_clock + 1
+            rows.append((self._key(text), json.dumps(tokens), self.m_clock))
+
+        with self.m_conn:
+            self.m_conn.executemany(
+                    "INSERT OR REPLACE INTO tokens VALUES (?, ?, ?)", rows)
+
+        self.m_stores = self.m_stores + len(rows)
+
+
+    def close(self):
+
+        with self.m_conn:
+            self.m_conn.execute("""
+                DELETE FROM tokens WHERE key IN (
+                    SELECT key FROM tokens
+                    ORDER BY last_used DESC
+                    LIMIT -1 OFFSET ?)""", (self.m_max_entries,))
+        self.m_conn.close()
+
+
+    @property
+    def hits(self):
+        return self.m_hits
+
+    @property
+    def misses(self):
+        return self.m_misses
+
+    def __str__(self):
+        ret = {
+                "filepath" : self.m_filepath,
+                "hits"     : self.m_hits,
+                "misses"   : self.m_misses,
+                "stores"   : self.m_stores
+              }
+        return str(ret)
+